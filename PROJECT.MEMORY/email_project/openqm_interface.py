@@ -4,16 +4,34 @@ OpenQM Database Interface
 Python wrapper for OpenQM MultiValue database operations
 """
 
-import subprocess
 import json
-import tempfile
 import os
+import struct
+import subprocess
+import sys
+import threading
 from typing import List, Dict, Any, Optional
-from pathlib import Path
+
+
+# Resident worker script and the interpreter that runs it. QM_WORKER_PYTHON
+# lets the worker use a different Python (e.g. one matching qmclilib's bitness).
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'qm_worker.py')
+WORKER_PYTHON = os.getenv('QM_WORKER_PYTHON', sys.executable)
+
+HEADER = struct.Struct('>I')
+
+# Operations that are safe to run twice; the rest (write, delete, next_id)
+# are only retried when the worker never received them
+IDEMPOTENT_OPS = {'ping', 'read', 'select'}
 
 
 class OpenQMInterface:
-    """Interface to OpenQM MultiValue database"""
+    """Interface to OpenQM MultiValue database
+    
+    All operations go through one resident qm_worker.py process holding a
+    QMClient session, using length-prefixed JSON frames over its stdin/stdout.
+    The worker is started on first use and restarted if it dies.
+    """
     
     # Field delimiters for MultiValue structure
     FM = chr(254)  # Field Mark
@@ -22,36 +40,77 @@ class OpenQMInterface:
     
     def __init__(self, account='EMAILSYS'):
         self.account = account
-        self.temp_dir = Path(tempfile.gettempdir())
+        self._worker = None
+        self._next_request = 0
+        self._delivered = False  # last request reached the worker's stdin
+        self._lock = threading.Lock()
+    
+    def _start_worker(self):
+        """Spawn the resident QM worker"""
+        self._worker = subprocess.Popen(
+            [WORKER_PYTHON, WORKER_SCRIPT, self.account],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE
+        )
+    
+    def _roundtrip(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one framed request and read its framed response"""
+        if self._worker is None or self._worker.poll() is not None:
+            self._start_worker()
+        
+        self._delivered = False
+        payload = json.dumps(request).encode('utf-8')
+        self._worker.stdin.write(HEADER.pack(len(payload)) + payload)
+        self._worker.stdin.flush()
+        self._delivered = True
         
-    def _escape_qm(self, text: str) -> str:
-        """Escape text for QMBasic"""
-        if not text:
-            return ''
-        return (text.replace("'", "''")
-                    .replace('\n', ' ')
-                    .replace('\r', ''))
+        header = self._worker.stdout.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ConnectionError('QM worker closed the pipe')
+        (length,) = HEADER.unpack(header)
+        response = json.loads(self._worker.stdout.read(length).decode('utf-8'))
+        
+        if response.get('id') != request['id']:
+            raise ConnectionError('QM worker response out of sequence')
+        return response
     
-    def _execute_qm_script(self, script: str) -> tuple[int, str, str]:
-        """Execute QMBasic script"""
-        script_file = self.temp_dir / f'qm_script_{os.getpid()}.bas'
+    def _request(self, op: str, **params) -> Any:
+        """Run one operation on the worker; returns its result or None on error"""
+        with self._lock:
+            self._next_request += 1
+            request = dict(params, id=self._next_request, op=op)
+            
+            try:
+                response = self._roundtrip(request)
+            except (OSError, ValueError) as e:
+                # Worker died or the stream is out of step - restart once and
+                # retry, unless the worker may already have run the operation
+                self.close()
+                if self._delivered and op not in IDEMPOTENT_OPS:
+                    print(f"[OpenQM] {op} not retried, worker failed after receiving it: {e}")
+                    return None
+                try:
+                    response = self._roundtrip(request)
+                except (OSError, ValueError) as e:
+                    print(f"[OpenQM] Worker unavailable: {e}")
+                    self.close()
+                    return None
         
+        if not response.get('ok'):
+            print(f"[OpenQM] {op} failed: {response.get('error')}")
+            return None
+        return response.get('result')
+    
+    def close(self):
+        """Stop the resident worker"""
+        worker, self._worker = self._worker, None
+        if worker is None:
+            return
         try:
-            with open(script_file, 'w') as f:
-                f.write(script)
-                
-            result = subprocess.run(
-                ['qm', '-A', self.account, '-K', str(script_file)],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            return result.returncode, result.stdout, result.stderr
-            
-        finally:
-            if script_file.exists():
-                script_file.unlink()
+            worker.stdin.close()
+            worker.wait(timeout=5)
+        except Exception:
+            worker.kill()
     
     def write_record(self, file_name: str, record_id: str, data: Dict[str, Any]) -> bool:
         """
@@ -65,34 +124,7 @@ class OpenQMInterface:
         Returns:
             True if successful
         """
-        script = f"""
-OPEN '{file_name}' TO FILE.VAR ELSE
-    PRINT 'ERROR: Cannot open file {file_name}'
-    STOP
-END
-
-RECORD = ''
-"""
-        
-        # Build record fields
-        for field_num, value in sorted(data.items()):
-            if isinstance(value, list):
-                # MultiValue field
-                escaped_values = [self._escape_qm(str(v)) for v in value]
-                mv_string = self.VM.join(escaped_values)
-                script += f"RECORD<{field_num}> = '{mv_string}'\n"
-            else:
-                # Single value
-                escaped = self._escape_qm(str(value))
-                script += f"RECORD<{field_num}> = '{escaped}'\n"
-        
-        script += f"""
-WRITE RECORD TO FILE.VAR, '{self._escape_qm(record_id)}'
-PRINT 'SUCCESS'
-"""
-        
-        rc, stdout, stderr = self._execute_qm_script(script)
-        return rc == 0 and 'SUCCESS' in stdout
+        return self._request('write', file=file_name, record_id=record_id, data=data) is True
     
     def read_record(self, file_name: str, record_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -105,65 +137,16 @@ PRINT 'SUCCESS'
         Returns:
             Dictionary with field data or None if not found
         """
-        script = f"""
-OPEN '{file_name}' TO FILE.VAR ELSE
-    PRINT 'ERROR: Cannot open file'
-    STOP
-END
-
-READ RECORD FROM FILE.VAR, '{self._escape_qm(record_id)}' ELSE
-    PRINT 'NOT_FOUND'
-    STOP
-END
-
-* Output record as delimited string
-PRINT 'DATA:'
-FOR I = 1 TO DCOUNT(RECORD, @FM)
-    FIELD.VAL = RECORD<I>
-    IF I > 1 THEN PRINT @FM:
-    PRINT FIELD.VAL:
-NEXT I
-"""
-        
-        rc, stdout, stderr = self._execute_qm_script(script)
-        
-        if 'NOT_FOUND' in stdout:
-            return None
-            
-        if rc != 0 or 'ERROR' in stdout:
+        result = self._request('read', file=file_name, record_id=record_id)
+        if result is None:
             return None
         
-        # Parse output
-        if 'DATA:' in stdout:
-            data_str = stdout.split('DATA:')[1].strip()
-            fields = data_str.split(self.FM)
-            
-            result = {}
-            for idx, field in enumerate(fields, 1):
-                if self.VM in field:
-                    # MultiValue field
-                    result[idx] = field.split(self.VM)
-                else:
-                    result[idx] = field
-                    
-            return result
-            
-        return None
+        # JSON object keys arrive as strings
+        return {int(field_num): value for field_num, value in result.items()}
     
     def delete_record(self, file_name: str, record_id: str) -> bool:
         """Delete a record from OpenQM file"""
-        script = f"""
-OPEN '{file_name}' TO FILE.VAR ELSE
-    PRINT 'ERROR: Cannot open file'
-    STOP
-END
-
-DELETE FILE.VAR, '{self._escape_qm(record_id)}'
-PRINT 'SUCCESS'
-"""
-        
-        rc, stdout, stderr = self._execute_qm_script(script)
-        return rc == 0 and 'SUCCESS' in stdout
+        return self._request('delete', file=file_name, record_id=record_id) is True
     
     def select_records(self, file_name: str, criteria: str = '') -> List[str]:
         """
@@ -176,78 +159,12 @@ PRINT 'SUCCESS'
         Returns:
             List of record IDs
         """
-        script = f"""
-OPEN '{file_name}' TO FILE.VAR ELSE
-    PRINT 'ERROR: Cannot open file'
-    STOP
-END
-
-SELECT FILE.VAR {criteria}
-
-IDS = ''
-LOOP
-    READNEXT ID ELSE EXIT
-    IF IDS NE '' THEN IDS := @FM
-    IDS := ID
-REPEAT
-
-PRINT 'IDS:':IDS
-"""
-        
-        rc, stdout, stderr = self._execute_qm_script(script)
-        
-        if 'IDS:' in stdout:
-            ids_str = stdout.split('IDS:')[1].strip()
-            if ids_str:
-                return ids_str.split(self.FM)
-                
-        return []
+        return self._request('select', file=file_name, criteria=criteria) or []
     
     def get_next_id(self, counter_name: str) -> int:
         """Get next sequential ID from counter"""
-        script = f"""
-OPEN 'SYSTEM.CONFIG' TO CONFIG.FILE ELSE
-    PRINT 'ERROR: Cannot open SYSTEM.CONFIG'
-    STOP
-END
-
-READ COUNTERS FROM CONFIG.FILE, 'COUNTERS' ELSE
-    COUNTERS = ''
-    FOR I = 1 TO 10
-        COUNTERS<I> = 0
-    NEXT I
-END
-
-* Counter mapping
-COUNTER.MAP = ''
-COUNTER.MAP<1> = 'EMAIL.COUNT'
-COUNTER.MAP<2> = 'THREAD.COUNT'
-COUNTER.MAP<3> = 'ATTACHMENT.COUNT'
-COUNTER.MAP<4> = 'CONTACT.COUNT'
-COUNTER.MAP<5> = 'GROUP.COUNT'
-COUNTER.MAP<6> = 'DOMAIN.COUNT'
-COUNTER.MAP<7> = 'RULE.COUNT'
-COUNTER.MAP<8> = 'CATEGORY.COUNT'
-
-LOCATE '{counter_name}' IN COUNTER.MAP<1> SETTING POS THEN
-    COUNTERS<POS> += 1
-    NEXT.ID = COUNTERS<POS>
-    WRITE COUNTERS TO CONFIG.FILE, 'COUNTERS'
-    PRINT 'ID:':NEXT.ID
-END ELSE
-    PRINT 'ERROR: Invalid counter name'
-END
-"""
-        
-        rc, stdout, stderr = self._execute_qm_script(script)
-        
-        if 'ID:' in stdout:
-            try:
-                return int(stdout.split('ID:')[1].strip())
-            except ValueError:
-                pass
-                
-        return -1
+        result = self._request('next_id', counter=counter_name)
+        return result if isinstance(result, int) else -1
 
 
 class EmailRecord:
@@ -389,3 +306,5 @@ if __name__ == '__main__':
         # Retrieve it
         retrieved = email_rec.get(email_id)
         print(f"Retrieved: {retrieved}")
+    
+    qm.close()
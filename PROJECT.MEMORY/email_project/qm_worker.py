@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Resident OpenQM worker
+Holds one QMClient session open and serves framed requests on stdin/stdout
+
+Started by OpenQMInterface; not normally run by hand.
+
+Protocol (both directions):
+    4-byte big-endian length + UTF-8 JSON payload
+
+Requests:
+    {"id": 1, "op": "read",   "file": "EMAILS", "record_id": "E0000000001"}
+    {"id": 2, "op": "write",  "file": "EMAILS", "record_id": "...", "data": {"1": "x", "2": ["a", "b"]}}
+    {"id": 3, "op": "delete", "file": "EMAILS", "record_id": "..."}
+    {"id": 4, "op": "select", "file": "EMAILS", "criteria": "WITH 8 LIKE '...x...'"}
+    {"id": 5, "op": "next_id", "counter": "EMAIL.COUNT"}
+    {"id": 6, "op": "ping"}
+
+Responses:
+    {"id": 1, "ok": true, "result": ...}
+    {"id": 1, "ok": false, "error": "..."}
+"""
+
+import json
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.getenv('QMCLIENT_PATH', r'C:\QMSYS\SYSCOM'))
+import qmclient as qm
+
+FM = chr(254)  # Field Mark
+VM = chr(253)  # Value Mark
+
+HEADER = struct.Struct('>I')
+
+# Counter layout of SYSTEM.CONFIG COUNTERS
+COUNTER_MAP = [
+    'EMAIL.COUNT', 'THREAD.COUNT', 'ATTACHMENT.COUNT', 'CONTACT.COUNT',
+    'GROUP.COUNT', 'DOMAIN.COUNT', 'RULE.COUNT', 'CATEGORY.COUNT'
+]
+
+
+def log(msg: str):
+    """stdout carries the protocol - diagnostics go to stderr"""
+    print(f"[QM Worker] {msg}", file=sys.stderr, flush=True)
+
+
+def read_frame(stream):
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    (length,) = HEADER.unpack(header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return json.loads(payload.decode('utf-8'))
+
+
+def write_frame(stream, message: dict):
+    payload = json.dumps(message).encode('utf-8')
+    stream.write(HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+class QMWorker:
+    """Dispatches protocol requests onto one QMClient session"""
+
+    def __init__(self, account: str):
+        self.account = account
+        self.files = {}
+        if not qm.ConnectLocal(account):
+            raise RuntimeError(f"Cannot connect to {account}: {qm.Error()}")
+        log(f"Connected to {account}")
+
+    def _open(self, file_name: str) -> int:
+        fno = self.files.get(file_name)
+        if not fno:
+            fno = qm.Open(file_name)
+            if not fno:
+                raise RuntimeError(f"Cannot open file {file_name}")
+            self.files[file_name] = fno
+        return fno
+
+    def op_ping(self, req):
+        return 'pong'
+
+    def op_read(self, req):
+        rec, err = qm.Read(self._open(req['file']), req['record_id'])
+        if err != 0:
+            return None
+
+        result = {}
+        for idx, field in enumerate(rec.split(FM), 1):
+            result[idx] = field.split(VM) if VM in field else field
+        return result
+
+    def op_write(self, req):
+        data = {int(k): v for k, v in req['data'].items()}
+        fields = [''] * (max(data) if data else 0)
+        for field_num, value in data.items():
+            if isinstance(value, list):
+                fields[field_num - 1] = VM.join(str(v) for v in value)
+            else:
+                fields[field_num - 1] = str(value)
+        qm.Write(self._open(req['file']), req['record_id'], FM.join(fields))
+        return True
+
+    def op_delete(self, req):
+        qm.Delete(self._open(req['file']), req['record_id'])
+        return True
+
+    def op_select(self, req):
+        qm.Execute(f"SELECT {req['file']} {req.get('criteria', '')}".strip())
+        ids = qm.ReadList(0)
+        return ids.split(FM) if ids else []
+
+    def op_next_id(self, req):
+        counter = req['counter']
+        if counter not in COUNTER_MAP:
+            raise ValueError(f"Invalid counter name: {counter}")
+        pos = COUNTER_MAP.index(counter)
+
+        fno = self._open('SYSTEM.CONFIG')
+        rec, err = qm.Readu(fno, 'COUNTERS', True)
+        counters = rec.split(FM) if err == 0 and rec else []
+        counters += ['0'] * (len(COUNTER_MAP) - len(counters))
+
+        next_id = int(counters[pos] or 0) + 1
+        counters[pos] = str(next_id)
+        qm.Write(fno, 'COUNTERS', FM.join(counters))  # releases the lock
+        return next_id
+
+    def handle(self, req: dict) -> dict:
+        handler = getattr(self, f"op_{req.get('op')}", None)
+        if handler is None:
+            return {'id': req.get('id'), 'ok': False, 'error': f"Unknown op: {req.get('op')}"}
+        try:
+            return {'id': req.get('id'), 'ok': True, 'result': handler(req)}
+        except Exception as e:
+            return {'id': req.get('id'), 'ok': False, 'error': str(e)}
+
+    def serve(self, stdin, stdout):
+        while True:
+            req = read_frame(stdin)
+            if req is None:
+                break
+            write_frame(stdout, self.handle(req))
+        qm.Disconnect()
+        log("Stopped")
+
+
+if __name__ == '__main__':
+    account = sys.argv[1] if len(sys.argv) > 1 else 'EMAILSYS'
+    worker = QMWorker(account)
+    worker.serve(sys.stdin.buffer, sys.stdout.buffer)
@@ -15,7 +15,9 @@ Philosophy:
 4. User decisions train the system
 
 Usage:
-    python PY/ai_classifier.py analyze-transactions [--batch-id BATCH_ID]
+    python PY/ai_classifier.py analyze-transactions [--batch-id BATCH_ID] [--full-rebuild]
+    python PY/ai_classifier.py analyze-transactions --csv trans_det.csv
+    python PY/ai_classifier.py analyze-anomalies [--batch-id BATCH_ID] [--csv FILE] [--days 3] [--tolerance 0.01]
     python PY/ai_classifier.py analyze-tasks
     python PY/ai_classifier.py analyze-emails
     python PY/ai_classifier.py review-rules
@@ -26,305 +28,399 @@ import sys
 import os
 import json
 from datetime import datetime, timedelta
-from collections import defaultdict
 import re
+import time
+
+import numpy as np
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from qmclient import QMClient
+    from qm_records import RecordClient
 except ImportError:
     print("ERROR: QMClient not available")
     sys.exit(1)
 
+from classification_state import ClassificationState
+from transaction_frame import PayeeIndex, TransactionFrame
+from transaction_anomalies import (
+    AMOUNT_TOLERANCE, BURST_FACTOR, BURST_WINDOW, DAY_WINDOW, OUTLIER_THRESHOLD,
+    frequency_bursts, near_duplicates, payee_robust_stats, robust_outliers
+)
+
+# Hot files read repeatedly by the analyzers (seconds)
+CACHE_TTLS = {'TRANSACTION': 120, 'PAYEE': 600}
+
 
 class AIClassifier:
     """AI-assisted classification for priority, urgency, categories, and notifications"""
     
-    def __init__(self, account="HAL"):
-        self.qm = QMClient()
-        self.qm.connect(account)
+    def __init__(self, account="HAL", offline=False):
+        # offline: analyze exported data (--csv) without a QM connection
+        self.qm = None if offline else RecordClient(account, cache=CACHE_TTLS)
         self.rules_file = "config/classification_rules.json"
         self.proposals_file = "config/classification_proposals.json"
+        self.state_file = "config/classification_state.json"
+        self.state = None
         
-    def analyze_transactions(self, batch_id=None):
+    def analyze_transactions(self, batch_id=None, frame=None, full_rebuild=False):
         """
         Analyze transactions to determine:
         - Priority (HIGH for large amounts, unusual vendors)
         - Urgency (URGENT for duplicates, fraud indicators)
         - Category refinement
         - Notification triggers (ALERT for large amounts, new vendors)
-        """
-        print("Analyzing transactions for classification...")
-        
-        query = "SELECT TRANSACTION"
-        if batch_id:
-            query += f" WITH IMPORT.BATCH.ID = '{batch_id}'"
         
-        trans_list = self.qm.select("TRANSACTION", query)
+        The batch is loaded once into a TransactionFrame and every analyzer
+        runs as a vectorized pass over it.
         
-        if not trans_list:
+        Without a batch id or frame, only transactions imported since the
+        last run are loaded (see classification_state). Per-payee averages
+        then come from the stored running aggregates, so they still cover
+        the full history. full_rebuild discards the watermark first.
+        """
+        print("Analyzing transactions for classification...")
+        start = time.time()
+        
+        stats = None
+        if frame is None and batch_id is None:
+            frame = self._load_new_frame(full_rebuild)
+            if len(frame):
+                self.state.update_payees(frame)
+                stats = self.state.payee_arrays(frame.payee_names)
+        elif frame is None:
+            frame = self._load_frame(batch_id)
+        
+        if not len(frame):
             print("No transactions found.")
             return []
         
+        payees = self._load_payees()
         proposals = []
         
         # Analyze for various classification criteria
-        proposals.extend(self._analyze_large_amounts(trans_list))
-        proposals.extend(self._analyze_unusual_patterns(trans_list))
-        proposals.extend(self._analyze_new_vendors(trans_list))
-        proposals.extend(self._analyze_duplicates(trans_list))
-        proposals.extend(self._analyze_category_patterns(trans_list))
+        proposals.extend(self._analyze_large_amounts(frame, stats))
+        proposals.extend(self._analyze_unusual_patterns(frame, stats))
+        proposals.extend(self._analyze_new_vendors(frame, payees))
+        proposals.extend(self._analyze_duplicates(frame))
+        proposals.extend(self._analyze_category_patterns(frame, payees))
         
+        print(f"Analyzed {len(frame)} transactions in {time.time() - start:.3f}s")
         return proposals
     
-    def _analyze_large_amounts(self, trans_list):
+    def _load_frame(self, batch_id=None):
+        """SELECT the transactions (optionally one import batch) into a frame"""
+        query = "SELECT TRANSACTION"
+        if batch_id:
+            query += f" WITH IMPORT.BATCH.ID = '{batch_id}'"
+        
+        trans_list = self.qm.select("TRANSACTION", query)
+        return TransactionFrame.load(trans_list, self.qm.pool)
+    
+    def _load_new_frame(self, full_rebuild=False):
+        """Load only transactions past the stored watermark"""
+        self.state = ClassificationState(self.state_file)
+        if full_rebuild:
+            print("Full rebuild: discarding watermark and payee aggregates")
+            self.state.reset()
+        elif self.state.watermark:
+            print(f"Resuming after {self.state.watermark} (batch {self.state.batch_id})")
+        
+        query = self.state.select_query("SELECT TRANSACTION")
+        trans_list = self.state.new_ids(self.qm.select("TRANSACTION", query))
+        frame = TransactionFrame.load(trans_list, self.qm.pool)
+        self.state.advance(trans_list)
+        return frame
+    
+    def save_state(self):
+        """Persist the watermark after the run's proposals are saved"""
+        if self.state is not None:
+            self.state.save()
+    
+    def _load_payees(self):
+        """Load the PAYEE table once as a name index"""
+        if self.qm is None:
+            return PayeeIndex({})
+        return PayeeIndex.load(self.qm.pool)
+    
+    def _analyze_large_amounts(self, frame, stats=None):
         """Identify transactions with unusually large amounts"""
         proposals = []
-        amounts = []
-        
-        # Collect all amounts
-        for trans_id in trans_list:
-            trans = self.qm.read("TRANSACTION", trans_id)
-            if trans:
-                amount = float(trans.get(4, 0))
-                amounts.append(amount)
-        
-        if not amounts:
-            return proposals
         
-        # Calculate statistics
-        avg_amount = sum(amounts) / len(amounts)
-        max_amount = max(amounts)
-        
-        # Threshold: 3x average or > $1000
-        threshold = max(avg_amount * 3, 1000)
+        # Threshold: 3x average or > $1000 (average over all history when incremental)
+        if stats is None:
+            average = frame.amount.mean()
+        else:
+            average = self.state.overall_mean()
+        threshold = max(average * 3, 1000)
         
         # Find large transactions
-        for trans_id in trans_list:
-            trans = self.qm.read("TRANSACTION", trans_id)
-            if trans:
-                amount = float(trans.get(4, 0))
-                payee = trans.get(3) or trans.get(2)
-                
-                if amount >= threshold:
-                    proposals.append({
-                        'type': 'PRIORITY',
-                        'target': 'TRANSACTION',
-                        'criteria': {
-                            'field': 'AMOUNT',
-                            'operator': '>=',
-                            'value': threshold
-                        },
-                        'action': 'SET_PRIORITY',
-                        'value': 'HIGH',
-                        'confidence': 0.90,
-                        'reason': f'Amount ${amount:.2f} exceeds threshold ${threshold:.2f}',
-                        'notification': 'ALERT',
-                        'notification_message': f'Large transaction: {payee} - ${amount:.2f}',
-                        'examples': [trans_id]
-                    })
+        for row in np.flatnonzero(frame.amount >= threshold):
+            amount = frame.amount[row]
+            payee = frame.payee[row]
+            proposals.append({
+                'type': 'PRIORITY',
+                'target': 'TRANSACTION',
+                'criteria': {
+                    'field': 'AMOUNT',
+                    'operator': '>=',
+                    'value': threshold
+                },
+                'action': 'SET_PRIORITY',
+                'value': 'HIGH',
+                'confidence': 0.90,
+                'reason': f'Amount ${amount:.2f} exceeds threshold ${threshold:.2f}',
+                'notification': 'ALERT',
+                'notification_message': f'Large transaction: {payee} - ${amount:.2f}',
+                'examples': [frame.ids[row]]
+            })
         
         return proposals
     
-    def _analyze_unusual_patterns(self, trans_list):
+    def _analyze_unusual_patterns(self, frame, stats=None):
         """Identify unusual transaction patterns"""
         proposals = []
         
-        # Group by payee and analyze frequency
-        payee_transactions = defaultdict(list)
-        
-        for trans_id in trans_list:
-            trans = self.qm.read("TRANSACTION", trans_id)
-            if trans:
-                payee = trans.get(3) or trans.get(2)
-                date = trans.get(1)
-                amount = float(trans.get(4, 0))
-                
-                payee_transactions[payee].append({
-                    'id': trans_id,
-                    'date': date,
-                    'amount': amount
-                })
-        
-        # Analyze each payee
-        for payee, transactions in payee_transactions.items():
-            if len(transactions) < 3:
-                continue
-            
-            amounts = [t['amount'] for t in transactions]
-            avg_amount = sum(amounts) / len(amounts)
-            
-            # Check for unusual amounts (3x average)
-            for trans in transactions:
-                if trans['amount'] >= avg_amount * 3:
-                    proposals.append({
-                        'type': 'URGENCY',
-                        'target': 'TRANSACTION',
-                        'criteria': {
-                            'field': 'STANDARDIZED_PAYEE',
-                            'operator': '=',
-                            'value': payee,
-                            'and': {
-                                'field': 'AMOUNT',
-                                'operator': '>=',
-                                'value': avg_amount * 3
-                            }
-                        },
-                        'action': 'SET_URGENCY',
-                        'value': 'URGENT',
-                        'confidence': 0.85,
-                        'reason': f'Amount ${trans["amount"]:.2f} is 3x normal for {payee} (avg ${avg_amount:.2f})',
-                        'notification': 'ALERT',
-                        'notification_message': f'Unusual amount for {payee}: ${trans["amount"]:.2f}',
-                        'examples': [trans['id']]
-                    })
+        # Per-payee frequency and average in one bincount pass,
+        # or from the running aggregates when analyzing incrementally
+        if stats is None:
+            counts, sums = frame.payee_totals()
+            averages = sums / np.maximum(counts, 1)
+        else:
+            counts, averages = stats['count'], stats['mean']
+        row_avg = averages[frame.payee_code]
+        
+        # Unusual amounts (3x average) for payees seen at least 3 times
+        unusual = (counts[frame.payee_code] >= 3) & (frame.amount >= row_avg * 3)
+        
+        for row in np.flatnonzero(unusual):
+            payee = frame.payee[row]
+            amount = frame.amount[row]
+            avg_amount = row_avg[row]
+            proposals.append({
+                'type': 'URGENCY',
+                'target': 'TRANSACTION',
+                'criteria': {
+                    'field': 'STANDARDIZED_PAYEE',
+                    'operator': '=',
+                    'value': payee,
+                    'and': {
+                        'field': 'AMOUNT',
+                        'operator': '>=',
+                        'value': avg_amount * 3
+                    }
+                },
+                'action': 'SET_URGENCY',
+                'value': 'URGENT',
+                'confidence': 0.85,
+                'reason': f'Amount ${amount:.2f} is 3x normal for {payee} (avg ${avg_amount:.2f})',
+                'notification': 'ALERT',
+                'notification_message': f'Unusual amount for {payee}: ${amount:.2f}',
+                'examples': [frame.ids[row]]
+            })
         
         return proposals
     
-    def _analyze_new_vendors(self, trans_list):
+    def _analyze_new_vendors(self, frame, payees):
         """Identify transactions with new/unknown vendors"""
         proposals = []
         
-        # Get list of known payees
-        known_payees = set()
-        all_payees = self.qm.select("PAYEE")
-        for payee_id in all_payees:
-            payee_rec = self.qm.read("PAYEE", payee_id)
-            if payee_rec:
-                known_payees.add(payee_rec.get(1, ""))
-        
-        # Check transactions for new vendors
-        for trans_id in trans_list:
-            trans = self.qm.read("TRANSACTION", trans_id)
-            if trans:
-                payee = trans.get(3) or trans.get(2)
-                amount = float(trans.get(4, 0))
-                
-                if payee and payee not in known_payees:
-                    # New vendor - determine notification level
-                    notification = 'ALERT' if amount >= 100 else 'NOTIFY'
-                    
-                    proposals.append({
-                        'type': 'NOTIFICATION',
-                        'target': 'TRANSACTION',
-                        'criteria': {
-                            'field': 'STANDARDIZED_PAYEE',
-                            'operator': 'NOT_IN',
-                            'value': 'KNOWN_PAYEES'
-                        },
-                        'action': 'NOTIFY',
-                        'value': notification,
-                        'confidence': 0.95,
-                        'reason': f'New vendor: {payee}',
-                        'notification': notification,
-                        'notification_message': f'New vendor: {payee} - ${amount:.2f}',
-                        'examples': [trans_id]
-                    })
+        # Look each distinct payee up once, then broadcast to rows
+        known = payees.known_mask(frame.payee_names)
+        new_vendor = (frame.payee != '') & ~known[frame.payee_code]
+        
+        for row in np.flatnonzero(new_vendor):
+            payee = frame.payee[row]
+            amount = frame.amount[row]
+            
+            # New vendor - determine notification level
+            notification = 'ALERT' if amount >= 100 else 'NOTIFY'
+            
+            proposals.append({
+                'type': 'NOTIFICATION',
+                'target': 'TRANSACTION',
+                'criteria': {
+                    'field': 'STANDARDIZED_PAYEE',
+                    'operator': 'NOT_IN',
+                    'value': 'KNOWN_PAYEES'
+                },
+                'action': 'NOTIFY',
+                'value': notification,
+                'confidence': 0.95,
+                'reason': f'New vendor: {payee}',
+                'notification': notification,
+                'notification_message': f'New vendor: {payee} - ${amount:.2f}',
+                'examples': [frame.ids[row]]
+            })
         
         return proposals
     
-    def _analyze_duplicates(self, trans_list):
+    def _analyze_duplicates(self, frame):
         """Identify potential duplicate transactions"""
         proposals = []
         
-        # Group by payee, amount, and date
-        transaction_groups = defaultdict(list)
-        
-        for trans_id in trans_list:
-            trans = self.qm.read("TRANSACTION", trans_id)
-            if trans:
-                payee = trans.get(3) or trans.get(2)
-                amount = float(trans.get(4, 0))
-                date = trans.get(1)
-                
-                key = (payee, amount, date)
-                transaction_groups[key].append(trans_id)
-        
-        # Find duplicates
-        for key, trans_ids in transaction_groups.items():
-            if len(trans_ids) > 1:
-                payee, amount, date = key
-                proposals.append({
-                    'type': 'URGENCY',
-                    'target': 'TRANSACTION',
-                    'criteria': {
-                        'field': 'DUPLICATE_CHECK',
-                        'operator': 'SAME_PAYEE_AMOUNT_DATE',
-                        'value': None
-                    },
-                    'action': 'SET_URGENCY',
-                    'value': 'URGENT',
-                    'confidence': 0.95,
-                    'reason': f'Potential duplicate: {payee} - ${amount:.2f} on {date}',
-                    'notification': 'ALERT',
-                    'notification_message': f'Possible duplicate transaction: {payee} - ${amount:.2f}',
-                    'examples': trans_ids
-                })
+        # Sort by (payee, date, amount) and find runs of equal keys
+        _, date_code = np.unique(frame.date.astype(str), return_inverse=True)
+        order = np.lexsort((frame.amount, date_code, frame.payee_code))
+        same = ((np.diff(frame.payee_code[order]) == 0)
+                & (np.diff(date_code[order]) == 0)
+                & (np.diff(frame.amount[order]) == 0))
+        starts = np.flatnonzero(np.r_[True, ~same])
+        sizes = np.diff(np.r_[starts, len(order)])
+        
+        for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+            rows = order[start:start + size]
+            first = rows[0]
+            payee, amount, date = frame.payee[first], frame.amount[first], frame.date[first]
+            proposals.append({
+                'type': 'URGENCY',
+                'target': 'TRANSACTION',
+                'criteria': {
+                    'field': 'DUPLICATE_CHECK',
+                    'operator': 'SAME_PAYEE_AMOUNT_DATE',
+                    'value': None
+                },
+                'action': 'SET_URGENCY',
+                'value': 'URGENT',
+                'confidence': 0.95,
+                'reason': f'Potential duplicate: {payee} - ${amount:.2f} on {date}',
+                'notification': 'ALERT',
+                'notification_message': f'Possible duplicate transaction: {payee} - ${amount:.2f}',
+                'examples': list(frame.ids[rows])
+            })
         
         return proposals
     
-    def _analyze_category_patterns(self, trans_list):
+    def _analyze_category_patterns(self, frame, payees):
         """Analyze and suggest category assignments"""
         proposals = []
         
-        # Analyze transactions without categories
-        uncategorized = []
-        
-        for trans_id in trans_list:
-            trans = self.qm.read("TRANSACTION", trans_id)
-            if trans:
-                category = trans.get(5)
-                if not category or category == "":
-                    uncategorized.append({
-                        'id': trans_id,
-                        'payee': trans.get(3) or trans.get(2),
-                        'amount': float(trans.get(4, 0)),
-                        'memo': trans.get(7, "")
-                    })
-        
-        # Group by payee and suggest categories
-        payee_categories = defaultdict(list)
-        
-        for trans in uncategorized:
-            payee = trans['payee']
+        # Default category per distinct payee, broadcast to uncategorized rows
+        defaults = np.array([payees.default_category(name) for name in frame.payee_names], dtype=str)
+        row_default = defaults[frame.payee_code]
+        suggest = (frame.category == '') & (row_default != '')
+        
+        for row in np.flatnonzero(suggest):
+            payee = frame.payee[row]
+            default_category = row_default[row]
             
-            # Check if this payee has a default category
-            payee_rec = self._find_payee_by_name(payee)
-            if payee_rec and payee_rec.get(3):  # DEFAULT_CATEGORY
-                default_category = payee_rec.get(3)
-                
-                proposals.append({
-                    'type': 'CATEGORY',
-                    'target': 'TRANSACTION',
-                    'criteria': {
-                        'field': 'STANDARDIZED_PAYEE',
+            proposals.append({
+                'type': 'CATEGORY',
+                'target': 'TRANSACTION',
+                'criteria': {
+                    'field': 'STANDARDIZED_PAYEE',
+                    'operator': '=',
+                    'value': payee,
+                    'and': {
+                        'field': 'CATEGORY',
                         'operator': '=',
-                        'value': payee,
-                        'and': {
-                            'field': 'CATEGORY',
-                            'operator': '=',
-                            'value': ''
-                        }
-                    },
-                    'action': 'SET_CATEGORY',
-                    'value': default_category,
-                    'confidence': 0.90,
-                    'reason': f'Payee {payee} typically categorized as {default_category}',
-                    'notification': 'SILENT',
-                    'examples': [trans['id']]
-                })
+                        'value': ''
+                    }
+                },
+                'action': 'SET_CATEGORY',
+                'value': default_category,
+                'confidence': 0.90,
+                'reason': f'Payee {payee} typically categorized as {default_category}',
+                'notification': 'SILENT',
+                'examples': [frame.ids[row]]
+            })
         
         return proposals
     
-    def _find_payee_by_name(self, payee_name):
-        """Find payee record by name"""
-        all_payees = self.qm.select("PAYEE")
-        for payee_id in all_payees:
-            payee_rec = self.qm.read("PAYEE", payee_id)
-            if payee_rec and payee_rec.get(1) == payee_name:
-                return payee_rec
-        return None
+    def analyze_anomalies(self, batch_id=None, frame=None, day_window=DAY_WINDOW,
+                          amount_tolerance=AMOUNT_TOLERANCE):
+        """
+        Batch anomaly detection over the transaction history:
+        - Near-duplicates (same payee, dates within day_window, amounts within tolerance)
+        - Robust outliers (modified z-score against the payee's median/MAD)
+        - Frequency bursts (rolling count far above the payee's normal rate)
+        """
+        print("Analyzing transactions for anomalies...")
+        start = time.time()
+        
+        if frame is None:
+            frame = self._load_frame(batch_id)
+        
+        if not len(frame):
+            print("No transactions found.")
+            return []
+        
+        proposals = []
+        
+        for rows in near_duplicates(frame, day_window, amount_tolerance):
+            first = rows[0]
+            payee = frame.payee[first]
+            amounts = frame.amount[rows]
+            days_apart = int(frame.day[rows].max() - frame.day[rows].min())
+            proposals.append({
+                'type': 'URGENCY',
+                'target': 'TRANSACTION',
+                'criteria': {
+                    'field': 'DUPLICATE_CHECK',
+                    'operator': 'NEAR_DUPLICATE',
+                    'value': {'day_window': day_window, 'amount_tolerance': amount_tolerance}
+                },
+                'action': 'SET_URGENCY',
+                'value': 'URGENT',
+                'confidence': 0.95 if days_apart == 0 else 0.80,
+                'reason': (f'{len(rows)} charges from {payee} of ${amounts.min():.2f}-${amounts.max():.2f} '
+                           f'within {days_apart} day(s)'),
+                'notification': 'ALERT',
+                'notification_message': f'Possible duplicate charges: {payee} - ${frame.amount[first]:.2f}',
+                'examples': list(frame.ids[rows])
+            })
+        
+        stats = payee_robust_stats(frame)
+        rows, scores = robust_outliers(frame, stats)
+        for row, score in zip(rows, scores):
+            payee = frame.payee[row]
+            amount = frame.amount[row]
+            median = stats['median'][frame.payee_code[row]]
+            proposals.append({
+                'type': 'URGENCY',
+                'target': 'TRANSACTION',
+                'criteria': {
+                    'field': 'AMOUNT',
+                    'operator': 'ROBUST_Z',
+                    'value': OUTLIER_THRESHOLD
+                },
+                'action': 'SET_URGENCY',
+                'value': 'URGENT',
+                'confidence': 0.85,
+                'reason': f'Amount ${amount:.2f} is {abs(score):.1f} robust deviations from the usual ${median:.2f} for {payee}',
+                'notification': 'ALERT',
+                'notification_message': f'Unusual amount for {payee}: ${amount:.2f}',
+                'examples': [frame.ids[row]]
+            })
+        
+        # One proposal per payee, at its busiest window
+        rows, counts, expected = frequency_bursts(frame)
+        busiest = {}
+        for row, count, normal in zip(rows, counts, expected):
+            code = frame.payee_code[row]
+            if code not in busiest or count > busiest[code][1]:
+                busiest[code] = (row, count, normal)
+        for row, count, normal in busiest.values():
+            payee = frame.payee[row]
+            proposals.append({
+                'type': 'NOTIFICATION',
+                'target': 'TRANSACTION',
+                'criteria': {
+                    'field': 'STANDARDIZED_PAYEE',
+                    'operator': 'ROLLING_COUNT',
+                    'value': {'days': BURST_WINDOW, 'factor': BURST_FACTOR}
+                },
+                'action': 'NOTIFY',
+                'value': 'NOTIFY',
+                'confidence': 0.75,
+                'reason': f'{count} charges from {payee} in {BURST_WINDOW} days (normally {normal:.1f})',
+                'notification': 'NOTIFY',
+                'notification_message': f'Frequent charges: {payee} ({count} in {BURST_WINDOW} days)',
+                'examples': [frame.ids[row]]
+            })
+        
+        print(f"Analyzed {len(frame)} transactions in {time.time() - start:.3f}s")
+        return proposals
     
     def analyze_tasks(self):
         """
@@ -588,7 +684,8 @@ class AIClassifier:
     
     def close(self):
         """Close QM connection"""
-        self.qm.disconnect()
+        if self.qm is not None:
+            self.qm.disconnect()
 
 
 def main():
@@ -598,7 +695,13 @@ def main():
         sys.exit(1)
     
     command = sys.argv[1]
-    classifier = AIClassifier()
+    csv_path = None
+    if "--csv" in sys.argv:
+        idx = sys.argv.index("--csv")
+        if idx + 1 < len(sys.argv):
+            csv_path = sys.argv[idx + 1]
+    
+    classifier = AIClassifier(offline=csv_path is not None)
     
     try:
         if command == "analyze-transactions":
@@ -608,10 +711,38 @@ def main():
                 if idx + 1 < len(sys.argv):
                     batch_id = sys.argv[idx + 1]
             
-            proposals = classifier.analyze_transactions(batch_id)
+            frame = TransactionFrame.from_csv(csv_path) if csv_path else None
+            proposals = classifier.analyze_transactions(batch_id, frame,
+                                                        full_rebuild="--full-rebuild" in sys.argv)
             if proposals:
                 classifier.save_proposals(proposals)
                 print(f"\nGenerated {len(proposals)} classification proposals")
+            classifier.save_state()
+        
+        elif command == "analyze-anomalies":
+            batch_id = None
+            if "--batch-id" in sys.argv:
+                idx = sys.argv.index("--batch-id")
+                if idx + 1 < len(sys.argv):
+                    batch_id = sys.argv[idx + 1]
+            
+            day_window = DAY_WINDOW
+            if "--days" in sys.argv:
+                idx = sys.argv.index("--days")
+                if idx + 1 < len(sys.argv):
+                    day_window = int(sys.argv[idx + 1])
+            
+            tolerance = AMOUNT_TOLERANCE
+            if "--tolerance" in sys.argv:
+                idx = sys.argv.index("--tolerance")
+                if idx + 1 < len(sys.argv):
+                    tolerance = float(sys.argv[idx + 1])
+            
+            frame = TransactionFrame.from_csv(csv_path) if csv_path else None
+            proposals = classifier.analyze_anomalies(batch_id, frame, day_window, tolerance)
+            if proposals:
+                classifier.save_proposals(proposals)
+                print(f"\nGenerated {len(proposals)} anomaly proposals")
         
         elif command == "analyze-tasks":
             proposals = classifier.analyze_tasks()
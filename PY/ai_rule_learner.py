@@ -11,7 +11,7 @@ to propose new rules or modifications to existing rules. It follows the principl
 4. User decisions feed back into the learning system
 
 Usage:
-    python PY/ai_rule_learner.py analyze [--batch-id BATCH_ID] [--confidence 0.8]
+    python PY/ai_rule_learner.py analyze [--batch-id BATCH_ID] [--confidence 0.8] [--full-rebuild]
     python PY/ai_rule_learner.py review [--pending-only]
     python PY/ai_rule_learner.py apply [--rule-id RULE_ID]
 """
@@ -21,33 +21,39 @@ import os
 import json
 from datetime import datetime
 from collections import defaultdict
-import re
-
-# Add QM bin directory to path for QMClient
-sys.path.insert(0, "C:\\QMSYS\\bin")
 
 try:
-    import qmclient as qm
+    from qm_records import RecordClient
+    from classification_state import ClassificationState
+    from payee_matcher import clean_payee_name
+    from payee_clusters import cluster_names, rule_prefix
 except ImportError:
     print("ERROR: QMClient not available")
-    print("Make sure qmclient.py is in C:\\QMSYS\\bin")
+    print("Make sure qmclient.py is in C:\\QMSYS\\SYSCOM")
     sys.exit(1)
 
+# Hot files read repeatedly while learning (seconds)
+CACHE_TTLS = {'TRANSACTION': 120, 'PAYEE': 600}
+
 
 class AIRuleLearner:
     """AI-assisted rule learning for transaction processing"""
     
     def __init__(self, account="HAL"):
-        # Connect to QM using qmclient module
-        self.session = qm.Connect('localhost', 4243, account, '', '')
-        if not self.session:
-            raise Exception("Failed to connect to QM")
+        # Pooled QM session with cached record reads
+        self.qm = RecordClient(account, cache=CACHE_TTLS)
         self.confidence_threshold = 0.8
+        self.state_file = "config/rule_learner_state.json"
+        self.state = None
         
-    def analyze_unmatched_transactions(self, batch_id=None):
+    def analyze_unmatched_transactions(self, batch_id=None, full_rebuild=False):
         """
         Analyze transactions that don't match any rules.
         Returns proposed rules with confidence scores.
+        
+        Without a batch id only transactions imported since the last run
+        are read, plus earlier unmatched one-offs carried over so they can
+        still pair up with new imports.
         """
         print("Analyzing unmatched transactions...")
         
@@ -55,8 +61,9 @@ class AIRuleLearner:
         query = "SELECT TRANSACTION WITH STANDARDIZED.PAYEE = ''"
         if batch_id:
             query += f" AND IMPORT.BATCH.ID = '{batch_id}'"
-        
-        trans_list = self.qm.select("TRANSACTION", query)
+            trans_list = self.qm.select("TRANSACTION", query)
+        else:
+            trans_list = self._select_new(query, full_rebuild)
         
         if not trans_list:
             print("No unmatched transactions found.")
@@ -76,17 +83,40 @@ class AIRuleLearner:
         
         return proposals
     
+    def _select_new(self, query, full_rebuild=False):
+        """Unmatched ids past the watermark, plus carried-over one-offs"""
+        self.state = ClassificationState(self.state_file)
+        if full_rebuild:
+            print("Full rebuild: discarding watermark")
+            self.state.reset()
+        elif self.state.watermark:
+            print(f"Resuming after {self.state.watermark} (batch {self.state.batch_id})")
+        
+        new_ids = self.state.new_ids(self.qm.select("TRANSACTION", self.state.select_query(query)))
+        self.state.advance(new_ids)
+        
+        # Carried ids may have been standardized since; _extract_patterns skips those
+        seen = set(new_ids)
+        carried = [trans_id for trans_id in self.state.carry if trans_id not in seen]
+        return carried + new_ids
+    
+    def save_state(self):
+        """Persist the watermark after the run's proposals are saved"""
+        if self.state is not None:
+            self.state.save()
+    
     def _extract_patterns(self, trans_list):
         """
         Extract patterns from unmatched transactions.
-        Groups similar payee names together.
+        Groups similar payee names together: exact cleaned names first, then
+        near-identical cleaned names ("BURGER FI MORRISVILLE" / "BURGERFI")
+        are merged by payee_clusters.
         """
         # Group by cleaned payee name
         groups = defaultdict(list)
         
-        for trans_id in trans_list:
-            trans = self.qm.read("TRANSACTION", trans_id)
-            if trans:
+        for trans_id, trans in self.qm.read_many("TRANSACTION", trans_list).items():
+            if trans and not trans.get(3, ""):  # still no STANDARDIZED_PAYEE
                 original_payee = trans.get(2, "")  # ORIGINAL_PAYEE
                 
                 # Clean and normalize
@@ -102,16 +132,36 @@ class AIRuleLearner:
                     'date': trans.get(1, "")
                 })
         
+        # Merge fuzzy clusters of cleaned names
+        names = [name for name in groups if name]
+        clusters = [[names[i] for i in cluster] for cluster in cluster_names(names)]
+        if "" in groups:
+            clusters.append([""])
+        
+        # Every payee in the batch - a STARTS.WITH prefix must not match outside its cluster
+        population = sorted({t['original'].upper() for ts in groups.values() for t in ts})
+        
         # Convert to list of pattern groups
         pattern_groups = []
-        for cleaned_name, transactions in groups.items():
-            if len(transactions) >= 2:  # Only if pattern appears multiple times
-                pattern_groups.append({
-                    'cleaned_name': cleaned_name,
-                    'transactions': transactions,
-                    'count': len(transactions),
-                    'variations': list(set([t['original'] for t in transactions]))
-                })
+        carry = []
+        for cluster in clusters:
+            transactions = [t for name in cluster for t in groups[name]]
+            if len(transactions) < 2:  # Only if pattern appears multiple times
+                carry.extend(t['id'] for t in transactions)
+                continue
+            variations = list(set([t['original'] for t in transactions]))
+            pattern_groups.append({
+                # Most frequent spelling names the cluster
+                'cleaned_name': max(cluster, key=lambda name: len(groups[name])),
+                'transactions': transactions,
+                'count': len(transactions),
+                'variations': variations,
+                'prefix': rule_prefix(variations, population)
+            })
+        
+        # One-offs are carried to the next incremental run to pair with new imports
+        if self.state is not None:
+            self.state.carry = carry
         
         # Sort by frequency
         pattern_groups.sort(key=lambda x: x['count'], reverse=True)
@@ -120,35 +170,8 @@ class AIRuleLearner:
     
     def _clean_payee_name(self, payee):
         """Clean and normalize payee name for pattern matching"""
-        if not payee:
-            return ""
-        
-        # Convert to uppercase
-        cleaned = payee.upper()
-        
-        # Remove common suffixes
-        suffixes = [
-            r'#\d+',           # #123
-            r'\d{3,}',         # 000, 1234
-            r'- PURCHASE',
-            r'- PAYMENT',
-            r'\*+',            # ***
-            r'\.COM',
-            r'\.NET',
-            r'\.ORG',
-            r'\s+INC\.?',
-            r'\s+LLC\.?',
-            r'\s+CORP\.?',
-            r'\s+CO\.?',
-        ]
-        
-        for suffix in suffixes:
-            cleaned = re.sub(suffix, '', cleaned)
-        
-        # Remove extra whitespace
-        cleaned = ' '.join(cleaned.split())
-        
-        return cleaned.strip()
+        # Precompiled and memoized - the same raw payees recur in every import
+        return clean_payee_name(payee)
     
     def _generate_rule_proposal(self, pattern_group):
         """
@@ -159,6 +182,7 @@ class AIRuleLearner:
         transactions = pattern_group['transactions']
         variations = pattern_group['variations']
         count = pattern_group['count']
+        prefix = pattern_group.get('prefix', '')
         
         # Determine rule type based on variation analysis
         if len(variations) == 1:
@@ -166,10 +190,10 @@ class AIRuleLearner:
             rule_type = "EXACT.MATCH"
             pattern = variations[0]
             confidence = 0.95
-        elif all(v.upper().startswith(cleaned_name[:5]) for v in variations if len(cleaned_name) >= 5):
-            # All start with same prefix
+        elif prefix:
+            # All start with the same words, and no other payee does
             rule_type = "STARTS.WITH"
-            pattern = cleaned_name[:min(len(cleaned_name), 10)]
+            pattern = prefix
             confidence = 0.90
         else:
             # Contains pattern
@@ -413,15 +437,18 @@ def main():
             # Parse options
             batch_id = None
             confidence = 0.8
+            full_rebuild = False
             
             for i, arg in enumerate(sys.argv[2:]):
                 if arg == "--batch-id" and i + 1 < len(sys.argv) - 2:
                     batch_id = sys.argv[i + 3]
                 elif arg == "--confidence" and i + 1 < len(sys.argv) - 2:
                     confidence = float(sys.argv[i + 3])
+                elif arg == "--full-rebuild":
+                    full_rebuild = True
             
             learner.confidence_threshold = confidence
-            proposals = learner.analyze_unmatched_transactions(batch_id)
+            proposals = learner.analyze_unmatched_transactions(batch_id, full_rebuild)
             
             if proposals:
                 learner.save_proposals(proposals)
@@ -429,6 +456,7 @@ def main():
                 print("Review with: python PY/ai_rule_learner.py review")
             else:
                 print("No patterns found requiring new rules")
+            learner.save_state()
         
         elif command == "review":
             pending_only = "--all" not in sys.argv
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+AI.SERVER Client - Multiplexed asyncio front-end for the AI.SERVER phantom
+
+BP AI.SERVER is single-threaded and serves one TCP connection at a time.
+Instead of every caller opening a fresh socket per message, this module
+keeps a small fixed set of persistent ("keep_alive") connections and
+pipelines requests over them, matching replies by request_id.
+
+Async usage:
+    from ai_server_client import get_client
+
+    client = get_client()
+    reply = await client.request({'type': 'text_input', 'text': 'what time is it'})
+
+Sync usage (runs on a shared background event loop):
+    from ai_server_client import request_sync
+    reply = request_sync({'type': 'text_input', 'text': 'hello'}, timeout=5.0)
+
+Proxy mode - lets other processes share the persistent connections by
+pointing AI_SERVER_PORT at the proxy instead of the phantom:
+    python ai_server_client.py --listen 8746
+
+Notes:
+- AI.SERVER drops a keep-alive connection after it has been idle for
+  KEEPALIVE.IDLE.MS, so direct (legacy) clients still get a turn. A
+  connection idle for IDLE_REOPEN is re-opened before the next request
+  is written. A request that was written is never re-sent: the phantom
+  may already have run it.
+- Because the phantom only serves one connection at a time, extra
+  connections only help when several AI.SERVER phantoms share the port
+  behind a balancer; AI_SERVER_CONNECTIONS defaults to 1.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from framed_stream import FrameProtocol, encode_frame
+
+# Configuration
+AI_SERVER_HOST = os.getenv("AI_SERVER_HOST", "10.1.34.103")
+AI_SERVER_PORT = int(os.getenv("AI_SERVER_PORT", "8745"))
+AI_SERVER_CONNECTIONS = int(os.getenv("AI_SERVER_CONNECTIONS", "1"))
+
+PIPELINE_DEPTH = 8         # requests in flight per connection
+DEFAULT_DEADLINE = 5.0     # seconds per request, including queue time
+CONNECT_TIMEOUT = 3.0
+IDLE_REOPEN = 1.5          # seconds; AI.SERVER drops keep-alives idle for KEEPALIVE.IDLE.MS (2000)
+PROXY_PORT = 8746
+
+
+class AIServerError(Exception):
+    """Raised when AI.SERVER cannot answer a request"""
+
+
+class AIServerTimeout(AIServerError):
+    """Raised when a request misses its deadline"""
+
+
+class _Connection:
+    """One persistent, pipelined connection to AI.SERVER"""
+
+    def __init__(self, host: str, port: int, stats: Dict):
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self.transport: Optional[asyncio.Transport] = None
+        self.pending: "OrderedDict[str, asyncio.Future]" = OrderedDict()  # callers still waiting
+        self._written: "OrderedDict[str, None]" = OrderedDict()  # ids awaiting a reply, in send order
+        self.last_activity = 0.0
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self.transport is not None and not self.transport.is_closing()
+
+    async def connect(self):
+        async with self._connect_lock:
+            if self.connected:
+                return
+            loop = asyncio.get_event_loop()
+            self.transport, _ = await asyncio.wait_for(
+                loop.create_connection(self._protocol, self.host, self.port),
+                CONNECT_TIMEOUT)
+            self.stats['connects'] += 1
+
+    async def send(self, request_id: str, message: Dict) -> asyncio.Future:
+        """Write one request and return the future its reply will resolve"""
+        if (self.connected and not self.pending
+                and time.monotonic() - self.last_activity > IDLE_REOPEN):
+            # The phantom is about to drop it - a request written now could be lost.
+            # Only abandoned requests (if any) are still unanswered on it.
+            self._close(AIServerError("AI.SERVER keep-alive connection idle"))
+        if not self.connected:
+            await self.connect()
+        future = asyncio.get_event_loop().create_future()
+        self.pending[request_id] = future
+        self._written[request_id] = None
+        # A caller that gives up (deadline) stops counting as load straight away
+        future.add_done_callback(lambda _, rid=request_id: self.pending.pop(rid, None))
+        self.transport.write(encode_frame(dict(message, request_id=request_id, keep_alive=True)))
+        self.last_activity = time.monotonic()
+        return future
+
+    def _on_frame(self, frame: bytes):
+        try:
+            reply = json.loads(frame)
+        except ValueError:
+            print(f"[AI.SERVER] Bad reply: {frame[:200]!r}")
+            reply = {'status': 'error', 'text': 'Malformed reply from AI.SERVER'}
+
+        self.last_activity = time.monotonic()
+        # Replies come back in order; older AI.SERVER builds do not echo request_id.
+        # Abandoned requests stay in _written so a late reply is matched and dropped.
+        request_id = reply.pop('request_id', None)
+        if request_id not in self._written:
+            if not self._written:
+                return
+            request_id = next(iter(self._written))
+        del self._written[request_id]
+        future = self.pending.pop(request_id, None)
+        if future is not None and not future.done():
+            future.set_result(reply)
+
+    def _protocol(self) -> FrameProtocol:
+        protocol = FrameProtocol(self._on_frame, lambda exc: self._on_close(protocol, exc))
+        return protocol
+
+    def _on_close(self, protocol: FrameProtocol, exc: Optional[Exception]):
+        if protocol.transport is not self.transport:
+            return  # a connection that was already replaced
+        self._close(AIServerError(f"AI.SERVER connection closed{f': {exc}' if exc else ''}"))
+
+    def _close(self, error: Exception):
+        transport, self.transport = self.transport, None
+        if transport is not None:
+            transport.close()
+        pending, self.pending = self.pending, OrderedDict()
+        self._written = OrderedDict()
+        for future in list(pending.values()):
+            if not future.done():
+                future.set_exception(error)
+
+    def close(self):
+        self._close(AIServerError("AI.SERVER client closed"))
+
+
+class AIServerClient:
+    """Awaitable client multiplexing many callers over a few AI.SERVER connections"""
+
+    def __init__(self, host: str = AI_SERVER_HOST, port: int = AI_SERVER_PORT,
+                 connections: int = AI_SERVER_CONNECTIONS,
+                 pipeline_depth: int = PIPELINE_DEPTH):
+        self.host = host
+        self.port = port
+        self.stats = {'requests': 0, 'replies': 0, 'timeouts': 0,
+                      'errors': 0, 'retries': 0, 'connects': 0}
+        self._connections = [_Connection(host, port, self.stats)
+                             for _ in range(max(connections, 1))]
+        self._slots = asyncio.Semaphore(len(self._connections) * pipeline_depth)
+        self._ids = itertools.count(1)
+
+    def _pick(self) -> _Connection:
+        """Least-loaded connection, preferring ones already open"""
+        return min(self._connections, key=lambda c: (len(c.pending), not c.connected))
+
+    async def _send(self, message: Dict) -> Dict:
+        async with self._slots:
+            for attempt in range(2):
+                connection = self._pick()
+                try:
+                    future = await connection.send(str(next(self._ids)), message)
+                except (OSError, asyncio.TimeoutError):
+                    # Not written yet (connect failed) - safe to try a fresh connection
+                    if attempt:
+                        raise
+                    self.stats['retries'] += 1
+                    connection.close()
+                    continue
+                # Once written it is never re-sent: the phantom may already have run it
+                return await future
+
+    async def request(self, message: Dict, timeout: float = DEFAULT_DEADLINE) -> Dict:
+        """Send a message and await its reply within the deadline"""
+        self.stats['requests'] += 1
+        try:
+            reply = await asyncio.wait_for(self._send(message), timeout)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            raise AIServerTimeout(f"AI.SERVER did not answer within {timeout}s")
+        except (OSError, AIServerError) as e:
+            self.stats['errors'] += 1
+            raise AIServerError(str(e))
+        self.stats['replies'] += 1
+        return reply
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, connected=sum(c.connected for c in self._connections),
+                    pending=sum(len(c.pending) for c in self._connections))
+
+    def close(self):
+        for connection in self._connections:
+            connection.close()
+
+
+# One client per (event loop, host, port)
+_clients: Dict[Tuple[int, str, int], AIServerClient] = {}
+
+
+def get_client(host: str = AI_SERVER_HOST, port: int = AI_SERVER_PORT) -> AIServerClient:
+    """Get the shared client for the running event loop"""
+    key = (id(asyncio.get_event_loop()), host, port)
+    client = _clients.get(key)
+    if client is None:
+        client = AIServerClient(host, port)
+        _clients[key] = client
+    return client
+
+
+# Background loop for synchronous callers
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_lock = threading.Lock()
+
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    global _sync_loop
+    with _sync_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="ai-server-client",
+                             daemon=True).start()
+        return _sync_loop
+
+
+def request_sync(message: Dict, timeout: float = DEFAULT_DEADLINE,
+                 host: str = AI_SERVER_HOST, port: int = AI_SERVER_PORT) -> Dict:
+    """Blocking wrapper around AIServerClient.request for non-async callers"""
+    async def _run():
+        return await get_client(host, port).request(message, timeout)
+
+    future = asyncio.run_coroutine_threadsafe(_run(), _get_sync_loop())
+    return future.result(timeout + CONNECT_TIMEOUT)
+
+
+# === Proxy mode ===
+
+async def _proxy_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                            client: AIServerClient):
+    """Forward newline-delimited requests from one local client"""
+    try:
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            try:
+                message = json.loads(line)
+                request_id = message.pop('request_id', None)
+                keep_alive = message.pop('keep_alive', False)
+                reply = await client.request(message)
+            except ValueError:
+                request_id, keep_alive = None, False
+                reply = {'status': 'error', 'text': 'Invalid JSON'}
+            except AIServerError as e:
+                reply = {'status': 'error', 'text': str(e)}
+            if request_id is not None:
+                reply['request_id'] = request_id
+            writer.write(json.dumps(reply).encode() + b'\n')
+            await writer.drain()
+            if not keep_alive:
+                break
+    except OSError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_proxy(listen_port: int = PROXY_PORT, host: str = AI_SERVER_HOST,
+                      port: int = AI_SERVER_PORT):
+    """Run a local AI.SERVER-compatible listener backed by persistent connections"""
+    client = AIServerClient(host, port)
+    server = await asyncio.start_server(
+        lambda r, w: _proxy_connection(r, w, client), '0.0.0.0', listen_port)
+    print(f"[AI.SERVER Proxy] Listening on {listen_port} -> {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    if '--listen' in sys.argv:
+        idx = sys.argv.index('--listen')
+        listen = int(sys.argv[idx + 1]) if len(sys.argv) > idx + 1 else PROXY_PORT
+        asyncio.run(serve_proxy(listen))
+    else:
+        start = time.time()
+        print(request_sync({'type': 'text_input', 'text': ' '.join(sys.argv[1:]) or 'what time is it',
+                            'session_id': 'cli'}))
+        print(f"{(time.time() - start) * 1000:.0f}ms")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Audio Frames - Binary PCM16 / Opus WebSocket frames for audio_stream
+
+Browsers used to send microphone audio as JSON text:
+    {"type": "audio_stream", "audio": [12, -40, 311, ...]}
+which is 4-6x the size of the audio and had to be converted sample by
+sample. Clients can now send the audio itself as a binary WebSocket
+message: a 12-byte header followed by the payload.
+
+    offset  size  field
+    0       2     magic b'HA'
+    2       1     version (1)
+    3       1     codec: 0 = PCM16 little-endian mono, 1 = one Opus packet
+    4       4     sample rate, uint32 LE (must be 16000)
+    8       4     sequence number, uint32 LE (gaps are counted as lost frames)
+    12      ...   payload
+
+PCM is decoded with np.frombuffer (no per-sample Python work); Opus needs
+opuslib and a decoder per session, so FrameDecoder is kept per connection.
+The gateways advertise what they accept in their 'connected' message
+(capabilities()); JSON audio_stream messages still work for old clients.
+
+Usage:
+    from audio_frames import FrameDecoder, capabilities, decode_json_audio
+
+    decoder = FrameDecoder()
+    samples = decoder.decode(message)              # bytes -> np.int16 array
+    samples = decode_json_audio(data['audio'])     # legacy JSON list
+"""
+
+import struct
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    import opuslib
+    OPUS_AVAILABLE = True
+except ImportError:
+    OPUS_AVAILABLE = False
+
+MAGIC = b'HA'
+VERSION = 1
+CODEC_PCM16 = 0
+CODEC_OPUS = 1
+SAMPLE_RATE = 16000
+HEADER = struct.Struct('<2sBBII')
+OPUS_MAX_SAMPLES = SAMPLE_RATE * 120 // 1000  # longest Opus frame is 120 ms
+
+_PCM16 = np.dtype('<i2')
+
+
+class FrameError(ValueError):
+    """A binary frame that cannot be decoded"""
+
+
+def capabilities() -> Dict:
+    """What the gateway accepts - sent to clients in the 'connected' message"""
+    codecs = ['pcm16'] + (['opus'] if OPUS_AVAILABLE else [])
+    return {'version': VERSION, 'codecs': codecs, 'sample_rate': SAMPLE_RATE,
+            'header_bytes': HEADER.size}
+
+
+def encode_frame(samples: np.ndarray, seq: int = 0) -> bytes:
+    """PCM16 frame for int16 samples (test clients and tools)"""
+    return (HEADER.pack(MAGIC, VERSION, CODEC_PCM16, SAMPLE_RATE, seq & 0xFFFFFFFF)
+            + np.asarray(samples, dtype=_PCM16).tobytes())
+
+
+def decode_json_audio(audio: List) -> np.ndarray:
+    """Legacy JSON audio_stream list -> int16 samples (clamped to int16)"""
+    samples = np.asarray(audio, dtype=np.int32)
+    return np.clip(samples, -32768, 32767).astype(np.int16)
+
+
+class FrameDecoder:
+    """Decodes one connection's binary audio frames (Opus state is per stream)"""
+
+    def __init__(self):
+        self._opus = None
+        self.next_seq = None
+        self.frames = 0
+        self.lost = 0
+        self.bytes = 0
+
+    def decode(self, message: bytes) -> np.ndarray:
+        """Binary frame -> int16 samples; raises FrameError on a bad frame"""
+        if len(message) < HEADER.size:
+            raise FrameError(f"frame too short ({len(message)} bytes)")
+        magic, version, codec, rate, seq = HEADER.unpack_from(message)
+        if magic != MAGIC or version != VERSION:
+            raise FrameError("not an audio frame (bad magic or version)")
+        if rate != SAMPLE_RATE:
+            raise FrameError(f"unsupported sample rate {rate} (send {SAMPLE_RATE})")
+
+        if self.next_seq is not None and seq != self.next_seq:
+            self.lost += (seq - self.next_seq) & 0xFFFFFFFF
+        self.next_seq = (seq + 1) & 0xFFFFFFFF
+        self.frames += 1
+        self.bytes += len(message)
+
+        payload = memoryview(message)[HEADER.size:]
+        if codec == CODEC_PCM16:
+            if len(payload) % 2:
+                raise FrameError("odd PCM16 payload length")
+            # Little-endian on the wire; astype copies only on big-endian hosts
+            return np.frombuffer(payload, dtype=_PCM16).astype(np.int16, copy=False)
+        if codec == CODEC_OPUS:
+            return self._decode_opus(bytes(payload))
+        raise FrameError(f"unknown codec {codec}")
+
+    def _decode_opus(self, packet: bytes) -> np.ndarray:
+        if not OPUS_AVAILABLE:
+            raise FrameError("opus frames not supported (opuslib not installed)")
+        if self._opus is None:
+            self._opus = opuslib.Decoder(SAMPLE_RATE, 1)
+        try:
+            pcm = self._opus.decode(packet, OPUS_MAX_SAMPLES)
+        except opuslib.OpusError as e:
+            raise FrameError(f"opus decode failed: {e}")
+        return np.frombuffer(pcm, dtype=np.int16)
+
+    def get_stats(self) -> Dict:
+        return {'frames': self.frames, 'lost': self.lost, 'bytes': self.bytes}
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Classification State - Import-batch watermarks and running payee aggregates
+
+Lets ai_classifier / ai_rule_learner process only transactions imported
+since their last run instead of rescanning the whole TRANSACTION file.
+
+TRANSACTION keys and IMPORT.BATCH.ID come from the import programs:
+    batch_id = DATE() : "-" : TIME()        e.g. 21119-3996
+    trans_id = batch_id : "-" : count       e.g. 21119-3996-17
+so keys order numerically by (date, time, count). The watermark is the
+highest key processed; the SELECT is narrowed to batches on or after the
+watermark day and the exact cut is made here.
+
+Per-payee aggregates (count, sum, sum of squares, first/last seen day) are
+updated from each new frame, so mean/variance over the full history are
+available in O(new rows).
+
+State is kept in JSON next to the proposals files:
+    state = ClassificationState("config/classification_state.json")
+    ids = state.new_ids(all_ids)
+    ...
+    state.update_payees(frame)
+    state.advance(ids)
+    state.save()
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def key_order(trans_id: str) -> Optional[Tuple[int, ...]]:
+    """Numeric sort key for 'date-time[-count]' ids, or None if not in that form"""
+    try:
+        parts = tuple(int(p) for p in str(trans_id).split('-'))
+    except ValueError:
+        return None
+    return parts if len(parts) >= 2 else None
+
+
+class ClassificationState:
+    """Watermark + running per-payee aggregates persisted as JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.reset()
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            self.watermark = data.get('watermark')
+            self.batch_id = data.get('batch_id')
+            self.unordered = set(data.get('unordered', []))
+            self.carry = data.get('carry', [])
+            self.payees = data.get('payees', {})
+            self.updated = data.get('updated')
+
+    def reset(self):
+        """Forget everything (used by --full-rebuild)"""
+        self.watermark: Optional[str] = None   # highest transaction key processed
+        self.batch_id: Optional[str] = None    # IMPORT.BATCH.ID of that key
+        self.unordered = set()                 # processed ids that carry no ordering
+        self.carry: List[str] = []             # ids a tool wants to look at again
+        self.payees: Dict[str, Dict] = {}
+        self.updated: Optional[str] = None
+
+    def select_query(self, base: str) -> str:
+        """Narrow a SELECT to batches imported on or after the watermark day"""
+        if not self.watermark:
+            return base
+        day = self.watermark.split('-')[0]
+        joiner = ' AND ' if ' WITH ' in base.upper() else ' WITH '
+        return f"{base}{joiner}IMPORT.BATCH.ID >= '{day}'"
+
+    def new_ids(self, ids: Iterable[str]) -> List[str]:
+        """Ids past the watermark (plus unordered ids not seen before)"""
+        mark = key_order(self.watermark) if self.watermark else None
+        result = []
+        for trans_id in ids:
+            order = key_order(trans_id)
+            if order is None:
+                if trans_id not in self.unordered:
+                    result.append(trans_id)
+            elif mark is None or order > mark:
+                result.append(trans_id)
+        return result
+
+    def advance(self, ids: Iterable[str]):
+        """Move the watermark past the given (processed) ids"""
+        best = key_order(self.watermark) if self.watermark else None
+        for trans_id in ids:
+            order = key_order(trans_id)
+            if order is None:
+                self.unordered.add(trans_id)
+            elif best is None or order > best:
+                best = order
+                self.watermark = trans_id
+        if self.watermark:
+            self.batch_id = '-'.join(self.watermark.split('-')[:2])
+
+    def update_payees(self, frame):
+        """Fold a frame's rows into the running per-payee aggregates"""
+        if not len(frame):
+            return
+        size = len(frame.payee_names)
+        code = frame.payee_code
+        counts = np.bincount(code, minlength=size)
+        sums = np.bincount(code, weights=frame.amount, minlength=size)
+        squares = np.bincount(code, weights=frame.amount ** 2, minlength=size)
+
+        valid = frame.day >= 0
+        first = np.full(size, np.iinfo(np.int64).max)
+        last = np.full(size, -1)
+        np.minimum.at(first, code[valid], frame.day[valid])
+        np.maximum.at(last, code[valid], frame.day[valid])
+
+        for i, name in enumerate(frame.payee_names.tolist()):
+            agg = self.payees.setdefault(name, {'count': 0, 'sum': 0.0, 'sumsq': 0.0,
+                                               'first_seen': None, 'last_seen': None})
+            agg['count'] += int(counts[i])
+            agg['sum'] += float(sums[i])
+            agg['sumsq'] += float(squares[i])
+            if last[i] >= 0:
+                agg['last_seen'] = max(agg['last_seen'] or 0, int(last[i]))
+                agg['first_seen'] = min(agg['first_seen'] or int(first[i]), int(first[i]))
+
+    def payee_arrays(self, names: np.ndarray) -> Dict[str, np.ndarray]:
+        """count / mean / std from the running aggregates for the given payee names"""
+        aggs = [self.payees.get(name) for name in names.tolist()]
+        count = np.array([a['count'] if a else 0 for a in aggs], dtype=np.int64)
+        total = np.array([a['sum'] if a else 0.0 for a in aggs])
+        sumsq = np.array([a['sumsq'] if a else 0.0 for a in aggs])
+        n = np.maximum(count, 1)
+        mean = total / n
+        std = np.sqrt(np.maximum(sumsq / n - mean ** 2, 0.0))
+        return {'count': count, 'mean': mean, 'std': std}
+
+    def overall_mean(self) -> float:
+        """Mean amount over every transaction folded in so far"""
+        count = sum(a['count'] for a in self.payees.values())
+        total = sum(a['sum'] for a in self.payees.values())
+        return total / count if count else 0.0
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.updated = datetime.now().isoformat()
+        with open(self.path, 'w') as f:
+            json.dump({
+                'watermark': self.watermark,
+                'batch_id': self.batch_id,
+                'updated': self.updated,
+                'unordered': sorted(self.unordered),
+                'carry': self.carry,
+                'payees': self.payees
+            }, f, indent=2)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Conversation Context - Per-session turn history with a prompt token budget
+
+The gateways recorded turns with different keys ('utterance' / 'query' /
+'user' + 'response') and the LLM handlers embedded a fixed number of them
+however long they were. ConversationContext stores normalized turns
+({'user', 'response', 'ts'}) and fit_context() picks what goes into a
+prompt: the newest turns that fit the provider's token budget, plus a
+rolling digest of everything older.
+
+The digest is written in the background: once more than keep_turns turns
+are held, the oldest are summarized (by an async callable, normally
+QueryRouter.asummarize) and folded into the digest, so prompt size stays
+bounded however long the session runs. Without a summarizer, turns past
+max_turns are simply dropped.
+
+Usage:
+    from conversation_context import ConversationContext, fit_context
+
+    context = ConversationContext(summarize=router.asummarize)
+    context.add("what's a heat pump", "A heat pump moves heat ...")
+
+    digest, turns = fit_context(context, query, provider='ollama', budget_tokens=1024)
+"""
+
+import asyncio
+import re
+import time
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+MAX_TURNS = 10       # turns held verbatim at most
+KEEP_TURNS = 4       # newest turns never folded into the digest
+SUMMARY_BATCH = 2    # fold once this many turns are past KEEP_TURNS
+MAX_DIGEST_WORDS = 120
+
+DEFAULT_BUDGETS = {'ollama': 1024, 'openai': 2048, 'claude': 2048}
+
+# Characters per token when no tokenizer is installed (English prose)
+CHARS_PER_TOKEN = {'ollama': 3.6, 'openai': 4.0, 'claude': 3.5}
+
+_WORDS = re.compile(r'\S+')
+
+
+def normalize_turn(item: Dict) -> Dict:
+    """Any gateway's turn record -> {'user', 'response', 'ts'}"""
+    user = item.get('user') or item.get('utterance') or item.get('query') or ''
+    ts = item.get('ts') or item.get('timestamp') or time.time()
+    return {'user': user, 'response': item.get('response') or '', 'ts': ts}
+
+
+@lru_cache(maxsize=1)
+def _openai_encoding():
+    return tiktoken.get_encoding('cl100k_base')
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str, provider: str = 'ollama') -> int:
+    """Token count of text for a provider (exact for OpenAI with tiktoken, else estimated)"""
+    if not text:
+        return 0
+    if provider == 'openai' and TIKTOKEN_AVAILABLE:
+        return len(_openai_encoding().encode(text))
+    # Words are a floor: short words are still at least one token each
+    return max(len(_WORDS.findall(text)), int(len(text) / CHARS_PER_TOKEN.get(provider, 3.6)) + 1)
+
+
+def turn_tokens(turn: Dict, provider: str) -> int:
+    """Tokens of one turn including per-message overhead"""
+    return count_tokens(turn['user'], provider) + count_tokens(turn['response'], provider) + 8
+
+
+def fit_context(context, query: str, provider: str = 'ollama',
+                budget_tokens: int = None) -> Tuple[str, List[Dict]]:
+    """
+    (digest, turns) to put in a prompt: newest turns first until the budget
+    (which also pays for the query) runs out, oldest first in the result.
+    The digest is kept only if it still fits after the newest turn.
+    context may be a ConversationContext or any list of turn records.
+    """
+    if budget_tokens is None:
+        budget_tokens = DEFAULT_BUDGETS.get(provider, 1024)
+    remaining = budget_tokens - count_tokens(query, provider)
+
+    turns = [normalize_turn(item) for item in (context or [])]
+    chosen = []
+    for turn in reversed(turns):
+        cost = turn_tokens(turn, provider)
+        if cost > remaining:
+            break
+        chosen.append(turn)
+        remaining -= cost
+    chosen.reverse()
+
+    digest = getattr(context, 'digest', '') or ''
+    if digest and count_tokens(digest, provider) > remaining:
+        digest = ''
+    return digest, chosen
+
+
+class ConversationContext(list):
+    """Normalized turns (a list, so older code can still slice it) plus a rolling digest"""
+
+    def __init__(self, turns=(), max_turns: int = MAX_TURNS, keep_turns: int = KEEP_TURNS,
+                 summarize: Callable[[str, str], Awaitable[str]] = None):
+        super().__init__(normalize_turn(turn) for turn in turns)
+        self.max_turns = max_turns
+        self.keep_turns = keep_turns
+        self.summarize = summarize
+        self.digest = ''
+        self.folded = 0          # turns summarized into the digest so far
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, user: str, response: str) -> None:
+        """Record a finished turn; may start a background digest update"""
+        self.append({'user': user, 'response': response or '', 'ts': time.time()})
+        if self.summarize is not None and len(self) >= self.keep_turns + SUMMARY_BATCH:
+            self._schedule_summary()
+        if len(self) > self.max_turns:
+            del self[:len(self) - self.max_turns]
+
+    def _schedule_summary(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no event loop (sync caller): turns just age out
+        self._task = loop.create_task(self._fold(self[:len(self) - self.keep_turns]))
+
+    async def _fold(self, old_turns: List[Dict]):
+        """Summarize old_turns into the digest, then drop them"""
+        transcript = "\n".join(f"User: {t['user']}\nAssistant: {t['response']}" for t in old_turns)
+        try:
+            digest = await self.summarize(self.digest, transcript)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Context] Digest update failed: {e}")
+            return
+        if not digest:
+            return
+        self.digest = ' '.join(_WORDS.findall(digest)[:MAX_DIGEST_WORDS])
+        folded = {id(t) for t in old_turns}
+        self[:] = [t for t in self if id(t) not in folded]
+        self.folded += len(old_turns)
+
+    def close(self):
+        """Cancel a pending digest update (session ended)"""
+        if self._task is not None:
+            self._task.cancel()
+
+    def get_stats(self, provider: str = 'ollama') -> Dict:
+        return {
+            'turns': len(self),
+            'folded': self.folded,
+            'digest_tokens': count_tokens(self.digest, provider),
+            'turn_tokens': sum(turn_tokens(t, provider) for t in self)
+        }
+
+
+def summary_prompt(digest: str, transcript: str) -> str:
+    """Instruction for folding turns into the digest"""
+    earlier = f"Summary so far:\n{digest}\n\n" if digest else ""
+    return (f"{earlier}Conversation to add:\n{transcript}\n\n"
+            f"Rewrite the summary to cover everything above in at most {MAX_DIGEST_WORDS // 2} words. "
+            f"Keep names, numbers, decisions and open questions. Reply with the summary only.")
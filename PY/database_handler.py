@@ -3,11 +3,10 @@
 Database Handler - Queries QM database using natural language
 """
 
+import asyncio
 import re
-from typing import Dict
-import sys
-sys.path.insert(0, '.')
-from qm_execute import execute_qm_command
+from typing import Dict, List
+from qm_pool import execute_qm_command
 
 def handle_database_query(query: str, config: Dict, session_id: str, context: list = None) -> Dict:
     """Handle database queries"""
@@ -41,6 +40,19 @@ def handle_database_query(query: str, config: Dict, session_id: str, context: li
             'status': 'error'
         }
 
+async def ahandle_database_query(query: str, config: Dict, session_id: str, context: list = None) -> Dict:
+    """Async handle_database_query
+    
+    QMClient calls block, so the QM work runs on a worker thread from the
+    session pool; the event loop stays free for other clients meanwhile.
+    """
+    return await asyncio.to_thread(handle_database_query, query, config, session_id, context)
+
+def data_files(query: str) -> List[str]:
+    """QM files a query would read (for response-cache versioning)"""
+    db_query = parse_database_query(query)
+    return [db_query['file']] if db_query and db_query.get('file') else []
+
 def parse_database_query(query: str) -> Dict:
     """Parse natural language database query"""
     query_lower = query.lower()
@@ -206,14 +218,3 @@ def execute_database_query(db_query: Dict, config: Dict) -> Dict:
             'success': False,
             'message': f"Database query failed: {e}"
         }
-
-def execute_qm_command(command: str, account: str) -> Dict:
-    """Execute a QM command (placeholder - implement actual QM execution)"""
-    # TODO: Implement actual QM command execution
-    # For now, return mock data
-    print(f"[DB] Would execute: {command} on account {account}")
-    return {
-        'success': True,
-        'output': 'Mock database response',
-        'command': command
-    }
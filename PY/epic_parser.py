@@ -11,9 +11,8 @@ import xml.etree.ElementTree as ET
 from datetime import datetime
 from pathlib import Path
 
-# Add SYSCOM to Python path for QMClient module
-sys.path.insert(0, r'C:\QMSYS\SYSCOM')
-import qmclient as qm
+from qm_pool import get_pool
+from qm_records import FieldMap, write_many
 
 def parse_fhir_date(date_str):
     """Convert FHIR date to QM internal date (days since 1967-12-31)"""
@@ -166,14 +165,6 @@ def parse_fhir_immunization(fhir_data, person_id):
 
 def import_to_qm(data_type, records, person_id):
     """Import parsed records into QM"""
-    print(f"\nConnecting to QM...")
-    status = qm.ConnectLocal("HAL")
-    if not status:
-        print(f"QM Connection Error: {qm.Error()}")
-        return False
-    
-    print(f"Connected to HAL")
-    
     # Open appropriate file
     file_map = {
         'medication': 'MEDICATION',
@@ -184,44 +175,32 @@ def import_to_qm(data_type, records, person_id):
     file_name = file_map.get(data_type)
     if not file_name:
         print(f"Unknown data type: {data_type}")
-        qm.Disconnect()
         return False
     
-    fno = qm.Open(file_name)
-    if fno == 0:
-        print(f"Failed to open {file_name}: {qm.Error()}")
-        qm.Disconnect()
-        return False
+    print(f"\nConnecting to QM...")
+    pool = get_pool("HAL", host="local")
     
-    print(f"Opened {file_name} file")
+    # Field positions come from the file dictionary
+    fields = FieldMap.load(file_name, pool)
+    print(f"Loaded {len(fields.fields)} {file_name} fields")
     
-    # Import records
-    imported = 0
+    # Build records
+    batch = []
+    prefix = data_type.upper()[:3]
     for record in records:
         # Generate ID
         timestamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
-        rec_id = f"{data_type.upper()[:3]}{timestamp}"
-        
-        # Build QM record (field mark delimited)
-        qm_record = ""
-        for field_num, (field_name, field_value) in enumerate(record.items()):
-            if field_value:
-                # Use field mark (0xFE) to separate fields
-                if qm_record:
-                    qm_record += '\xfe'
-                qm_record += str(field_value)
-        
-        # Write to QM
-        try:
-            qm.Write(fno, rec_id, qm_record)
-            imported += 1
-            print(f"  Imported {rec_id}")
-        except Exception as e:
-            print(f"  Error writing {rec_id}: {e}")
+        rec_id = f"{prefix}{timestamp}{len(batch):04d}"
+        batch.append((rec_id, fields.encode(record)))
     
-    print(f"\nImported {imported} {data_type} records")
+    # Write to QM in chunks
+    try:
+        imported = write_many(file_name, batch, pool=pool)
+    except Exception as e:
+        print(f"  Error writing {file_name}: {e}")
+        return False
     
-    qm.Disconnect()
+    print(f"\nImported {imported} {data_type} records")
     return True
 
 def main():
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Framed Stream - Incremental message framing for AI.SERVER sockets
+
+Replaces the "recv until the chunk contains '\\n' / '}'" loops, which cut
+large or nested JSON replies short. Frames are JSON text terminated by
+'\\n' (what AI.SERVER speaks).
+
+Bytes are received straight into a reusable buffer
+(asyncio.BufferedProtocol), newline scanning resumes where it left off,
+and each complete frame is copied out exactly once.
+
+Usage:
+    transport, protocol = await loop.create_connection(
+        lambda: FrameProtocol(on_frame, on_close), host, port)
+    transport.write(encode_frame({'type': 'text_input', 'text': 'hi'}))
+"""
+
+import asyncio
+import json
+from typing import Callable, Iterator, Optional
+
+INITIAL_BUFFER = 64 * 1024
+MAX_FRAME = 16 * 1024 * 1024
+
+
+class FrameError(Exception):
+    """Raised when no frame delimiter arrives within max_frame bytes"""
+
+
+def encode_frame(message) -> bytes:
+    """Serialise a dict (or pass bytes/str through) as one frame"""
+    if isinstance(message, dict):
+        payload = json.dumps(message).encode('utf-8')
+    elif isinstance(message, str):
+        payload = message.encode('utf-8')
+    else:
+        payload = bytes(message)
+    return payload + b'\n'
+
+
+class FrameReader:
+    """Incremental frame splitter over a single growable receive buffer"""
+
+    def __init__(self, max_frame: int = MAX_FRAME):
+        self.max_frame = max_frame
+        self._buf = bytearray(INITIAL_BUFFER)
+        self._start = 0   # first unconsumed byte
+        self._end = 0     # end of received data
+        self._scan = 0    # newline search resumes here
+
+    @property
+    def buffered(self) -> int:
+        return self._end - self._start
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        """Writable view of the free space for BufferedProtocol"""
+        want = max(sizehint, 4096)
+        if len(self._buf) - self._end < want:
+            pending = self._end - self._start
+            if self._start and pending + want <= len(self._buf):
+                # Slide unconsumed bytes to the front instead of growing
+                self._buf[:pending] = self._buf[self._start:self._end]
+            else:
+                size = len(self._buf)
+                while size < pending + want:
+                    size *= 2
+                grown = bytearray(size)
+                grown[:pending] = self._buf[self._start:self._end]
+                self._buf = grown
+            self._scan -= self._start
+            self._start, self._end = 0, pending
+        return memoryview(self._buf)[self._end:]
+
+    def buffer_updated(self, nbytes: int):
+        """Record nbytes written into the last get_buffer() view"""
+        self._end += nbytes
+
+    def feed(self, data: bytes):
+        """Append received bytes (for callers that cannot recv_into)"""
+        view = self.get_buffer(len(data))
+        view[:len(data)] = data
+        self.buffer_updated(len(data))
+
+    def frames(self) -> Iterator[bytes]:
+        """Yield every complete frame currently buffered"""
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                return
+            yield frame
+
+    def _next_frame(self) -> Optional[bytes]:
+        pos = self._buf.find(b'\n', max(self._scan, self._start), self._end)
+        if pos < 0:
+            self._scan = self._end
+            if self._end - self._start > self.max_frame:
+                raise FrameError(f"No frame delimiter within {self.max_frame} bytes")
+            return None
+        frame = bytes(memoryview(self._buf)[self._start:pos])
+        self._start = self._scan = pos + 1
+        return frame
+
+    def remainder(self) -> bytes:
+        """Unterminated bytes left at EOF (legacy replies without a newline)"""
+        data = bytes(memoryview(self._buf)[self._start:self._end])
+        self._start = self._scan = self._end
+        return data
+
+
+class FrameProtocol(asyncio.BufferedProtocol):
+    """asyncio protocol that receives into a FrameReader and emits whole frames"""
+
+    def __init__(self, on_frame: Callable[[bytes], None],
+                 on_close: Callable[[Optional[Exception]], None]):
+        self.reader = FrameReader()
+        self.on_frame = on_frame
+        self.on_close = on_close
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.reader.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int):
+        self.reader.buffer_updated(nbytes)
+        try:
+            for frame in self.reader.frames():
+                self.on_frame(frame)
+        except FrameError as e:
+            print(f"[Framing] {e}")
+            self.transport.close()
+
+    def eof_received(self):
+        tail = self.reader.remainder()
+        if tail.strip():
+            self.on_frame(tail)
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self.on_close(exc)
@@ -9,8 +9,8 @@ import pickle
 import base64
 from datetime import datetime, timedelta
 from email.utils import parsedate_to_datetime
-sys.path.insert(0, r'c:\QMSYS\SYSCOM')
-import qmclient as qm
+from qm_pool import get_pool
+from qm_records import encode_record, read_many, write_many
 
 # Gmail API imports
 try:
@@ -89,7 +89,7 @@ def get_header(headers, name):
             return header['value']
     return ""
 
-def import_gmail_messages(service, qm_conn, max_results=100, days_back=30):
+def import_gmail_messages(service, pool, max_results=100, days_back=30):
     """Import Gmail messages to QM"""
     
     print(f"\nFetching last {days_back} days of emails (max {max_results})...")
@@ -112,16 +112,22 @@ def import_gmail_messages(service, qm_conn, max_results=100, days_back=30):
         print("No messages found")
         return
     
-    # Open EMAIL file
-    email_fno = qm_conn.Open("EMAIL")
+    # Check which messages are already imported (one batched read)
+    existing = read_many("EMAIL", [f"GMAIL_{msg['id']}" for msg in messages], pool=pool)
     
     # Stats
-    imported = 0
     skipped = 0
     errors = 0
+    batch = []
     
     print("\nImporting messages...")
     for i, msg in enumerate(messages, 1):
+        # Use message ID as key
+        key = f"GMAIL_{msg['id']}"
+        if existing.get(key) is not None:
+            skipped += 1
+            continue
+        
         try:
             # Get full message
             message = service.users().messages().get(
@@ -133,8 +139,6 @@ def import_gmail_messages(service, qm_conn, max_results=100, days_back=30):
             headers = message['payload']['headers']
             
             # Extract fields
-            msg_id = message['id']
-            thread_id = message['threadId']
             from_addr = get_header(headers, 'From')
             to_addrs = get_header(headers, 'To')
             cc_addrs = get_header(headers, 'Cc')
@@ -154,32 +158,22 @@ def import_gmail_messages(service, qm_conn, max_results=100, days_back=30):
             
             # Build QM record
             # Fields: emailaccount, eadd_from, eadd_to, eadd_cc, eadd_bcc, subject, body, date_sent, date_rec
-            rec = f"gmail\xfe{from_addr}\xfe{to_addrs}\xfe{cc_addrs}\xfe{bcc_addrs}\xfe{subject}\xfe{body}\xfe{date_sent}\xfe{date_sent}"
-            
-            # Use message ID as key
-            key = f"GMAIL_{msg_id}"
-            
-            # Check if already imported
-            try:
-                existing = qm_conn.Read(email_fno, key)
-                skipped += 1
-                if i % 10 == 0:
-                    print(f"  Progress: {i}/{len(messages)} ({imported} imported, {skipped} skipped)")
-                continue
-            except:
-                pass  # Not found, continue with import
-            
-            # Write to EMAIL file
-            qm_conn.Write(email_fno, key, rec)
-            imported += 1
+            rec = encode_record([
+                'gmail', from_addr, to_addrs, cc_addrs, bcc_addrs,
+                subject, body, date_sent, date_sent
+            ])
+            batch.append((key, rec))
             
             if i % 10 == 0:
-                print(f"  Progress: {i}/{len(messages)} ({imported} imported, {skipped} skipped)")
+                print(f"  Progress: {i}/{len(messages)} ({len(batch)} new, {skipped} skipped)")
         
         except Exception as e:
             errors += 1
             print(f"  Error processing message {i}: {e}")
     
+    # Write to EMAIL file in chunks
+    imported = write_many("EMAIL", batch, pool=pool)
+    
     print("\n" + "="*60)
     print("Import Complete!")
     print("="*60)
@@ -210,32 +204,32 @@ def main():
     
     # Connect to QM
     print("\nConnecting to QM...")
-    qm.Connect('localhost', 4243, 'lawr', 'apgar-66', 'HAL')
+    pool = get_pool('HAL', user='lawr', password='apgar-66')
     print("Connected!")
     
     # Check if EMAIL file exists
     try:
-        result = qm.Execute("COUNT EMAIL")
+        result = pool.execute("COUNT EMAIL")
         print(f"EMAIL file exists: {result[0]}")
     except:
         print("\nERROR: EMAIL file not found")
         print("Run: CREATE.FILE EMAIL DYNAMIC")
         print("Then: BUILD.DICT EMAIL")
-        qm.Disconnect()
+        pool.close()
         return
     
     # Import messages
-    import_gmail_messages(service, qm, max_results, days_back)
+    import_gmail_messages(service, pool, max_results, days_back)
     
     # Show results
     print("\nVerifying import...")
-    result = qm.Execute("COUNT EMAIL")
+    result = pool.execute("COUNT EMAIL")
     print(f"Total emails in database: {result[0]}")
     
-    result = qm.Execute("SELECT EMAIL WITH @ID LIKE 'GMAIL_...'")
+    result = pool.execute("SELECT EMAIL WITH @ID LIKE 'GMAIL_...'")
     print(f"Gmail emails: {result[0]}")
     
-    qm.Disconnect()
+    pool.close()
     print("\nDone!")
 
 if __name__ == "__main__":
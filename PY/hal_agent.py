@@ -4,21 +4,23 @@ Provides a secure API layer between the local OpenQM environment and external to
 
 Supports:
 - File read/write under HAL root
-- OpenQM command execution
+- OpenQM command execution (pooled QMClient sessions)
 - Health checks and structured logging
 """
 
 import os
-import subprocess
 from datetime import datetime
 from fastapi import FastAPI, HTTPException, Body, Header
 from fastapi.responses import PlainTextResponse, JSONResponse
 from pydantic import BaseModel
 
+from qm_cache import record_cache
+from qm_pool import QMTimeoutError, get_pool
+
 # === Configuration ===
 HAL_ROOT = os.getenv("HAL_ROOT", "C:\\QMSYS\\HAL")
-QM_EXE = os.getenv("QM_EXE", "C:\\QMSYS\\bin\\qm.exe")
 QM_ACCOUNT = os.getenv("QM_ACCOUNT", "HAL")
+QM_COMMAND_TIMEOUT = 30  # seconds, as the old qm.exe subprocess allowed
 HAL_AUTH_TOKEN = os.getenv("HAL_AGENT_TOKEN", "CHANGEME-STRONG-TOKEN")
 
 # Ensure directories exist
@@ -91,32 +93,17 @@ def qm_run(req: QMCommand, x_auth: str = Header(None)):
     cmd = req.cmd.strip()
     log_event(f"QM RUN: {cmd}")
 
-    if not os.path.exists(QM_EXE):
-        raise HTTPException(status_code=500, detail=f"QM executable not found: {QM_EXE}")
-
     try:
-        # Use shell=True to properly capture QM output
-        # Build command string with proper quoting
-        full_cmd = f'"{QM_EXE}" -account {QM_ACCOUNT} -command "{cmd}"'
-        
-        result = subprocess.run(
-            full_cmd,
-            capture_output=True,
-            text=True,
-            timeout=30,
-            shell=True,
-            encoding='utf-8',
-            errors='replace'
-        )
-        out = {
+        output, status = get_pool(QM_ACCOUNT).execute(cmd, timeout=QM_COMMAND_TIMEOUT)
+        output = (output or "").strip()
+        log_event(f"QM RESULT: {cmd} -> code {status}, output len: {len(output)}")
+        return JSONResponse(content={
             "cmd": cmd,
-            "returncode": result.returncode,
-            "stdout": result.stdout.strip(),
-            "stderr": result.stderr.strip()
-        }
-        log_event(f"QM RESULT: {cmd} -> code {result.returncode}, output len: {len(result.stdout)}")
-        return JSONResponse(content=out)
-    except subprocess.TimeoutExpired:
+            "returncode": status,
+            "stdout": output,
+            "stderr": ""
+        })
+    except QMTimeoutError:
         log_event(f"TIMEOUT: {cmd}")
         raise HTTPException(status_code=504, detail="QM command timed out")
     except Exception as e:
@@ -125,48 +112,13 @@ def qm_run(req: QMCommand, x_auth: str = Header(None)):
 
 @app.post("/qm/client")
 def qm_client(req: QMCommand, x_auth: str = Header(None)):
+    """Alias of /qm/run kept for existing callers"""
+    return qm_run(req, x_auth)
+
+@app.get("/qm/pool")
+def qm_pool_stats(x_auth: str = Header(None)):
     auth_guard(x_auth)
-    cmd = req.cmd.strip()
-    log_event(f"QM CLIENT: {cmd}")
-    
-    try:
-        # Import QMClient Python module
-        import sys
-        sys.path.insert(0, "C:\\QMSYS\\bin")
-        import qmclient as qm
-        
-        # Connect to QM
-        session = qm.Connect('localhost', 4243, 'HAL', '', '')
-        if not session:
-            raise Exception("Failed to connect to QM")
-        
-        # Execute command
-        qm.Execute(cmd)
-        
-        # Collect output
-        output_lines = []
-        while True:
-            line = qm.ReadLine()
-            if not line:
-                break
-            output_lines.append(line)
-        
-        # Disconnect
-        qm.Disconnect()
-        
-        output = '\n'.join(output_lines)
-        log_event(f"QM CLIENT RESULT: {cmd} -> {len(output)} bytes")
-        
-        return JSONResponse(content={
-            "cmd": cmd,
-            "returncode": 0,
-            "stdout": output,
-            "stderr": ""
-        })
-        
-    except Exception as e:
-        log_event(f"QM CLIENT ERROR: {cmd} -> {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return dict(get_pool(QM_ACCOUNT).get_stats(), cache=record_cache.get_stats())
 
 if __name__ == "__main__":
     import uvicorn
@@ -3,13 +3,14 @@
 Home Assistant Handler - Controls smart home devices
 """
 
-import requests
+import asyncio
 import re
 from typing import Dict
 
-def handle_home_assistant(query: str, config: Dict, session_id: str) -> Dict:
-    """Handle Home Assistant commands"""
-    
+from http_transport import get_transport
+
+def _ha_setup(query: str, config: Dict):
+    """(url, token, intent) or an error response"""
     url = config.get('url', 'http://homeassistant.local:8123')
     token = config.get('token', '')
     
@@ -21,24 +22,48 @@ def handle_home_assistant(query: str, config: Dict, session_id: str) -> Dict:
     
     print(f"[HA Handler] Query: {query}")
     
+    # Parse intent from query
+    intent = parse_ha_intent(query)
+    
+    if not intent:
+        return {
+            'text': "I didn't understand that home automation command.",
+            'status': 'error'
+        }
+    return url, token, intent
+
+def _ha_response(result: Dict) -> Dict:
+    return {
+        'text': result['message'],
+        'action_taken': result.get('action', 'unknown'),
+        'status': 'success' if result.get('success') else 'error'
+    }
+
+def handle_home_assistant(query: str, config: Dict, session_id: str) -> Dict:
+    """Handle Home Assistant commands"""
     try:
-        # Parse intent from query
-        intent = parse_ha_intent(query)
-        
-        if not intent:
-            return {
-                'text': "I didn't understand that home automation command.",
-                'status': 'error'
-            }
+        setup = _ha_setup(query, config)
+        if isinstance(setup, dict):
+            return setup
         
         # Execute command
-        result = execute_ha_command(url, token, intent)
+        return _ha_response(execute_ha_command(*setup))
         
+    except Exception as e:
+        print(f"[HA Handler] Error: {e}")
         return {
-            'text': result['message'],
-            'action_taken': result.get('action', 'unknown'),
-            'status': 'success' if result.get('success') else 'error'
+            'text': f"Home Assistant error: {e}",
+            'status': 'error'
         }
+
+async def ahandle_home_assistant(query: str, config: Dict, session_id: str) -> Dict:
+    """Async handle_home_assistant - same answers, pooled aiohttp session"""
+    try:
+        setup = _ha_setup(query, config)
+        if isinstance(setup, dict):
+            return setup
+        
+        return _ha_response(await aexecute_ha_command(*setup))
         
     except Exception as e:
         print(f"[HA Handler] Error: {e}")
@@ -105,100 +130,132 @@ def parse_ha_intent(query: str) -> Dict:
     
     return None
 
-def execute_ha_command(url: str, token: str, intent: Dict) -> Dict:
-    """Execute Home Assistant API command"""
+def _ha_service_call(intent: Dict):
+    """(service path, body) for an intent, or None for unknown actions"""
+    action = intent['action']
+    
+    if action in ['turn_on', 'turn_off']:
+        # Call service
+        service = 'turn_on' if action == 'turn_on' else 'turn_off'
+        device_type = intent.get('device_type', 'light')
+        device = intent.get('device')
+        
+        # Build entity_id
+        if device:
+            entity_id = f"{device_type}.{device}"
+        else:
+            entity_id = f"{device_type}.all"  # Or get all lights
+        return f"/api/services/{device_type}/{service}", {'entity_id': entity_id}
+    
+    elif action == 'set_temperature':
+        return "/api/services/climate/set_temperature", {
+            'entity_id': 'climate.thermostat',
+            'temperature': intent['value']
+        }
     
-    headers = {
+    elif action == 'activate_scene':
+        scene = intent.get('scene', 'unknown')
+        return "/api/services/scene/turn_on", {'entity_id': f'scene.{scene}'}
+    
+    return None
+
+def _ha_result(intent: Dict, status_code: int) -> Dict:
+    """Spoken result of a service call"""
+    action = intent['action']
+    
+    if action in ['turn_on', 'turn_off']:
+        service = 'turn_on' if action == 'turn_on' else 'turn_off'
+        device_type = intent.get('device_type', 'light')
+        device = intent.get('device')
+        if status_code == 200:
+            state = "on" if action == 'turn_on' else "off"
+            return {
+                'success': True,
+                'message': f"Turned {state} the {device or device_type}.",
+                'action': f'{device_type}_{service}'
+            }
+        return {
+            'success': False,
+            'message': f"Failed to control {device or device_type}: {status_code}"
+        }
+    
+    elif action == 'set_temperature':
+        if status_code == 200:
+            return {
+                'success': True,
+                'message': f"Set temperature to {intent['value']} degrees.",
+                'action': 'climate_set_temperature'
+            }
+        return {
+            'success': False,
+            'message': f"Failed to set temperature: {status_code}"
+        }
+    
+    # activate_scene
+    scene = intent.get('scene', 'unknown')
+    if status_code == 200:
+        return {
+            'success': True,
+            'message': f"Activated {scene} scene.",
+            'action': 'scene_activated'
+        }
+    return {
+        'success': False,
+        'message': f"Failed to activate scene: {status_code}"
+    }
+
+def _ha_headers(token: str) -> Dict:
+    return {
         'Authorization': f'Bearer {token}',
         'Content-Type': 'application/json'
     }
-    
-    action = intent['action']
+
+def execute_ha_command(url: str, token: str, intent: Dict) -> Dict:
+    """Execute Home Assistant API command"""
+    call = _ha_service_call(intent)
+    if call is None:
+        return {
+            'success': False,
+            'message': f"Unknown action: {intent['action']}"
+        }
+    path, body = call
     
     try:
-        if action in ['turn_on', 'turn_off']:
-            # Call service
-            service = 'turn_on' if action == 'turn_on' else 'turn_off'
-            device_type = intent.get('device_type', 'light')
-            device = intent.get('device')
-            
-            # Build entity_id
-            if device:
-                entity_id = f"{device_type}.{device}"
-            else:
-                entity_id = f"{device_type}.all"  # Or get all lights
+        response = get_transport().post(
+            f"{url}{path}",
+            headers=_ha_headers(token),
+            json=body,
+            timeout=5
+        )
+        return _ha_result(intent, response.status_code)
             
-            response = requests.post(
-                f"{url}/api/services/{device_type}/{service}",
-                headers=headers,
-                json={'entity_id': entity_id},
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                state = "on" if action == 'turn_on' else "off"
-                return {
-                    'success': True,
-                    'message': f"Turned {state} the {device or device_type}.",
-                    'action': f'{device_type}_{service}'
-                }
-            else:
-                return {
-                    'success': False,
-                    'message': f"Failed to control {device or device_type}: {response.status_code}"
-                }
-        
-        elif action == 'set_temperature':
-            temp = intent['value']
-            response = requests.post(
-                f"{url}/api/services/climate/set_temperature",
-                headers=headers,
-                json={
-                    'entity_id': 'climate.thermostat',
-                    'temperature': temp
-                },
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                return {
-                    'success': True,
-                    'message': f"Set temperature to {temp} degrees.",
-                    'action': 'climate_set_temperature'
-                }
-            else:
-                return {
-                    'success': False,
-                    'message': f"Failed to set temperature: {response.status_code}"
-                }
-        
-        elif action == 'activate_scene':
-            scene = intent.get('scene', 'unknown')
-            response = requests.post(
-                f"{url}/api/services/scene/turn_on",
-                headers=headers,
-                json={'entity_id': f'scene.{scene}'},
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                return {
-                    'success': True,
-                    'message': f"Activated {scene} scene.",
-                    'action': 'scene_activated'
-                }
-            else:
-                return {
-                    'success': False,
-                    'message': f"Failed to activate scene: {response.status_code}"
-                }
-        
-        else:
-            return {
-                'success': False,
-                'message': f"Unknown action: {action}"
-            }
+    except Exception as e:
+        return {
+            'success': False,
+            'message': f"Home Assistant API error: {e}"
+        }
+
+async def aexecute_ha_command(url: str, token: str, intent: Dict) -> Dict:
+    """Async execute_ha_command"""
+    call = _ha_service_call(intent)
+    if call is None:
+        return {
+            'success': False,
+            'message': f"Unknown action: {intent['action']}"
+        }
+    path, body = call
+    
+    try:
+        async with get_transport().apost(
+            f"{url}{path}",
+            headers=_ha_headers(token),
+            json=body,
+            timeout=5
+        ) as response:
+            return _ha_result(intent, response.status)
             
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
         return {
             'success': False,
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+HTTP Transport - Long-lived pooled HTTP sessions for HAL's outbound calls
+
+Ollama, OpenAI, Claude, Home Assistant, Whisper and TTS are called many
+times a minute. Instead of a bare requests.post / new aiohttp.ClientSession
+per call (a fresh TCP, often TLS, handshake every time), every caller goes
+through one transport that keeps a pooled session per upstream host:
+
+- sync:  requests.Session with an HTTPAdapter pool per scheme://host:port
+- async: aiohttp.ClientSession with a keep-alive TCPConnector per host
+         (per event loop - aiohttp sessions cannot cross loops)
+
+Connection reuse is counted per host so get_stats() shows whether
+keep-alive is actually working (reused vs new connections).
+
+Usage:
+    from http_transport import get_transport
+
+    transport = get_transport()
+    response = transport.post("http://10.1.10.20:11434/api/generate", json=body, timeout=30)
+
+    async with transport.apost(STT_URL, data=form, timeout=30) as resp:
+        result = await resp.json()
+
+    print(transport.get_stats())
+
+    python PY/http_transport.py http://10.1.10.20:11434/api/tags [--requests 20]
+
+Notes:
+- Settings come from HTTP_POOL_SIZE (connections kept per host),
+  HTTP_KEEPALIVE (seconds an idle async connection is kept),
+  HTTP_CONNECT_TIMEOUT and HTTP_READ_TIMEOUT (defaults when the caller
+  passes no timeout).
+- aiohttp is optional; without it only the sync sessions are available.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+# Configuration
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "8"))
+HTTP_KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+
+
+def host_key(url: str) -> str:
+    """'https://api.openai.com/v1/chat' -> 'https://api.openai.com:443'"""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    return f"{parts.scheme}://{parts.hostname}:{port}"
+
+
+class HTTPTransport:
+    """Pooled sync and async HTTP sessions, one per upstream host"""
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, keepalive: float = HTTP_KEEPALIVE,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+                 read_timeout: float = HTTP_READ_TIMEOUT):
+        self.pool_size = pool_size
+        self.keepalive = keepalive
+        self.timeout = (connect_timeout, read_timeout)
+        self._sessions: Dict[str, requests.Session] = {}
+        self._async_sessions: Dict[Tuple[int, str], 'aiohttp.ClientSession'] = {}
+        self._lock = threading.Lock()
+        self.stats = defaultdict(lambda: {'requests': 0, 'errors': 0,
+                                          'async_requests': 0, 'async_new_connections': 0,
+                                          'async_reused_connections': 0})
+
+    # Sync ------------------------------------------------------------------
+
+    def session(self, url: str) -> requests.Session:
+        """The pooled requests.Session for this URL's host"""
+        key = host_key(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount(urlsplit(url).scheme + '://', adapter)
+                self._sessions[key] = session
+            return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """requests-style call on the host's pooled session"""
+        kwargs.setdefault('timeout', self.timeout)
+        stats = self.stats[host_key(url)]
+        stats['requests'] += 1
+        try:
+            return self.session(url).request(method, url, **kwargs)
+        except requests.RequestException:
+            stats['errors'] += 1
+            raise
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    # Async -----------------------------------------------------------------
+
+    def asession(self, url: str) -> 'aiohttp.ClientSession':
+        """The pooled aiohttp.ClientSession for this URL's host on the running loop"""
+        if not AIOHTTP_AVAILABLE:
+            raise RuntimeError("aiohttp not installed")
+        loop = asyncio.get_running_loop()
+        key = host_key(url)
+        session = self._async_sessions.get((id(loop), key))
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.pool_size,
+                                               keepalive_timeout=self.keepalive,
+                                               ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.timeout[0],
+                                              sock_read=self.timeout[1]),
+                trace_configs=[self._trace(key)]
+            )
+            self._async_sessions[(id(loop), key)] = session
+        return session
+
+    def arequest(self, method: str, url: str, timeout: float = None, **kwargs):
+        """aiohttp request context manager on the host's pooled session;
+        timeout is requests-style: total seconds, or (connect, read)"""
+        if isinstance(timeout, (int, float)):
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        elif isinstance(timeout, tuple):
+            kwargs['timeout'] = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        elif timeout is not None:
+            kwargs['timeout'] = timeout
+        return self.asession(url).request(method, url, **kwargs)
+
+    def aget(self, url: str, **kwargs):
+        return self.arequest('GET', url, **kwargs)
+
+    def apost(self, url: str, **kwargs):
+        return self.arequest('POST', url, **kwargs)
+
+    def _trace(self, key: str) -> 'aiohttp.TraceConfig':
+        """Count requests and new vs reused connections for one host"""
+        stats = self.stats[key]
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            stats['async_requests'] += 1
+
+        async def on_connection_create_end(session, context, params):
+            stats['async_new_connections'] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            stats['async_reused_connections'] += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace
+
+    # Stats / shutdown ------------------------------------------------------
+
+    def _sync_connections(self, session: requests.Session) -> Tuple[int, int]:
+        """(connections opened, requests sent) over a session's urllib3 pools"""
+        opened = sent = 0
+        for adapter in session.adapters.values():
+            pools = adapter.poolmanager.pools
+            for pool_key in list(pools.keys()):
+                pool = pools.get(pool_key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    sent += pool.num_requests
+        return opened, sent
+
+    def get_stats(self) -> Dict:
+        """Per-host request and connection-reuse counters"""
+        with self._lock:
+            sessions = dict(self._sessions)
+        hosts = {}
+        for key, counts in list(self.stats.items()):
+            host = dict(counts)
+            opened, sent = self._sync_connections(sessions[key]) if key in sessions else (0, 0)
+            host['new_connections'] = opened
+            host['reused_connections'] = max(sent - opened, 0)
+            total = sent + host['async_new_connections'] + host['async_reused_connections']
+            reused = host['reused_connections'] + host['async_reused_connections']
+            host['reuse_rate'] = round(reused / total, 3) if total else 0.0
+            hosts[key] = host
+        return {'pool_size': self.pool_size, 'keepalive': self.keepalive, 'hosts': hosts}
+
+    def close(self):
+        """Close the sync sessions (their idle connections)"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+    async def aclose(self):
+        """Close the async sessions that belong to the running loop"""
+        loop_id = id(asyncio.get_running_loop())
+        for (owner, key), session in list(self._async_sessions.items()):
+            if owner == loop_id:
+                await session.close()
+                del self._async_sessions[(owner, key)]
+
+
+# Singleton transport
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """Get or create the shared transport"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HTTPTransport()
+        return _transport
+
+
+def main():
+    """GET a URL repeatedly over the pooled session and report reuse"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    count = 10
+    if "--requests" in sys.argv:
+        idx = sys.argv.index("--requests")
+        if idx + 1 < len(sys.argv):
+            count = int(sys.argv[idx + 1])
+
+    url = sys.argv[1]
+    transport = get_transport()
+    for i in range(count):
+        start = time.perf_counter()
+        response = transport.get(url)
+        print(f"[HTTP] {i + 1:3d} {response.status_code} {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(f"[HTTP] {transport.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
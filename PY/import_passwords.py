@@ -10,26 +10,15 @@ import json
 from datetime import datetime
 from getpass import getpass
 
-# Add SYSCOM to Python path
-sys.path.insert(0, r'C:\QMSYS\SYSCOM')
-import qmclient as qm
-
+from qm_pool import get_pool
+from qm_records import FM, encode_record, internal_date, read_many, write_many
 from password_crypto import (
-    verify_master_password, encrypt_data, 
+    verify_master_password, encrypt_data, decrypt_data,
     check_password_strength, get_master_password_record
 )
 
 PERSON_ID = "P001"
 
-def connect_qm():
-    """Connect to QM"""
-    if not qm.Connected():
-        status = qm.ConnectLocal("HAL")
-        if not status:
-            print(f"QM Connection Error: {qm.Error()}")
-            return False
-    return True
-
 def import_from_csv(csv_file, encryption_key):
     """Import passwords from CSV file"""
     print(f"\nImporting from CSV: {csv_file}")
@@ -38,15 +27,8 @@ def import_from_csv(csv_file, encryption_key):
         print(f"File not found: {csv_file}")
         return 0
     
-    if not connect_qm():
-        return 0
-    
-    fno = qm.Open("PASSWORD")
-    if fno == 0:
-        print("Error opening PASSWORD file")
-        return 0
-    
-    imported = 0
+    today = internal_date()
+    batch = []
     
     with open(csv_file, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
@@ -72,7 +54,7 @@ def import_from_csv(csv_file, encryption_key):
             
             # Generate ID
             timestamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
-            rec_id = f"PWD{timestamp}"
+            rec_id = f"PWD{timestamp}{len(batch):04d}"
             
             # Build record
             record = [
@@ -93,7 +75,7 @@ def import_from_csv(csv_file, encryption_key):
                 '',  # TWO_FACTOR_BACKUP
                 '',  # RECOVERY_EMAIL
                 '',  # RECOVERY_PHONE
-                str(qm.Date()),  # LAST_CHANGED_DATE
+                today,  # LAST_CHANGED_DATE
                 '',  # EXPIRES_DATE
                 strength,
                 encrypted_notes,
@@ -106,16 +88,14 @@ def import_from_csv(csv_file, encryption_key):
                 'N',  # BREACH_DETECTED
                 '',  # BREACH_DATE
                 'Y',  # ACTIVE
-                str(qm.Date()),
-                str(qm.Date()),
+                today,
+                today,
             ]
             
-            qm_record = '\xfe'.join(record)
-            qm.Write(fno, rec_id, qm_record)
-            
-            imported += 1
-            print(f"  Imported: {site_name}")
+            batch.append((rec_id, encode_record(record)))
+            print(f"  Prepared: {site_name}")
     
+    imported = write_many("PASSWORD", batch, pool=get_pool("HAL", host="local"))
     print(f"\n✓ Imported {imported} passwords")
     return imported
 
@@ -127,15 +107,8 @@ def import_from_json(json_file, encryption_key):
         print(f"File not found: {json_file}")
         return 0
     
-    if not connect_qm():
-        return 0
-    
-    fno = qm.Open("PASSWORD")
-    if fno == 0:
-        print("Error opening PASSWORD file")
-        return 0
-    
-    imported = 0
+    today = internal_date()
+    batch = []
     
     with open(json_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
@@ -166,22 +139,20 @@ def import_from_json(json_file, encryption_key):
         
         # Generate ID
         timestamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
-        rec_id = f"PWD{timestamp}"
+        rec_id = f"PWD{timestamp}{len(batch):04d}"
         
         # Build record
         record = [
             rec_id, PERSON_ID, category.lower(), site_name, url, username,
             encrypted_password, '', '', '', '', '', 'N', '', '', '', '',
-            str(qm.Date()), '', strength, encrypted_notes, '', 'N', '', 'N',
-            '', '0', 'N', '', 'Y', str(qm.Date()), str(qm.Date()),
+            today, '', strength, encrypted_notes, '', 'N', '', 'N',
+            '', '0', 'N', '', 'Y', today, today,
         ]
         
-        qm_record = '\xfe'.join(record)
-        qm.Write(fno, rec_id, qm_record)
-        
-        imported += 1
-        print(f"  Imported: {site_name}")
+        batch.append((rec_id, encode_record(record)))
+        print(f"  Prepared: {site_name}")
     
+    imported = write_many("PASSWORD", batch, pool=get_pool("HAL", host="local"))
     print(f"\n✓ Imported {imported} passwords")
     return imported
 
@@ -189,28 +160,22 @@ def export_to_csv(output_file, encryption_key):
     """Export passwords to CSV"""
     print(f"\nExporting to CSV: {output_file}")
     
-    if not connect_qm():
+    pool = get_pool("HAL", host="local")
+    try:
+        with pool.session() as s:
+            ids = s.select(f'SELECT PASSWORD WITH PERSON_ID = "{PERSON_ID}" AND ACTIVE = "Y"')
+        records = read_many("PASSWORD", ids, pool=pool)
+    except Exception as e:
+        print(f"Error reading PASSWORD file: {e}")
         return 0
     
-    fno = qm.Open("PASSWORD")
-    if fno == 0:
-        print("Error opening PASSWORD file")
-        return 0
-    
-    qm.Execute(f'SELECT PASSWORD WITH PERSON_ID = "{PERSON_ID}" AND ACTIVE = "Y" TO 1')
-    
     passwords = []
-    while True:
-        rec_id = qm.ReadNext(1)
-        if not rec_id:
-            break
-        
-        record = qm.Read(fno, rec_id)
+    for rec_id in ids:
+        record = records.get(rec_id)
         if record:
-            fields = record.split('\xfe')
+            fields = record.split(FM)
             
             # Decrypt password
-            from password_crypto import decrypt_data
             encrypted_password = fields[6] if len(fields) > 6 else ''
             password = decrypt_data(encrypted_password, encryption_key)
             
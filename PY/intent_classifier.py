@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Intent Classifier - Pattern tables compiled once for per-utterance matching
+
+Every pattern is compiled at construction and indexed by its trigger
+words: the literal word (or first word of each alternative) it cannot
+match without, e.g. r'\\b(arm|disarm)\\b.*\\b(alarm|security)\\b' -> {arm,
+disarm}. An utterance is tokenized once and only patterns triggered by one
+of its words (plus the few with no extractable trigger) are searched, so
+cost follows the utterance, not the size of the tables.
+
+Intents are listed in priority order; best() returns the first that
+matches, which is what the old check-by-check loops did.
+
+Usage:
+    from intent_classifier import IntentClassifier
+
+    classifier = IntentClassifier([
+        ('home_assistant', 0.9, [r'\\bscene\\b', r'\\bautomation\\b']),
+        ('database', 0.85, [r'\\bquery\\b']),
+    ], default=('llm', 0.7))
+
+    classifier.best("run the movie scene")       # ('home_assistant', 0.9)
+    classifier.classify("query the scene list")  # every matching intent
+
+Benchmark:
+    python PY/intent_classifier.py [--iterations 20000] [--scale 10]
+"""
+
+import re
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+_WORD = re.compile(r'\w+')
+
+# A top-level mandatory literal: \b(word|two words|...)\b or \bword\b, not quantified
+# (a group may also end at \s, which ends the word just as well)
+_TRIGGER = re.compile(r'\\b\(([a-z0-9_ ]+(?:\|[a-z0-9_ ]+)*)\)(?:\\b(?![?*{])|(?=\\s))'
+                      r'|\\b([a-z0-9_]+)\\b(?![?*{])')
+
+
+def trigger_words(pattern: str) -> Optional[Set[str]]:
+    """Words one of which must appear for the pattern to match, or None if unknown"""
+    depth = 0
+    escaped = False
+    starts = set()
+    for pos, ch in enumerate(pattern):
+        if escaped:
+            escaped = False
+        elif ch == '\\':
+            escaped = True
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == '|' and depth == 0:
+            return None  # top-level alternation: no single mandatory literal
+        elif ch == '[':
+            return None  # character classes would need a real parser
+        if depth == 0 and not escaped:
+            starts.add(pos + 1)
+    starts.add(0)
+
+    for m in _TRIGGER.finditer(pattern):
+        if m.start() in starts:
+            alternatives = (m.group(1) or m.group(2)).split('|')
+            return {alt.split()[0] for alt in alternatives if alt.split()}
+    return None
+
+
+class IntentClassifier:
+    """Priority-ordered intents over a trigger-word index of compiled patterns"""
+
+    def __init__(self, tables: Sequence[Tuple[str, float, Sequence[str]]],
+                 default: Tuple[str, float] = ('llm', 0.7)):
+        self.default = default
+        self.intents: List[Tuple[str, float]] = []
+        self.patterns: List[Tuple[int, str, 're.Pattern']] = []   # (intent index, source, regex)
+        self.index: Dict[str, List[int]] = defaultdict(list)       # trigger word -> pattern numbers
+        self.always: List[int] = []                                # patterns without a trigger
+
+        for intent, confidence, patterns in tables:
+            self.intents.append((intent, confidence))
+            for pattern in patterns:
+                number = len(self.patterns)
+                self.patterns.append((len(self.intents) - 1, pattern, re.compile(pattern)))
+                triggers = trigger_words(pattern)
+                if triggers is None:
+                    self.always.append(number)
+                else:
+                    for word in triggers:
+                        self.index[word].append(number)
+        self.index = dict(self.index)
+
+    def _candidates(self, text: str) -> List[int]:
+        """Pattern numbers worth searching for this text, in table order"""
+        index = self.index
+        found = set(self.always)
+        for word in set(_WORD.findall(text)):
+            hits = index.get(word)
+            if hits:
+                found.update(hits)
+        return sorted(found)
+
+    def classify(self, text: str) -> List[Dict]:
+        """Every matching intent in priority order, with score and the pattern that fired"""
+        matches = []
+        matched = set()
+        for number in self._candidates(text):
+            intent_index, source, regex = self.patterns[number]
+            if intent_index not in matched and regex.search(text):
+                matched.add(intent_index)
+                intent, confidence = self.intents[intent_index]
+                matches.append({'intent': intent, 'score': confidence, 'pattern': source})
+        return matches
+
+    def best(self, text: str) -> Tuple[str, float]:
+        """Highest-priority matching intent, else the default"""
+        for number in self._candidates(text):
+            intent_index, _, regex = self.patterns[number]
+            if regex.search(text):
+                return self.intents[intent_index]
+        return self.default
+
+    def pattern_count(self) -> int:
+        return len(self.patterns)
+
+
+def benchmark(classifier, queries: Sequence[str], iterations: int = 20000) -> Dict:
+    """Time best() and classify() per utterance, in microseconds"""
+    result = {'patterns': classifier.pattern_count(), 'queries': len(queries)}
+    for name in ('best', 'classify'):
+        method = getattr(classifier, name)
+        start = time.perf_counter()
+        for i in range(iterations):
+            method(queries[i % len(queries)])
+        result[f'{name}_us'] = round((time.perf_counter() - start) / iterations * 1e6, 2)
+    return result
+
+
+def _scaled(tables, scale: int):
+    """Grow every table scale-fold with distinct keyword variants, for benchmarking"""
+    grown = []
+    for intent, confidence, patterns in tables:
+        extra = [rf'\b(zq{k}{n}word|zq{k}{n}other)\b.*\bzq{k}{n}thing\b'
+                 for k in range(1, scale) for n in range(len(patterns))]
+        grown.append((intent, confidence, list(patterns) + extra))
+    return grown
+
+
+def main():
+    """Micro-benchmark against the QueryRouter tables"""
+    iterations, scale = 20000, 1
+    if "--iterations" in sys.argv:
+        idx = sys.argv.index("--iterations")
+        if idx + 1 < len(sys.argv):
+            iterations = int(sys.argv[idx + 1])
+    if "--scale" in sys.argv:
+        idx = sys.argv.index("--scale")
+        if idx + 1 < len(sys.argv):
+            scale = int(sys.argv[idx + 1])
+
+    from query_router import QueryRouter
+    tables = QueryRouter().intent_tables()
+    queries = [
+        "what time is it",
+        "hello",
+        "turn on the kitchen lights",
+        "lock the front door",
+        "show me the appointment for this patient",
+        "how many transactions last month",
+        "tell me a story about a dragon who learns to cook",
+        "what is the capital of france and why is it famous",
+    ]
+
+    for factor in sorted({1, scale}):
+        classifier = IntentClassifier(_scaled(tables, factor))
+        stats = benchmark(classifier, queries, iterations)
+        print(f"[Intent] {stats['patterns']:4d} patterns: best {stats['best_us']:.2f} us, "
+              f"classify {stats['classify_us']:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,29 @@
 #!/usr/bin/env python3
 """
 LLM Handler - Routes queries to Ollama, OpenAI, or Claude
+
+Usage:
+    from llm_handler import handle_llm_query, ahandle_llm_query, stream_llm_query
+
+    response = handle_llm_query(query, config['llm'], session_id, context)
+    response = await ahandle_llm_query(query, config['llm'], session_id, context)
+
+    # Token deltas as the model produces them
+    for delta in stream_llm_query(query, config['llm'], context):
+        print(delta, end='', flush=True)
+    async for delta in astream_llm_query(query, config['llm'], context):
+        ...
 """
 
+import asyncio
 import requests
 import json
-from typing import Dict
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from conversation_context import fit_context
+from http_transport import get_transport
+
+STREAM_TIMEOUT = (10, 30)  # connect, and longest wait between two chunks
 
 def handle_llm_query(query: str, config: Dict, session_id: str, context: list = None) -> Dict:
     """Send query to configured LLM provider"""
@@ -33,50 +51,152 @@ def handle_llm_query(query: str, config: Dict, session_id: str, context: list =
             'status': 'error'
         }
 
-def query_ollama(query: str, config: Dict, context: list = None) -> Dict:
-    """Query Ollama LLM"""
-    url = config.get('url', 'http://10.1.10.20:11434')
-    model = config.get('model', 'llama3.2:latest')
+async def ahandle_llm_query(query: str, config: Dict, session_id: str, context: list = None) -> Dict:
+    """Async handle_llm_query - cancelling the task abandons the HTTP call"""
     
-    # Build prompt with context
-    prompt = query
-    if context and len(context) > 0:
+    provider = config.get('provider', 'ollama')
+    
+    print(f"[LLM Handler] Provider: {provider}, Query: {query[:50]}...")
+    
+    try:
+        if provider == 'ollama':
+            return await aquery_ollama(query, config['ollama'], context)
+        elif provider == 'openai':
+            return await aquery_openai(query, config['openai'], context)
+        elif provider == 'claude':
+            return await aquery_claude(query, config['claude'], context)
+        else:
+            return {
+                'text': f"Unknown LLM provider: {provider}",
+                'status': 'error'
+            }
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"[LLM Handler] Error: {e}")
+        return {
+            'text': f"LLM error: {e}",
+            'status': 'error'
+        }
+
+# Context - as many recent turns as fit the provider's 'context_tokens'
+# budget, plus the session's digest of older turns (see conversation_context)
+
+def _ollama_prompt(query: str, config: Dict, context: list = None) -> str:
+    """Prompt with the fitted turns (and digest) prepended"""
+    digest, turns = fit_context(context, query, 'ollama', config.get('context_tokens'))
+    if not turns and not digest:
+        return query
+    prompt = ''
+    if digest:
+        prompt += f"Summary of earlier conversation: {digest}\n\n"
+    if turns:
         context_str = "\n".join([
-            f"User: {item['utterance']}\nAssistant: {item['response']}"
-            for item in context[-3:]  # Last 3 turns
+            f"User: {turn['user']}\nAssistant: {turn['response']}"
+            for turn in turns
         ])
-        prompt = f"Previous conversation:\n{context_str}\n\nUser: {query}\nAssistant:"
+        prompt += f"Previous conversation:\n{context_str}\n\n"
+    return f"{prompt}User: {query}\nAssistant:"
+
+def _chat_messages(query: str, config: Dict, provider: str,
+                   context: list = None) -> Tuple[str, List[Dict]]:
+    """(system text, chat messages) with the fitted turns"""
+    digest, turns = fit_context(context, query, provider, config.get('context_tokens'))
+    messages = []
+    for turn in turns:
+        messages.append({'role': 'user', 'content': turn['user']})
+        messages.append({'role': 'assistant', 'content': turn['response']})
+    messages.append({'role': 'user', 'content': query})
+    system = f"Summary of earlier conversation: {digest}" if digest else ''
+    return system, messages
+
+# Request builders - (url, headers, body) shared by the sync, async and streaming calls
+
+def _ollama_request(query: str, config: Dict, context: list = None,
+                    stream: bool = False) -> Tuple[str, Dict, Dict]:
+    url = config.get('url', 'http://10.1.10.20:11434')
+    body = {
+        'model': config.get('model', 'llama3.2:latest'),
+        'prompt': _ollama_prompt(query, config, context),
+        'stream': stream,
+        'options': {
+            'temperature': 0.7,
+            'top_p': 0.9
+        }
+    }
+    if config.get('keep_alive'):
+        body['keep_alive'] = config['keep_alive']  # otherwise Ollama unloads after 5 idle minutes
+    return f"{url}/api/generate", {}, body
+
+def _openai_request(query: str, config: Dict, context: list = None,
+                    stream: bool = False) -> Tuple[str, Dict, Dict]:
+    headers = {
+        'Authorization': f"Bearer {config.get('api_key', '')}",
+        'Content-Type': 'application/json'
+    }
+    system, messages = _chat_messages(query, config, 'openai', context)
+    if system:
+        messages.insert(0, {'role': 'system', 'content': system})
+    body = {
+        'model': config.get('model', 'gpt-4'),
+        'messages': messages,
+        'temperature': 0.7,
+        'max_tokens': 500
+    }
+    if stream:
+        body['stream'] = True
+    return 'https://api.openai.com/v1/chat/completions', headers, body
+
+def _claude_request(query: str, config: Dict, context: list = None,
+                    stream: bool = False) -> Tuple[str, Dict, Dict]:
+    headers = {
+        'x-api-key': config.get('api_key', ''),
+        'anthropic-version': '2023-06-01',
+        'Content-Type': 'application/json'
+    }
+    system, messages = _chat_messages(query, config, 'claude', context)
+    body = {
+        'model': config.get('model', 'claude-3-sonnet-20240229'),
+        'messages': messages,
+        'max_tokens': 500,
+        'temperature': 0.7
+    }
+    if system:
+        body['system'] = system
+    if stream:
+        body['stream'] = True
+    return 'https://api.anthropic.com/v1/messages', headers, body
+
+def _answer(text: str, model: str, provider: str) -> Dict:
+    return {
+        'text': text,
+        'model': model,
+        'provider': provider,
+        'status': 'success'
+    }
+
+def _missing_key(name: str) -> Dict:
+    return {
+        'text': f"{name} API key not configured",
+        'status': 'error'
+    }
+
+def query_ollama(query: str, config: Dict, context: list = None) -> Dict:
+    """Query Ollama LLM"""
+    url, headers, body = _ollama_request(query, config, context)
     
     try:
-        response = requests.post(
-            f"{url}/api/generate",
-            json={
-                'model': model,
-                'prompt': prompt,
-                'stream': False,
-                'options': {
-                    'temperature': 0.7,
-                    'top_p': 0.9
-                }
-            },
-            timeout=30
-        )
+        response = get_transport().post(url, json=body, timeout=30)
         
         if response.status_code == 200:
             result = response.json()
-            answer = result.get('response', '').strip()
-            return {
-                'text': answer,
-                'model': model,
-                'provider': 'ollama',
-                'status': 'success'
-            }
+            return _answer(result.get('response', '').strip(), body['model'], 'ollama')
         else:
             return {
                 'text': f"Ollama error: {response.status_code}",
                 'status': 'error'
             }
-            
+    
     except requests.exceptions.Timeout:
         return {
             'text': "The AI model is taking too long to respond. Please try again.",
@@ -90,55 +210,23 @@ def query_ollama(query: str, config: Dict, context: list = None) -> Dict:
 
 def query_openai(query: str, config: Dict, context: list = None) -> Dict:
     """Query OpenAI API"""
-    api_key = config.get('api_key', '')
-    model = config.get('model', 'gpt-4')
-    
-    if not api_key:
-        return {
-            'text': "OpenAI API key not configured",
-            'status': 'error'
-        }
-    
-    # Build messages with context
-    messages = []
-    if context and len(context) > 0:
-        for item in context[-5:]:  # Last 5 turns
-            messages.append({'role': 'user', 'content': item['utterance']})
-            messages.append({'role': 'assistant', 'content': item['response']})
+    if not config.get('api_key', ''):
+        return _missing_key('OpenAI')
     
-    messages.append({'role': 'user', 'content': query})
+    url, headers, body = _openai_request(query, config, context)
     
     try:
-        response = requests.post(
-            'https://api.openai.com/v1/chat/completions',
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': model,
-                'messages': messages,
-                'temperature': 0.7,
-                'max_tokens': 500
-            },
-            timeout=30
-        )
+        response = get_transport().post(url, headers=headers, json=body, timeout=30)
         
         if response.status_code == 200:
             result = response.json()
-            answer = result['choices'][0]['message']['content']
-            return {
-                'text': answer,
-                'model': model,
-                'provider': 'openai',
-                'status': 'success'
-            }
+            return _answer(result['choices'][0]['message']['content'], body['model'], 'openai')
         else:
             return {
                 'text': f"OpenAI error: {response.status_code}",
                 'status': 'error'
             }
-            
+    
     except Exception as e:
         return {
             'text': f"OpenAI connection error: {e}",
@@ -147,58 +235,222 @@ def query_openai(query: str, config: Dict, context: list = None) -> Dict:
 
 def query_claude(query: str, config: Dict, context: list = None) -> Dict:
     """Query Anthropic Claude API"""
-    api_key = config.get('api_key', '')
-    model = config.get('model', 'claude-3-sonnet-20240229')
+    if not config.get('api_key', ''):
+        return _missing_key('Claude')
     
-    if not api_key:
-        return {
-            'text': "Claude API key not configured",
-            'status': 'error'
-        }
-    
-    # Build messages with context
-    messages = []
-    if context and len(context) > 0:
-        for item in context[-5:]:
-            messages.append({'role': 'user', 'content': item['utterance']})
-            messages.append({'role': 'assistant', 'content': item['response']})
-    
-    messages.append({'role': 'user', 'content': query})
+    url, headers, body = _claude_request(query, config, context)
     
     try:
-        response = requests.post(
-            'https://api.anthropic.com/v1/messages',
-            headers={
-                'x-api-key': api_key,
-                'anthropic-version': '2023-06-01',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': model,
-                'messages': messages,
-                'max_tokens': 500,
-                'temperature': 0.7
-            },
-            timeout=30
-        )
+        response = get_transport().post(url, headers=headers, json=body, timeout=30)
         
         if response.status_code == 200:
             result = response.json()
-            answer = result['content'][0]['text']
-            return {
-                'text': answer,
-                'model': model,
-                'provider': 'claude',
-                'status': 'success'
-            }
+            return _answer(result['content'][0]['text'], body['model'], 'claude')
         else:
             return {
                 'text': f"Claude error: {response.status_code}",
                 'status': 'error'
             }
-            
+    
     except Exception as e:
         return {
             'text': f"Claude connection error: {e}",
             'status': 'error'
         }
+
+# Async - same requests on the pooled aiohttp sessions; CancelledError is
+# always re-raised so a cancelled query stops instead of answering
+
+async def _apost_json(url: str, headers: Dict, body: Dict) -> Tuple[int, Optional[Dict]]:
+    """(status, JSON body if 200)"""
+    async with get_transport().apost(url, headers=headers, json=body, timeout=30) as response:
+        if response.status != 200:
+            return response.status, None
+        return response.status, await response.json(content_type=None)
+
+async def aquery_ollama(query: str, config: Dict, context: list = None) -> Dict:
+    """Async query_ollama"""
+    url, headers, body = _ollama_request(query, config, context)
+    
+    try:
+        status, result = await _apost_json(url, headers, body)
+        if status == 200:
+            return _answer(result.get('response', '').strip(), body['model'], 'ollama')
+        return {
+            'text': f"Ollama error: {status}",
+            'status': 'error'
+        }
+    except asyncio.CancelledError:
+        raise
+    except asyncio.TimeoutError:
+        return {
+            'text': "The AI model is taking too long to respond. Please try again.",
+            'status': 'error'
+        }
+    except Exception as e:
+        return {
+            'text': f"Failed to connect to Ollama: {e}",
+            'status': 'error'
+        }
+
+async def aquery_openai(query: str, config: Dict, context: list = None) -> Dict:
+    """Async query_openai"""
+    if not config.get('api_key', ''):
+        return _missing_key('OpenAI')
+    
+    url, headers, body = _openai_request(query, config, context)
+    
+    try:
+        status, result = await _apost_json(url, headers, body)
+        if status == 200:
+            return _answer(result['choices'][0]['message']['content'], body['model'], 'openai')
+        return {
+            'text': f"OpenAI error: {status}",
+            'status': 'error'
+        }
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        return {
+            'text': f"OpenAI connection error: {e}",
+            'status': 'error'
+        }
+
+async def aquery_claude(query: str, config: Dict, context: list = None) -> Dict:
+    """Async query_claude"""
+    if not config.get('api_key', ''):
+        return _missing_key('Claude')
+    
+    url, headers, body = _claude_request(query, config, context)
+    
+    try:
+        status, result = await _apost_json(url, headers, body)
+        if status == 200:
+            return _answer(result['content'][0]['text'], body['model'], 'claude')
+        return {
+            'text': f"Claude error: {status}",
+            'status': 'error'
+        }
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        return {
+            'text': f"Claude connection error: {e}",
+            'status': 'error'
+        }
+
+# Streaming - token deltas for the voice gateways.
+# Generators raise on connection or HTTP errors; deltas already yielded stand.
+
+def _sse_data(line: bytes) -> Optional[str]:
+    """Payload of a server-sent event 'data:' line, else None"""
+    if not line.startswith(b'data:'):
+        return None
+    return line[5:].decode('utf-8').strip()
+
+def _ollama_line(line: bytes) -> Tuple[Optional[str], bool]:
+    """(delta, done) from one line of Ollama's JSON-lines stream"""
+    chunk = json.loads(line)
+    if chunk.get('error'):
+        raise RuntimeError(f"Ollama error: {chunk['error']}")
+    return chunk.get('response'), bool(chunk.get('done'))
+
+def _openai_line(line: bytes) -> Tuple[Optional[str], bool]:
+    """(delta, done) from one OpenAI server-sent event line"""
+    data = _sse_data(line)
+    if data is None:
+        return None, False
+    if data == '[DONE]':
+        return None, True
+    choices = json.loads(data).get('choices') or [{}]
+    return choices[0].get('delta', {}).get('content'), False
+
+def _claude_line(line: bytes) -> Tuple[Optional[str], bool]:
+    """(delta, done) from one Anthropic server-sent event line"""
+    data = _sse_data(line)
+    if data is None:
+        return None, False
+    event = json.loads(data)
+    kind = event.get('type')
+    if kind == 'content_block_delta':
+        return event.get('delta', {}).get('text'), False
+    if kind == 'error':
+        raise RuntimeError(f"Claude error: {event.get('error', {}).get('message', event)}")
+    return None, kind == 'message_stop'
+
+_STREAMS = {
+    'ollama': (_ollama_request, _ollama_line, 'Ollama'),
+    'openai': (_openai_request, _openai_line, 'OpenAI'),
+    'claude': (_claude_request, _claude_line, 'Claude'),
+}
+
+def _stream_request(provider: str, query: str, config: Dict, context: list = None):
+    """(url, headers, body, line parser, display name) for a streamed call"""
+    build, parse, name = _STREAMS[provider]
+    if provider != 'ollama' and not config.get('api_key', ''):
+        raise RuntimeError(f"{name} API key not configured")
+    url, headers, body = build(query, config, context, stream=True)
+    return url, headers, body, parse, name
+
+def _stream(provider: str, query: str, config: Dict, context: list = None) -> Iterator[str]:
+    url, headers, body, parse, name = _stream_request(provider, query, config, context)
+    with get_transport().post(url, headers=headers, json=body, stream=True,
+                              timeout=STREAM_TIMEOUT) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"{name} error: {response.status_code}")
+        for line in response.iter_lines():
+            if not line:
+                continue
+            delta, done = parse(line)
+            if delta:
+                yield delta
+            if done:
+                return
+
+async def _astream(provider: str, query: str, config: Dict, context: list = None) -> AsyncIterator[str]:
+    url, headers, body, parse, name = _stream_request(provider, query, config, context)
+    async with get_transport().apost(url, headers=headers, json=body,
+                                     timeout=STREAM_TIMEOUT) as response:
+        if response.status != 200:
+            raise RuntimeError(f"{name} error: {response.status}")
+        async for line in response.content:
+            line = line.strip()
+            if not line:
+                continue
+            delta, done = parse(line)
+            if delta:
+                yield delta
+            if done:
+                return
+
+def stream_llm_query(query: str, config: Dict, context: list = None) -> Iterator[str]:
+    """Yield text deltas from the configured LLM provider"""
+    provider = config.get('provider', 'ollama')
+    
+    print(f"[LLM Handler] Streaming from {provider}, Query: {query[:50]}...")
+    
+    if provider not in _STREAMS:
+        raise ValueError(f"Unknown LLM provider: {provider}")
+    return _stream(provider, query, config[provider], context)
+
+def astream_llm_query(query: str, config: Dict, context: list = None) -> AsyncIterator[str]:
+    """Async stream_llm_query; closing or cancelling it closes the HTTP stream"""
+    provider = config.get('provider', 'ollama')
+    
+    print(f"[LLM Handler] Streaming from {provider}, Query: {query[:50]}...")
+    
+    if provider not in _STREAMS:
+        raise ValueError(f"Unknown LLM provider: {provider}")
+    return _astream(provider, query, config[provider], context)
+
+def stream_ollama(query: str, config: Dict, context: list = None) -> Iterator[str]:
+    """Stream from Ollama (one JSON object per line)"""
+    return _stream('ollama', query, config, context)
+
+def stream_openai(query: str, config: Dict, context: list = None) -> Iterator[str]:
+    """Stream from OpenAI chat completions (server-sent events)"""
+    return _stream('openai', query, config, context)
+
+def stream_claude(query: str, config: Dict, context: list = None) -> Iterator[str]:
+    """Stream from the Anthropic messages API (server-sent events)"""
+    return _stream('claude', query, config, context)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Ollama Models - Keep the configured models loaded and warm
+
+Ollama unloads a model after keep_alive (5 minutes by default) of idleness,
+so the first question after a quiet spell paid the whole model load. The
+residency manager:
+
+- warms every configured model when the gateway starts (an empty
+  /api/generate call loads it) and pins it with keep_alive
+- polls /api/ps, records when each model was loaded and when Ollama
+  evicted it, and reloads evicted models
+- picks the model per task: classification-sized work (intent checks,
+  conversation digests) goes to the small model, answers to the default
+
+Models come from the router's llm.ollama config:
+    "model": "llama3.2:latest",             default (answers)
+    "classification_model": "...",          small (classification, summaries)
+    "keep_alive": "30m"                     sent with every request
+
+classification_model is unset by default, so everything uses "model" (the
+one ubuai_services/install_services.sh pulls). Set it to a smaller model
+that is installed on the Ollama host, e.g. voice_config.json's
+deepseek-r1:8b after `ollama pull deepseek-r1:8b`; if Ollama does not have
+it, warm-up marks it unavailable and its tasks fall back to "model".
+
+Usage:
+    from ollama_models import ModelResidency
+
+    models = ModelResidency.from_config(config['llm']['ollama'])
+    await models.start()                        # warm + pin in the background
+    model = models.model_for('classification')
+    print(models.get_stats())
+
+    python PY/ollama_models.py [--warm]         # residency status
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from http_transport import get_transport
+
+DEFAULT_KEEP_ALIVE = "30m"
+POLL_INTERVAL = 60.0      # seconds between /api/ps checks
+WARM_TIMEOUT = 300        # a cold 30B model can take minutes to load
+LOADED_MS = 100           # load_duration above this means the model was actually loaded
+SMALL_TASKS = {'classification', 'summary'}
+
+
+class ModelResidency:
+    """Warm-up, keep-alive pinning and load/eviction tracking for Ollama models"""
+
+    def __init__(self, url: str, default_model: str, small_model: str = None,
+                 keep_alive: str = DEFAULT_KEEP_ALIVE, poll_interval: float = POLL_INTERVAL):
+        self.url = url.rstrip('/')
+        self.models = {'default': default_model, 'small': small_model or default_model}
+        self.keep_alive = keep_alive
+        self.poll_interval = poll_interval
+        self.unavailable = set()   # models Ollama does not have (warm-up got 404)
+        self.stats: Dict[str, Dict] = {
+            model: {'resident': False, 'loads': 0, 'evictions': 0, 'last_load_ms': None,
+                    'loaded_at': None, 'evicted_at': None, 'expires_at': None}
+            for model in set(self.models.values())
+        }
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'ModelResidency':
+        """Build from an llm.ollama config block"""
+        return cls(config.get('url', 'http://10.1.10.20:11434'),
+                   config.get('model', 'llama3.2:latest'),
+                   config.get('classification_model'),
+                   config.get('keep_alive', DEFAULT_KEEP_ALIVE))
+
+    def model_for(self, task: str = 'answer') -> str:
+        """Model to use for a task ('classification' and 'summary' use the small model)"""
+        if task in SMALL_TASKS and self.models['small'] not in self.unavailable:
+            return self.models['small']
+        return self.models['default']
+
+    async def warm(self, model: str) -> bool:
+        """Load a model (no-op if resident) and pin it for keep_alive"""
+        start = time.perf_counter()
+        try:
+            async with get_transport().apost(
+                f"{self.url}/api/generate",
+                json={'model': model, 'prompt': '', 'keep_alive': self.keep_alive},
+                timeout=WARM_TIMEOUT
+            ) as response:
+                if response.status == 404:
+                    print(f"[Ollama] Model {model} not available - using {self.models['default']}")
+                    self.unavailable.add(model)
+                    return False
+                if response.status != 200:
+                    print(f"[Ollama] Warm-up of {model} failed: {response.status}")
+                    return False
+                result = await response.json(content_type=None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Ollama] Warm-up of {model} failed: {e}")
+            return False
+
+        stats = self.stats[model]
+        stats['resident'] = True
+        # load_duration is only substantial when the model was not already resident
+        load_ms = result.get('load_duration', 0) / 1e6
+        if load_ms >= LOADED_MS:
+            stats['loads'] += 1
+            stats['last_load_ms'] = round(load_ms)
+            stats['loaded_at'] = datetime.now().isoformat()
+            print(f"[Ollama] {model} loaded in {stats['last_load_ms']} ms "
+                  f"(warm-up {(time.perf_counter() - start) * 1000:.0f} ms, keep_alive {self.keep_alive})")
+        return True
+
+    async def warm_all(self) -> Dict[str, bool]:
+        """Warm every configured model concurrently"""
+        models = list(self.stats)
+        results = await asyncio.gather(*(self.warm(model) for model in models))
+        return dict(zip(models, results))
+
+    async def refresh(self) -> List[str]:
+        """Poll /api/ps; record evictions and return the configured models not loaded"""
+        async with get_transport().aget(f"{self.url}/api/ps", timeout=10) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Ollama /api/ps error: {response.status}")
+            loaded = {m.get('name') or m.get('model'): m
+                      for m in (await response.json(content_type=None)).get('models', [])}
+
+        missing = []
+        for model, stats in self.stats.items():
+            if model in self.unavailable:
+                continue
+            if model in loaded:
+                stats['resident'] = True
+                stats['expires_at'] = loaded[model].get('expires_at')
+                continue
+            if stats['resident']:
+                stats['resident'] = False
+                stats['evictions'] += 1
+                stats['evicted_at'] = datetime.now().isoformat()
+                print(f"[Ollama] {model} was evicted")
+            missing.append(model)
+        return missing
+
+    async def _pin(self):
+        """Background loop: reload whatever Ollama evicted"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                for model in await self.refresh():
+                    await self.warm(model)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Ollama] Residency check failed: {e}")
+
+    async def start(self):
+        """Warm the models now and keep them pinned (call from the gateway's event loop)"""
+        if self._task is not None:
+            return
+        await self.warm_all()
+        self._task = asyncio.ensure_future(self._pin())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        return {
+            'url': self.url,
+            'keep_alive': self.keep_alive,
+            'models': dict(self.models),
+            'unavailable': sorted(self.unavailable),
+            'residency': {model: dict(stats) for model, stats in self.stats.items()}
+        }
+
+
+def main():
+    """Print residency of the router's Ollama models (optionally warming them)"""
+    config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'config', 'router_config.json')
+    with open(config_path, 'r') as f:
+        ollama_config = json.load(f)['llm']['ollama']
+
+    async def run():
+        models = ModelResidency.from_config(ollama_config)
+        if "--warm" in sys.argv:
+            await models.warm_all()
+        missing = await models.refresh()
+        print(json.dumps(models.get_stats(), indent=2))
+        if missing:
+            print(f"[Ollama] Not loaded: {', '.join(missing)}")
+        await get_transport().aclose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Payee Clusters - Near-linear fuzzy grouping of payee name variants
+
+Groups names such as "BURGER FI MORRISVILLE" and "BURGERFI" without
+comparing every pair. Candidate pairs come from two blocking passes over
+the names reduced to letters and digits:
+
+    MinHash-LSH over character 3-grams   - shared spelling anywhere in the name
+    sorted neighbourhood                  - shared leading characters
+                                            (store name + location suffixes)
+
+Only candidates are scored, with a Levenshtein distance computed for all
+pairs at once in NumPy. A pair is linked when either the whole-name
+similarity or, for names of MIN_PREFIX+ characters, the similarity of the
+shorter name to the same-length prefix of the longer one reaches the
+threshold. Linked names are merged into clusters (single linkage).
+
+rule_prefix() picks the STARTS.WITH pattern for a cluster: the longest
+prefix its names share that ends on a word boundary in all of them, and
+only if no name outside the cluster starts with it ("TARGET" is refused
+when "TARGETED MARKETING LLC" is among the payees).
+
+Usage:
+    from payee_clusters import cluster_names, rule_prefix
+    clusters = cluster_names(["BURGER FI MORRISVILLE", "BURGERFI", "CVS"])
+    # -> [[0, 1], [2]]
+    population = sorted({name.upper() for name in all_payees})
+    prefix = rule_prefix(["TARGET T-1234", "TARGET STORE 55"], population)
+    # -> 'TARGET', or '' when another payee also starts with it
+"""
+
+import os
+from bisect import bisect_left
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from transaction_anomalies import _components
+
+SIMILARITY_THRESHOLD = 0.85
+MIN_PREFIX = 6            # shortest name compared as a prefix of a longer one
+MAX_NAME_LENGTH = 40      # names are compared on their first 40 characters
+SHINGLE_SIZE = 3
+NUM_BANDS = 16            # LSH bands x rows = MinHash signature length
+BAND_ROWS = 2
+MAX_BUCKET = 50           # LSH buckets larger than this are too generic to use
+NEIGHBOURHOOD = 4         # sorted-neighbourhood window
+SCORE_CHUNK = 20000       # pairs scored per NumPy pass
+MIN_RULE_PREFIX = 5       # shortest STARTS.WITH pattern proposed
+
+_PRIME = (1 << 31) - 1
+
+
+def _compact(name: str) -> str:
+    """Upper-case letters and digits only: 'Wal-Mart #12' -> 'WALMART12'"""
+    return ''.join(ch for ch in name.upper() if ch.isalnum())[:MAX_NAME_LENGTH]
+
+
+def _codes(names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Names as a zero-padded code-point matrix plus their lengths"""
+    lengths = np.fromiter((len(n) for n in names), dtype=np.int64, count=len(names))
+    matrix = np.zeros((len(names), max(int(lengths.max(initial=0)), 1)), dtype=np.uint32)
+    for i, name in enumerate(names):
+        if name:
+            matrix[i, :len(name)] = np.frombuffer(name.encode('utf-32-le'), dtype=np.uint32)
+    return matrix, lengths
+
+
+def levenshtein(a: np.ndarray, a_len: np.ndarray, b: np.ndarray, b_len: np.ndarray) -> np.ndarray:
+    """Edit distance for each row pair of two padded code matrices
+
+    Each DP cell is computed for all pairs at once. Cost grows with the
+    longest names in the batch, so callers pass pairs of similar length.
+    """
+    rows, width = int(a_len.max(initial=0)), int(b_len.max(initial=0))
+    # Pairs along the last axis so every DP cell update is one contiguous vector op
+    a, b = np.ascontiguousarray(a[:, :rows].T), np.ascontiguousarray(b[:, :width].T)
+    prev = np.broadcast_to(np.arange(width + 1, dtype=np.int16)[:, None],
+                           (width + 1, a.shape[1])).copy()
+    cur = np.empty_like(prev)
+    result = b_len.copy()
+    for i in range(1, rows + 1):
+        cur[0] = i
+        np.minimum(prev[:-1] + (b != a[i - 1]), prev[1:] + 1, out=cur[1:])
+        for j in range(1, width + 1):
+            np.minimum(cur[j], cur[j - 1] + 1, out=cur[j])
+        done = np.flatnonzero(a_len == i)
+        result[done] = cur[b_len[done], done]
+        prev, cur = cur, prev
+    return result
+
+
+def _minhash_pairs(names: List[str]) -> np.ndarray:
+    """Candidate pairs (as i * n + j, i < j) sharing an LSH band"""
+    n = len(names)
+    vocab = {}
+    docs, shingles = [], []
+    for i, name in enumerate(names):
+        grams = {name[k:k + SHINGLE_SIZE] for k in range(max(len(name) - SHINGLE_SIZE + 1, 1))}
+        for gram in grams:
+            docs.append(i)
+            shingles.append(vocab.setdefault(gram, len(vocab)))
+    docs = np.array(docs, dtype=np.int64)
+    shingles = np.array(shingles, dtype=np.int64)
+
+    rng = np.random.default_rng(0x5EED)
+    perms = NUM_BANDS * BAND_ROWS
+    a = rng.integers(1, _PRIME, perms, dtype=np.int64)
+    b = rng.integers(0, _PRIME, perms, dtype=np.int64)
+    hashed = (shingles[:, None] * a + b) % _PRIME
+    starts = np.flatnonzero(np.r_[True, np.diff(docs) != 0])
+    signatures = np.minimum.reduceat(hashed, starts, axis=0)
+    owners = docs[starts]
+
+    found = []
+    for band in range(NUM_BANDS):
+        key = np.zeros(len(owners), dtype=np.int64)
+        for row in range(BAND_ROWS):
+            key = key * _PRIME + signatures[:, band * BAND_ROWS + row]
+        order = np.argsort(key, kind='stable')
+        key_sorted = key[order]
+        first = np.searchsorted(key_sorted, key_sorted, side='left')
+        last = np.searchsorted(key_sorted, key_sorted, side='right')
+        usable = (last - first) <= MAX_BUCKET
+        counts = np.where(usable, last - np.arange(len(order)) - 1, 0)
+        left = np.repeat(np.arange(len(order)), counts)
+        offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        right = left + 1 + offsets
+        i, j = owners[order[left]], owners[order[right]]
+        found.append(np.minimum(i, j) * n + np.maximum(i, j))
+    return np.concatenate(found) if found else np.array([], dtype=np.int64)
+
+
+def _neighbour_pairs(names: List[str]) -> np.ndarray:
+    """Candidate pairs within NEIGHBOURHOOD positions in sorted order"""
+    n = len(names)
+    order = np.array(sorted(range(n), key=names.__getitem__), dtype=np.int64)
+    found = []
+    for step in range(1, NEIGHBOURHOOD + 1):
+        i, j = order[:-step], order[step:]
+        found.append(np.minimum(i, j) * n + np.maximum(i, j))
+    return np.concatenate(found) if found else np.array([], dtype=np.int64)
+
+
+def _similarity(codes: np.ndarray, lengths: np.ndarray, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """max(prefix similarity, whole-name similarity) for each candidate pair"""
+    # Orient each pair shorter name first
+    swap = lengths[i] > lengths[j]
+    short_idx, long_idx = np.where(swap, j, i), np.where(swap, i, j)
+    short, long = lengths[short_idx], lengths[long_idx]
+
+    # Shorter name against the same-length prefix of the longer one
+    score = np.zeros(len(i))
+    check = np.flatnonzero(short >= MIN_PREFIX)
+    distance = levenshtein(codes[short_idx[check]], short[check], codes[long_idx[check]], short[check])
+    score[check] = 1.0 - distance / short[check]
+
+    # Whole names, only where the prefix did not already decide it and the
+    # length difference alone does not rule it out
+    check = np.flatnonzero((score < 1.0) & (short > 0) & (short >= 0.5 * long))
+    distance = levenshtein(codes[short_idx[check]], short[check], codes[long_idx[check]], long[check])
+    score[check] = np.maximum(score[check], 1.0 - distance / long[check])
+    return score
+
+
+def cluster_names(names: Sequence[str], threshold: float = SIMILARITY_THRESHOLD) -> List[List[int]]:
+    """Cluster distinct names; returns lists of indexes into `names`"""
+    n = len(names)
+    if n < 2:
+        return [[i] for i in range(n)]
+
+    compact = [_compact(name) for name in names]
+    candidates = np.unique(np.concatenate([_minhash_pairs(compact), _neighbour_pairs(compact)]))
+    first, second = candidates // n, candidates % n
+    keep = first != second
+    first, second = first[keep], second[keep]
+
+    # Score in chunks of similar-length pairs so little of each DP is padding
+    codes, lengths = _codes(compact)
+    order = np.argsort(np.maximum(lengths[first], lengths[second]), kind='stable')
+    linked = np.zeros(len(first), dtype=bool)
+    for start in range(0, len(order), SCORE_CHUNK):
+        chunk = order[start:start + SCORE_CHUNK]
+        linked[chunk] = _similarity(codes, lengths, first[chunk], second[chunk]) >= threshold
+
+    labels = _components(n, first[linked], second[linked])
+    order = np.argsort(labels, kind='stable')
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    return [group.tolist() for group in np.split(order, bounds)]
+
+
+def _word_end(name: str, cut: int) -> bool:
+    """True when name[:cut] ends a word: 'TARGET' in 'TARGET T-1', not in 'TARGETED'"""
+    return cut == len(name) or not name[cut].isalnum()
+
+
+def rule_prefix(variations: Sequence[str], population: Sequence[str],
+                min_length: int = MIN_RULE_PREFIX) -> str:
+    """STARTS.WITH pattern for a cluster's payee variations, or '' if there is none
+
+    population holds every payee name the rule could meet, upper-cased and
+    sorted; a prefix that also starts a name outside the cluster is refused.
+    """
+    names = {name.upper() for name in variations}
+    common = os.path.commonprefix(sorted(names))
+    for cut in range(len(common), min_length - 1, -1):
+        if common[cut - 1].isalnum() and all(_word_end(name, cut) for name in names):
+            break
+    else:
+        return ''
+
+    prefix = common[:cut]
+    start = bisect_left(population, prefix)
+    end = bisect_left(population, prefix + '\U0010ffff')
+    if any(name not in names for name in population[start:end]):
+        return ''
+    return prefix
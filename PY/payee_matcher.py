@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Payee Matcher - Compiled RULE set for payee standardization
+
+Python counterpart of BP STANDARDIZE.PAYEES' APPLY_RULES. Instead of testing
+every active rule against every transaction, the STANDARDIZE rules are
+compiled once:
+
+    EXACT.MATCH   -> dict keyed by the upper-cased pattern
+    STARTS.WITH   -> character trie walked along the payee
+    PAYEE.MATCH   -> Aho-Corasick automaton over all substrings at once
+
+Matching a payee costs O(len(payee)) whatever the number of rules, and the
+winner is the same rule BP would pick: the first matching rule in the order
+LOAD_RULES leaves them (priority, RULE field 5, compared as QM compares;
+its exchange sort is not stable, so tied priorities are ordered as BP
+orders them, not by SELECT order). Each distinct raw payee in a batch is
+matched once. tests/test_payee_matcher.py checks this against a direct
+port of APPLY_RULES.
+
+Usage:
+    python PY/payee_matcher.py [--batch-id BATCH_ID] [--apply]
+
+    from payee_matcher import PayeeMatcher
+    matcher = PayeeMatcher.load(pool)
+    rule = matcher.match("AMAZON.COM*2K4 SEATTLE")
+    result = matcher.standardize_batch(batch_id, pool, apply=True)
+    print(matcher.hits)
+
+Payees no rule matches are left for STANDARDIZE.PAYEES, which fuzzy-matches
+or creates PAYEE records.
+
+RULE fields: 1 type, 2 pattern, 3 action, 4 target, 5 priority, 6 active.
+TRANSACTION fields: 2 original payee, 3 standardized payee, 11 payee id.
+"""
+
+import re
+import sys
+import time
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from qm_pool import get_pool
+from qm_records import FM, read_many, write_many
+from transaction_frame import PayeeIndex
+
+# RULE field positions (1-based)
+RULE_TYPE_FIELD = 1
+RULE_PATTERN_FIELD = 2
+RULE_ACTION_FIELD = 3
+RULE_TARGET_FIELD = 4
+RULE_PRIORITY_FIELD = 5
+RULE_ACTIVE_FIELD = 6
+
+# TRANSACTION field positions (1-based)
+ORIGINAL_PAYEE_FIELD = 2
+STANDARDIZED_PAYEE_FIELD = 3
+PAYEE_ID_FIELD = 11
+
+NO_MATCH = sys.maxsize
+
+# Noise removed by clean_payee_name, applied in this order
+_SUFFIXES = [re.compile(pattern) for pattern in (
+    r'#\d+',           # #123
+    r'\d{3,}',         # 000, 1234
+    r'- PURCHASE',
+    r'- PAYMENT',
+    r'\*+',            # ***
+    r'\.COM',
+    r'\.NET',
+    r'\.ORG',
+    r'\s+INC\.?',
+    r'\s+LLC\.?',
+    r'\s+CORP\.?',
+    r'\s+CO\.?',
+)]
+
+
+@lru_cache(maxsize=65536)
+def clean_payee_name(payee: str) -> str:
+    """Upper-case a raw payee and strip store numbers and company suffixes"""
+    if not payee:
+        return ""
+    cleaned = payee.upper()
+    for suffix in _SUFFIXES:
+        cleaned = suffix.sub('', cleaned)
+    return ' '.join(cleaned.split())
+
+
+_NUMERIC = re.compile(r'[+-]?(\d+\.?\d*|\.\d+)\Z')
+
+
+def _qm_key(priority: str):
+    """(numeric?, number, text) for a QM comparison - NUM("") is true in QM"""
+    if priority == '' or _NUMERIC.match(priority):
+        return True, float(priority or 0), priority
+    return False, 0.0, priority
+
+
+def _qm_greater(a, b) -> bool:
+    """a > b as QM BASIC compares: numerically when both are numeric, else as strings"""
+    if a[0] and b[0]:
+        return a[1] > b[1]
+    return a[2] > b[2]
+
+
+def _bp_rule_order(rules: List[Dict]) -> List[Dict]:
+    """Rules in the order BP LOAD_RULES sorts them (its exchange sort on field 5)"""
+    rules = list(rules)
+    keys = [_qm_key(rule['priority']) for rule in rules]
+    if all(key[0] for key in keys) and len({key[1] for key in keys}) == len(keys):
+        # Distinct numbers: the exchange sort is an ordinary sort
+        return [rule for _, rule in sorted(zip(keys, rules), key=lambda pair: pair[0][1])]
+    for i in range(len(rules) - 1):
+        for j in range(i + 1, len(rules)):
+            if _qm_greater(keys[i], keys[j]):
+                keys[i], keys[j] = keys[j], keys[i]
+                rules[i], rules[j] = rules[j], rules[i]
+    return rules
+
+
+class _Automaton:
+    """Aho-Corasick over upper-cased patterns; reports the best rank seen"""
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.best: List[int] = [NO_MATCH]
+
+    def add(self, pattern: str, rank: int):
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.best.append(NO_MATCH)
+            node = nxt
+        self.best[node] = min(self.best[node], rank)
+
+    def build(self):
+        """Breadth-first failure links; fold each suffix's best rank into the node"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                fail = self.fail[node]
+                while fail and ch not in self.goto[fail]:
+                    fail = self.fail[fail]
+                target = self.goto[fail].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+                self.best[child] = min(self.best[child], self.best[self.fail[child]])
+
+    def scan(self, text: str) -> int:
+        goto, fail, best = self.goto, self.fail, self.best
+        node, found = 0, NO_MATCH
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if best[node] < found:
+                found = best[node]
+        return found
+
+
+class _PrefixTrie:
+    """Character trie of STARTS.WITH patterns; reports the best rank on the path"""
+
+    def __init__(self):
+        self.root: Dict = {}
+
+    def add(self, pattern: str, rank: int):
+        node = self.root
+        for ch in pattern:
+            node = node.setdefault(ch, {})
+        node[None] = min(node.get(None, NO_MATCH), rank)
+
+    def scan(self, text: str) -> int:
+        node, found = self.root, NO_MATCH
+        for ch in text:
+            node = node.get(ch)
+            if node is None:
+                break
+            found = min(found, node.get(None, NO_MATCH))
+        return found
+
+
+class PayeeMatcher:
+    """Active STANDARDIZE rules compiled into hash / trie / automaton lookups"""
+
+    def __init__(self, records: Dict[str, Optional[str]]):
+        """records: RULE id -> raw record, in SELECT order"""
+        active = []
+        for rule_id, raw in records.items():
+            if raw is None:
+                continue
+            fields = raw.split(FM)
+            fields += [''] * (RULE_ACTIVE_FIELD - len(fields))
+            if fields[RULE_ACTIVE_FIELD - 1] != 'Y':
+                continue
+            active.append({
+                'id': rule_id,
+                'type': fields[RULE_TYPE_FIELD - 1],
+                'pattern': fields[RULE_PATTERN_FIELD - 1],
+                'action': fields[RULE_ACTION_FIELD - 1],
+                'target': fields[RULE_TARGET_FIELD - 1],
+                'priority': fields[RULE_PRIORITY_FIELD - 1]
+            })
+        # BP sorts every active rule, then skips non-STANDARDIZE matches;
+        # rank = position in that order
+        rules = [rule for rule in _bp_rule_order(active) if rule['action'] == 'STANDARDIZE']
+        self.rules = rules
+
+        self.exact: Dict[str, int] = {}
+        self.prefixes = _PrefixTrie()
+        self.contains = _Automaton()
+        for rank, rule in enumerate(rules):
+            pattern = rule['pattern'].upper()
+            if not pattern:
+                continue  # an empty pattern would match every payee
+            if rule['type'] == 'EXACT.MATCH':
+                self.exact[pattern] = min(self.exact.get(pattern, NO_MATCH), rank)
+            elif rule['type'] == 'STARTS.WITH':
+                self.prefixes.add(pattern, rank)
+            elif rule['type'] == 'PAYEE.MATCH':
+                self.contains.add(pattern, rank)
+        self.contains.build()
+
+        self.hits: Counter = Counter()
+
+    @classmethod
+    def load(cls, pool=None) -> 'PayeeMatcher':
+        """SELECT RULE once and read every record in batched round-trips"""
+        pool = pool or get_pool()
+        with pool.session() as s:
+            ids = s.select("SELECT RULE")
+        records = read_many("RULE", ids, pool=pool)
+        return cls({rule_id: records.get(rule_id) for rule_id in ids})
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def match(self, raw_payee: str) -> Optional[Dict]:
+        """Highest-priority STANDARDIZE rule matching a raw payee, or None"""
+        text = raw_payee.upper()
+        rank = min(self.exact.get(text, NO_MATCH),
+                   self.prefixes.scan(text),
+                   self.contains.scan(text))
+        return self.rules[rank] if rank != NO_MATCH else None
+
+    def match_many(self, raw_payees: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """Match each distinct payee once; counts per-rule hits per occurrence"""
+        occurrences = Counter(raw_payees)
+        result = {}
+        for payee, count in occurrences.items():
+            rule = self.match(payee)
+            result[payee] = rule
+            if rule is not None:
+                self.hits[rule['id']] += count
+        return result
+
+    def standardize_batch(self, batch_id: str = None, pool=None, apply: bool = False) -> Dict:
+        """Standardize every unstandardized transaction (optionally one batch)
+
+        With apply=True matched transactions get fields 3 and 11 set and are
+        written back in batched round-trips.
+        """
+        pool = pool or get_pool()
+        query = "SELECT TRANSACTION WITH STANDARDIZED.PAYEE = ''"
+        if batch_id:
+            query += f" AND IMPORT.BATCH.ID = '{batch_id}'"
+        with pool.session() as s:
+            ids = s.select(query)
+
+        records = {trans_id: raw.split(FM)
+                   for trans_id, raw in read_many("TRANSACTION", ids, pool=pool).items()
+                   if raw is not None}
+        matches = self.match_many(fields[ORIGINAL_PAYEE_FIELD - 1] if len(fields) >= ORIGINAL_PAYEE_FIELD else ''
+                                  for fields in records.values())
+
+        payees = PayeeIndex.load(pool) if apply else None
+        updates = []
+        unmatched = 0
+        for trans_id, fields in records.items():
+            raw_payee = fields[ORIGINAL_PAYEE_FIELD - 1] if len(fields) >= ORIGINAL_PAYEE_FIELD else ''
+            rule = matches[raw_payee]
+            if rule is None:
+                unmatched += 1
+                continue
+            if apply:
+                fields += [''] * (PAYEE_ID_FIELD - len(fields))
+                fields[STANDARDIZED_PAYEE_FIELD - 1] = rule['target']
+                payee = payees.by_name.get(rule['target'])
+                fields[PAYEE_ID_FIELD - 1] = payee['id'] if payee else ''
+                updates.append((trans_id, FM.join(fields)))
+
+        written = write_many("TRANSACTION", updates, pool=pool) if updates else 0
+        return {
+            'processed': len(records),
+            'standardized': len(records) - unmatched,
+            'unmatched': unmatched,
+            'written': written,
+            'distinct_payees': len(matches)
+        }
+
+    def hit_report(self) -> List[Dict]:
+        """Rules by hit count, most used first"""
+        by_id = {rule['id']: rule for rule in self.rules}
+        return [dict(by_id[rule_id], hits=count) for rule_id, count in self.hits.most_common()]
+
+
+def main():
+    """Command-line interface"""
+    batch_id = None
+    if "--batch-id" in sys.argv:
+        idx = sys.argv.index("--batch-id")
+        if idx + 1 < len(sys.argv):
+            batch_id = sys.argv[idx + 1]
+    apply = "--apply" in sys.argv
+
+    pool = get_pool()
+    start = time.time()
+    matcher = PayeeMatcher.load(pool)
+    print(f"Compiled {len(matcher)} active STANDARDIZE rules in {time.time() - start:.3f}s")
+
+    start = time.time()
+    result = matcher.standardize_batch(batch_id, pool, apply=apply)
+    print(f"Processed {result['processed']} transactions "
+          f"({result['distinct_payees']} distinct payees) in {time.time() - start:.3f}s")
+    print(f"  Standardized: {result['standardized']}")
+    print(f"  Unmatched:    {result['unmatched']} (run STANDARDIZE.PAYEES to fuzzy-match/create)")
+    if apply:
+        print(f"  Written:      {result['written']}")
+    else:
+        print("  Dry run - use --apply to write")
+
+    print("\nRule hits:")
+    for rule in matcher.hit_report():
+        print(f"  {rule['hits']:6d}  {rule['id']:<20} {rule['type']:<12} {rule['pattern']} -> {rule['target']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+QM Record Cache - In-process read-through cache for hot QM files
+
+Records are cached by (file, id) only for files that opt in. Reads through
+QMSession.read() and qm_records.read_many() consult the cache; writes through
+QMSession.write() and qm_records.write_many() invalidate the written ids.
+Writes made outside this process (QM BASIC, other clients) are only picked up
+when the entry's TTL expires, so keep TTLs short for files edited elsewhere.
+
+Usage:
+    from qm_cache import enable_cache, record_cache
+
+    enable_cache('PAYEE', ttl=600)
+    enable_cache('TRANSACTION', ttl=120)
+    print(record_cache.get_stats())
+
+Files can also be enabled with QM_CACHE_FILES, e.g.
+    QM_CACHE_FILES=MEDICATION:60,PERSON:300,APPOINTMENT:60
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional
+
+CACHE_MAX_ENTRIES = int(os.getenv("QM_CACHE_SIZE", "20000"))
+DEFAULT_TTL = 300  # seconds
+
+_MISSING = object()
+
+
+class RecordCache:
+    """Size-bounded LRU of raw records with per-file TTLs"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # (file, id) -> (expires, raw record or None)
+        self._ttls: Dict[str, float] = {}
+        # Bumped on every invalidation so a read that raced a write is not cached
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'expired': 0,
+                                          'evictions': 0, 'invalidations': 0})
+
+    def enable(self, file_name: str, ttl: float = DEFAULT_TTL):
+        """Opt a file in to caching"""
+        with self._lock:
+            self._ttls[file_name] = ttl
+
+    def disable(self, file_name: str):
+        """Stop caching a file and drop its entries"""
+        with self._lock:
+            self._ttls.pop(file_name, None)
+        self.invalidate_file(file_name)
+
+    def is_cached(self, file_name: str) -> bool:
+        return file_name in self._ttls
+
+    def generation(self, file_name: str) -> int:
+        """Token to pass to put() for a read started now
+
+        Changes whenever this process writes the file, so it also serves as a
+        data version for derived caches (see response_cache).
+        """
+        return self._generations[file_name]
+
+    def get(self, file_name: str, record_id: str):
+        """Return the cached raw record (None = known missing) or _MISSING"""
+        key = (file_name, record_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            stats = self.stats[file_name]
+            if entry is None:
+                stats['misses'] += 1
+                return _MISSING
+            expires, raw = entry
+            if expires < time.time():
+                del self._entries[key]
+                stats['expired'] += 1
+                stats['misses'] += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            stats['hits'] += 1
+            return raw
+
+    def put(self, file_name: str, record_id: str, raw: Optional[str], generation: int):
+        """Store a record read under the given generation token"""
+        with self._lock:
+            ttl = self._ttls.get(file_name)
+            if ttl is None or self._generations[file_name] != generation:
+                return
+            key = (file_name, record_id)
+            self._entries[key] = (time.time() + ttl, raw)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                (evicted_file, _), _ = self._entries.popitem(last=False)
+                self.stats[evicted_file]['evictions'] += 1
+
+    def invalidate(self, file_name: str, record_id: str):
+        """Drop one record after it was written"""
+        with self._lock:
+            # Bumped for every file, cached or not: it doubles as a data version
+            self._generations[file_name] += 1
+            if file_name not in self._ttls:
+                return
+            if self._entries.pop((file_name, record_id), None) is not None:
+                self.stats[file_name]['invalidations'] += 1
+
+    def invalidate_file(self, file_name: str):
+        """Drop every cached record of a file"""
+        with self._lock:
+            self._generations[file_name] += 1
+            for key in [k for k in self._entries if k[0] == file_name]:
+                del self._entries[key]
+                self.stats[file_name]['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            for file_name in list(self._generations):
+                self._generations[file_name] += 1
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Per-file counters plus totals, for health endpoints"""
+        with self._lock:
+            files = {name: dict(counts, ttl=self._ttls.get(name))
+                     for name, counts in self.stats.items()}
+            hits = sum(c['hits'] for c in files.values())
+            misses = sum(c['misses'] for c in files.values())
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                'files': files
+            }
+
+
+# Process-wide cache shared by qm_pool and qm_records
+record_cache = RecordCache()
+
+
+def enable_cache(file_name: str, ttl: float = DEFAULT_TTL):
+    """Opt a file in to the shared record cache"""
+    record_cache.enable(file_name, ttl)
+
+
+def is_missing(value) -> bool:
+    """True when RecordCache.get() found nothing usable"""
+    return value is _MISSING
+
+
+for _spec in filter(None, os.getenv("QM_CACHE_FILES", "").split(',')):
+    _name, _, _ttl = _spec.strip().partition(':')
+    enable_cache(_name, float(_ttl) if _ttl else DEFAULT_TTL)
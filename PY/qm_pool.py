@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+QM Session Pool - Long-lived QMClient sessions shared by HAL tools
+
+Replaces the process-per-command executor (qm.exe + command_input.txt)
+with a bounded pool of persistent QMClient sessions.
+
+Usage:
+    from qm_pool import get_pool, execute_qm_command
+
+    result = execute_qm_command("COUNT MEDICATION")
+    print(result['output'])
+
+    pool = get_pool()
+    with pool.session() as s:
+        output, status = s.execute("LIST.READU")
+
+Notes:
+- The qmclient module routes calls through a "current session", so every
+  call selects its session with SetSession() under a module lock.
+  Callers still share warm connections instead of spawning qm.exe.
+- qm.Read() returns (record, err); read() hides that and returns None
+  for missing records.
+- read()/write() go through the shared record cache (qm_cache) for files
+  that have opted in.
+- pool.execute(command, timeout=30) raises QMTimeoutError for a command
+  still running after 30 seconds; its session is closed once it returns.
+- Connection settings come from QM_HOST, QM_PORT, QM_USER, QM_PASSWORD
+  and QM_ACCOUNT. QM_HOST=local uses ConnectLocal().
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from qm_cache import is_missing, record_cache
+
+# Add SYSCOM to Python path for QMClient module
+sys.path.insert(0, r'C:\QMSYS\SYSCOM')
+
+try:
+    import qmclient as qm
+    QMCLIENT_AVAILABLE = True
+    # Older qmclient.py builds have no session switching - pool degrades to one session
+    MULTI_SESSION = hasattr(qm, 'SetSession') and hasattr(qm, 'GetSession')
+except ImportError:
+    qm = None
+    QMCLIENT_AVAILABLE = False
+    MULTI_SESSION = False
+
+# Configuration
+QM_HOST = os.getenv("QM_HOST", "localhost")
+QM_PORT = int(os.getenv("QM_PORT", "4243"))
+QM_USER = os.getenv("QM_USER", "")
+QM_PASSWORD = os.getenv("QM_PASSWORD", "")
+QM_ACCOUNT = os.getenv("QM_ACCOUNT", "HAL")
+
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = int(os.getenv("QM_POOL_SIZE", "4"))
+IDLE_TIMEOUT = 300          # seconds before an idle session above min size is closed
+HEALTH_CHECK_INTERVAL = 60  # seconds of idleness before a session is probed
+ACQUIRE_TIMEOUT = 10        # seconds to wait for a free session
+
+# qmclient routes every call through the current session
+_qm_lock = threading.RLock()
+
+
+class QMPoolError(Exception):
+    """Raised when a pooled QM session cannot be obtained"""
+
+
+class QMTimeoutError(QMPoolError):
+    """Raised when a command outlives the caller's timeout"""
+
+
+class QMSession:
+    """One persistent QMClient session"""
+
+    def __init__(self, host: str, port: int, user: str, password: str, account: str):
+        self.account = account
+        self.handle = None
+        self.created = time.time()
+        self.last_used = self.created
+        self.commands = 0
+        self._files: Dict[str, int] = {}
+
+        with _qm_lock:
+            if host.lower() == 'local':
+                ok = qm.ConnectLocal(account)
+            else:
+                ok = qm.Connect(host, port, user, password, account)
+            if not ok:
+                raise QMPoolError(f"QM connection failed: {qm.Error()}")
+            self.handle = qm.GetSession() if MULTI_SESSION else 1
+
+    def _select(self):
+        if MULTI_SESSION:
+            qm.SetSession(self.handle)
+
+    def execute(self, command: str) -> Tuple[str, int]:
+        """Execute a command, returning (output, status) like qm.Execute"""
+        with _qm_lock:
+            self._select()
+            result = qm.Execute(command)
+        self.commands += 1
+        self.last_used = time.time()
+        return result
+
+    def open(self, file_name: str) -> int:
+        """Open a file once per session and return its file number"""
+        fno = self._files.get(file_name)
+        if fno:
+            return fno
+        with _qm_lock:
+            self._select()
+            fno = qm.Open(file_name)
+        if not fno:
+            raise QMPoolError(f"Failed to open {file_name}: {qm.Error()}")
+        self._files[file_name] = fno
+        return fno
+
+    def read(self, file_name: str, record_id: str, cache: bool = True) -> Optional[str]:
+        """Read a raw dynamic array, or None if the record does not exist"""
+        cached = cache and record_cache.is_cached(file_name)
+        if cached:
+            hit = record_cache.get(file_name, record_id)
+            if not is_missing(hit):
+                return hit
+            generation = record_cache.generation(file_name)
+
+        fno = self.open(file_name)
+        with _qm_lock:
+            self._select()
+            record, err = qm.Read(fno, record_id)
+        self.last_used = time.time()
+        record = record if err == 0 else None
+
+        if cached:
+            record_cache.put(file_name, record_id, record, generation)
+        return record
+
+    def write(self, file_name: str, record_id: str, record: str):
+        """Write a raw dynamic array"""
+        fno = self.open(file_name)
+        with _qm_lock:
+            self._select()
+            qm.Write(fno, record_id, record)
+        self.last_used = time.time()
+        record_cache.invalidate(file_name, record_id)
+
+    def select(self, command: str) -> List[str]:
+        """Run a SELECT-type command and return the ids from select list 0"""
+        with _qm_lock:
+            self._select()
+            qm.Execute(command)
+            ids = qm.ReadList(0)
+        self.last_used = time.time()
+        return ids.split(chr(254)) if ids else []
+
+    def call(self, subr_name: str, *args: str) -> List[str]:
+        """Call a catalogued subroutine and return the updated argument values"""
+        with _qm_lock:
+            self._select()
+            qm.Call(subr_name, len(args), *args)
+            result = [qm.GetArg(i) for i in range(1, len(args) + 1)]
+        self.commands += 1
+        self.last_used = time.time()
+        return result
+
+    def is_healthy(self) -> bool:
+        """Check the session is still connected; probe it if idle for a while"""
+        try:
+            with _qm_lock:
+                self._select()
+                if not qm.Connected():
+                    return False
+                if time.time() - self.last_used > HEALTH_CHECK_INTERVAL:
+                    qm.Execute("WHO")
+                    self.last_used = time.time()
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        """Disconnect this session"""
+        if self.handle is None:
+            return
+        try:
+            with _qm_lock:
+                self._select()
+                qm.Disconnect()
+        except Exception:
+            pass
+        self.handle = None
+        self._files.clear()
+
+
+class QMSessionPool:
+    """Bounded pool of QMSession objects with health checks and idle eviction"""
+
+    def __init__(self, host: str = QM_HOST, port: int = QM_PORT, user: str = QM_USER,
+                 password: str = QM_PASSWORD, account: str = QM_ACCOUNT,
+                 min_size: int = POOL_MIN_SIZE, max_size: int = POOL_MAX_SIZE,
+                 idle_timeout: float = IDLE_TIMEOUT):
+        if not QMCLIENT_AVAILABLE:
+            raise QMPoolError("QMClient not available")
+
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.account = account
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size, 1) if MULTI_SESSION else 1
+        self.idle_timeout = idle_timeout
+
+        self._idle: List[QMSession] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.stats = {'created': 0, 'evicted': 0, 'unhealthy': 0, 'checkouts': 0}
+
+    def _new_session(self) -> QMSession:
+        session = QMSession(self.host, self.port, self.user, self.password, self.account)
+        self.stats['created'] += 1
+        print(f"[QM Pool] Opened session {session.handle} ({self.account})")
+        return session
+
+    def acquire(self, timeout: float = ACQUIRE_TIMEOUT) -> QMSession:
+        """Check out a healthy session, creating one if the pool has room"""
+        deadline = time.time() + timeout
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise QMPoolError("QM session pool is closed")
+                self._evict_idle_locked()
+
+                session = self._idle.pop() if self._idle else None
+                if session is None and self._size < self.max_size:
+                    self._size += 1
+                    create = True
+                else:
+                    create = False
+
+                if session is None and not create:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise QMPoolError(f"No QM session available after {timeout}s")
+                    self._cond.wait(remaining)
+                    continue
+
+            if create:
+                try:
+                    session = self._new_session()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not session.is_healthy():
+                self.stats['unhealthy'] += 1
+                self._discard(session)
+                continue
+
+            self.stats['checkouts'] += 1
+            return session
+
+    def release(self, session: QMSession):
+        """Return a session to the pool"""
+        with self._cond:
+            if self._closed or session.handle is None:
+                self._size -= 1
+                session.close()
+            else:
+                self._idle.append(session)
+            self._cond.notify()
+
+    def _discard(self, session: QMSession):
+        session.close()
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _evict_idle_locked(self):
+        """Close idle sessions beyond min_size (caller holds the condition)"""
+        now = time.time()
+        keep = []
+        for session in self._idle:
+            if (now - session.last_used > self.idle_timeout
+                    and self._size > self.min_size):
+                session.close()
+                self._size -= 1
+                self.stats['evicted'] += 1
+            else:
+                keep.append(session)
+        self._idle = keep
+
+    @contextmanager
+    def session(self, timeout: float = ACQUIRE_TIMEOUT):
+        """Context manager that checks a session out and returns it"""
+        session = self.acquire(timeout)
+        try:
+            yield session
+        except Exception:
+            # Connection state is unknown after a failure - do not reuse blindly
+            if not session.is_healthy():
+                self._discard(session)
+                session = None
+            raise
+        finally:
+            if session is not None:
+                self.release(session)
+
+    def execute(self, command: str, timeout: float = None) -> Tuple[str, int]:
+        """Execute a command on any free session, returning (output, status)
+
+        With a timeout, a command still running after that many seconds raises
+        QMTimeoutError. qm.Execute cannot be interrupted, so the command keeps
+        its session until it returns; that session is then closed, not reused.
+        """
+        if timeout is None:
+            with self.session() as s:
+                return s.execute(command)
+
+        session = self.acquire()
+        outcome = {}
+        state = {'finished': False, 'abandoned': False}
+        state_lock = threading.Lock()
+        done = threading.Event()
+
+        def run():
+            try:
+                outcome['result'] = session.execute(command)
+            except Exception as e:
+                outcome['error'] = e
+            with state_lock:
+                state['finished'] = True
+                abandoned = state['abandoned']
+            if abandoned or ('error' in outcome and not session.is_healthy()):
+                self._discard(session)
+            else:
+                self.release(session)
+            done.set()
+
+        threading.Thread(target=run, name='qm-execute', daemon=True).start()
+        if not done.wait(timeout):
+            with state_lock:
+                state['abandoned'] = not state['finished']
+            if state['abandoned']:
+                raise QMTimeoutError(f"QM command timed out after {timeout}s: {command}")
+            done.wait()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
+
+    def read(self, file_name: str, record_id: str) -> Optional[str]:
+        """Read a raw record on any free session"""
+        with self.session() as s:
+            return s.read(file_name, record_id)
+
+    def write(self, file_name: str, record_id: str, record: str):
+        """Write a raw record on any free session"""
+        with self.session() as s:
+            s.write(file_name, record_id, record)
+
+    def get_stats(self) -> Dict:
+        """Pool counters for health endpoints"""
+        with self._cond:
+            return dict(self.stats, size=self._size, idle=len(self._idle),
+                        max_size=self.max_size)
+
+    def close(self):
+        """Disconnect every idle session and refuse new checkouts"""
+        with self._cond:
+            self._closed = True
+            for session in self._idle:
+                session.close()
+                self._size -= 1
+            self._idle = []
+            self._cond.notify_all()
+
+
+# Singleton pools, one per account
+_pools: Dict[str, QMSessionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(account: str = QM_ACCOUNT, **kwargs) -> QMSessionPool:
+    """Get or create the shared pool for an account"""
+    with _pools_lock:
+        pool = _pools.get(account)
+        if pool is None:
+            pool = QMSessionPool(account=account, **kwargs)
+            _pools[account] = pool
+        return pool
+
+
+def execute_qm_command(command: str, account: str = QM_ACCOUNT, timeout: float = None) -> Dict:
+    """Execute a QM command on a pooled session and return a result dict"""
+    try:
+        output, status = get_pool(account).execute(command, timeout)
+        return {
+            'success': status == 0,
+            'status': status,
+            'output': (output or '').strip(),
+            'command': command
+        }
+    except Exception as e:
+        print(f"[QM Pool] Error executing '{command}': {e}")
+        return {
+            'success': False,
+            'status': -1,
+            'output': str(e),
+            'command': command
+        }
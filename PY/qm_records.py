@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+QM Records - Multivalue record codec and batched record I/O
+
+Shared replacement for hand-built '\\xfe'.join(...) records and one
+qm.Write() per record in the import scripts.
+
+Codec:
+    encode_record(['P001', ['a', 'b'], 42])  ->  'P001\\xfea\\xfdb\\xfe42'
+    decode_record(raw)                       ->  ['P001', ['a', 'b'], '42']
+
+Typed field maps (from the file's DICT, or SCHEMA/<FILE>.csv as fallback):
+    fmap = FieldMap.load('MEDICATION')
+    raw = fmap.encode({'PERSON_ID': 'P001', 'START_DATE': date(2025, 1, 2)})
+    rec = fmap.decode(raw)
+
+Batched I/O (one QMCall round-trip per chunk via BP RECORD.BATCH):
+    write_many('PASSWORD', [(rec_id, raw), ...])
+    records = read_many('TRANSACTION', ids)
+
+Field-numbered records ({1: 'x', 2: ['a', 'b']}) over the pool:
+    client = RecordClient('HAL', cache={'PAYEE': 600})
+    ids = client.select('TRANSACTION', "SELECT TRANSACTION WITH CATEGORY = ''")
+    trans = client.read('TRANSACTION', ids[0])
+
+Files opted in to qm_cache are served from the record cache and
+invalidated by these writes.
+
+BP RECORD.BATCH must be compiled and catalogued:
+    BASIC BP RECORD.BATCH
+    CATALOG BP RECORD.BATCH
+If it is not available the calls fall back to per-record I/O on the same
+pooled session.
+"""
+
+import csv
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from qm_cache import is_missing, record_cache
+from qm_pool import get_pool
+
+# Delimiters
+FM = chr(254)  # Field mark
+VM = chr(253)  # Value mark
+SM = chr(252)  # Subvalue mark
+TM = chr(251)  # Text mark
+MARKS = FM + VM + SM + TM + chr(255)
+
+BATCH_SUBROUTINE = "RECORD.BATCH"
+BATCH_SIZE = 200
+
+QM_EPOCH = date(1967, 12, 31)  # QM internal day 0
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "SCHEMA")
+
+_ESCAPE_TABLE = str.maketrans({mark: ' ' for mark in MARKS})
+
+
+# === Codec ===
+
+def escape(value) -> str:
+    """Convert a scalar to text that cannot break the record structure"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Y' if value else 'N'
+    return str(value).translate(_ESCAPE_TABLE)
+
+
+def encode_value(value) -> str:
+    """Encode one field: scalars as-is, lists as values, nested lists as subvalues"""
+    if isinstance(value, (list, tuple)):
+        return VM.join(
+            SM.join(escape(sv) for sv in v) if isinstance(v, (list, tuple)) else escape(v)
+            for v in value
+        )
+    return escape(value)
+
+
+def decode_value(text: str, multi: bool = False):
+    """Decode one field; multi=True always returns a list of values"""
+    if text is None:
+        text = ''
+    if not multi and VM not in text and SM not in text:
+        return text
+    if not text:
+        return []
+    return [v.split(SM) if SM in v else v for v in text.split(VM)]
+
+
+def encode_record(fields) -> str:
+    """Build a dynamic array from a list (field 1 first) or a {field_no: value} dict"""
+    if isinstance(fields, dict):
+        if not fields:
+            return ''
+        values = [''] * max(fields)
+        for field_no, value in fields.items():
+            values[field_no - 1] = encode_value(value)
+    else:
+        values = [encode_value(v) for v in fields]
+
+    # Trailing empty fields are not stored by QM
+    while values and values[-1] == '':
+        values.pop()
+    return FM.join(values)
+
+
+def decode_record(raw: Optional[str]) -> List:
+    """Split a dynamic array into fields (index 0 = field 1)"""
+    if not raw:
+        return []
+    return [decode_value(f) for f in raw.split(FM)]
+
+
+def internal_date(value=None) -> str:
+    """Convert a date/datetime/ISO string to QM internal day number"""
+    if value is None or value == '':
+        value = date.today()
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if isinstance(value, datetime):
+        value = value.date()
+    return str((value - QM_EPOCH).days)
+
+
+def external_date(value: str) -> Optional[date]:
+    """Convert a QM internal day number back to a date"""
+    try:
+        return QM_EPOCH + timedelta(days=int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+# === Typed field maps ===
+
+class DictField:
+    """One D-type dictionary item"""
+
+    def __init__(self, name: str, position: int, conv: str = '', multi: bool = False):
+        self.name = name
+        self.position = position
+        self.conv = (conv or '').upper()
+        self.multi = multi
+
+    def _scale(self) -> int:
+        digits = self.conv[2:3]
+        return int(digits) if digits.isdigit() else 0
+
+    def to_internal(self, value) -> str:
+        if isinstance(value, (list, tuple)):
+            return VM.join(self.to_internal(v) for v in value)
+        if value is None or value == '':
+            return ''
+        if self.conv.startswith('D') and isinstance(value, (date, datetime)):
+            return internal_date(value)
+        if self.conv.startswith('MD') and isinstance(value, (int, float)):
+            return str(int(round(value * 10 ** self._scale())))
+        if self.conv.startswith('MT') and isinstance(value, datetime):
+            return str(value.hour * 3600 + value.minute * 60 + value.second)
+        return escape(value)
+
+    def from_internal(self, text: str):
+        if self.multi or VM in text:
+            return [self.from_internal(v) for v in text.split(VM)] if text else []
+        if text == '':
+            return ''
+        if self.conv.startswith('D'):
+            return external_date(text) or text
+        if self.conv.startswith('MD'):
+            try:
+                return int(text) / 10 ** self._scale() if self._scale() else float(text)
+            except ValueError:
+                return text
+        return text
+
+
+class FieldMap:
+    """Name <-> position map for a file, typed by its dictionary conversions"""
+
+    def __init__(self, file_name: str, fields: Iterable[DictField]):
+        self.file_name = file_name
+        self.fields: Dict[str, DictField] = {f.name: f for f in fields if f.position > 0}
+
+    @classmethod
+    def load(cls, file_name: str, pool=None) -> 'FieldMap':
+        """Build from DICT <file>, falling back to SCHEMA/<file>.csv"""
+        try:
+            fmap = cls.from_dict(file_name, pool)
+            if fmap.fields:
+                return fmap
+        except Exception as e:
+            print(f"[QM Records] DICT {file_name} unavailable ({e}), using schema CSV")
+        return cls.from_schema_csv(file_name)
+
+    @classmethod
+    def from_dict(cls, file_name: str, pool=None) -> 'FieldMap':
+        """Read every D-type item from the file dictionary"""
+        pool = pool or get_pool()
+        dict_file = f"DICT {file_name}"
+        with pool.session() as s:
+            ids = s.select(f"SELECT {dict_file}")
+        items = read_many(dict_file, ids, pool=pool)
+
+        fields = []
+        for name, raw in items.items():
+            rec = (raw or '').split(FM)
+            if len(rec) < 2 or not rec[0].upper().startswith('D'):
+                continue
+            try:
+                position = int(rec[1])
+            except ValueError:
+                continue
+            conv = rec[2] if len(rec) > 2 else ''
+            multi = len(rec) > 5 and rec[5].upper().startswith('M')
+            fields.append(DictField(name, position, conv, multi))
+        return cls(file_name, fields)
+
+    @classmethod
+    def from_schema_csv(cls, file_name: str) -> 'FieldMap':
+        """Read SCHEMA/<file>.csv (FieldName, FieldNum, Type, ...)"""
+        path = os.path.join(SCHEMA_DIR, f"{file_name}.csv")
+        fields = []
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    try:
+                        position = int(row.get('FieldNum', 0))
+                    except ValueError:
+                        continue
+                    field_type = (row.get('Type') or '').upper()
+                    conv = 'D' if field_type == 'D' else ''
+                    fields.append(DictField(row['FieldName'], position, conv, field_type == 'M'))
+        return cls(file_name, fields)
+
+    def encode(self, values: Dict) -> str:
+        """Build a record from {field_name: value}; unknown names are skipped"""
+        by_position = {}
+        for name, value in values.items():
+            field = self.fields.get(name)
+            if field:
+                by_position[field.position] = field.to_internal(value)
+        if not by_position:
+            return ''
+        out = [''] * max(by_position)
+        for position, text in by_position.items():
+            out[position - 1] = text
+        return encode_record(out)
+
+    def decode(self, raw: Optional[str]) -> Dict:
+        """Split a record into {field_name: value}"""
+        rec = (raw or '').split(FM)
+        result = {}
+        for name, field in self.fields.items():
+            text = rec[field.position - 1] if field.position <= len(rec) else ''
+            result[name] = field.from_internal(text)
+        return result
+
+
+# === Batched I/O ===
+
+class RecordBatchError(Exception):
+    """Raised when RECORD.BATCH reports an error (e.g. file cannot be opened)"""
+
+
+_batch_available = True
+
+# RECORD.BATCH refuses a WRITE whose lengths do not add up to DATA
+LENGTH_MISMATCH = "LENGTH MISMATCH"
+
+# qm.Call error text when the subroutine is not in the catalog
+NOT_CATALOGUED = ('not catalogued', 'not cataloged', 'not in catalog', 'not found', 'cannot find')
+
+
+def _chunks(items: List, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _batch_call(s, *args) -> Optional[List[str]]:
+    """
+    RECORD.BATCH on session s; returns the updated arguments, or None once
+    the subroutine is known not to be catalogued (batching is then off for
+    the process). Any other failure propagates - it says nothing about
+    whether batching works.
+    """
+    global _batch_available
+    try:
+        return s.call(BATCH_SUBROUTINE, *args)
+    except Exception as e:
+        if not any(marker in str(e).lower() for marker in NOT_CATALOGUED):
+            raise
+        print(f"[QM Records] {BATCH_SUBROUTINE} not catalogued ({e}), using per-record I/O")
+        _batch_available = False
+        return None
+
+
+def _split_batch(chunk: List[str], lens: str, data: str) -> Optional[Dict[str, Optional[str]]]:
+    """Split a READ result by LENS; None if the lengths do not frame DATA exactly"""
+    lengths = lens.split(FM) if lens else []
+    if len(lengths) != len(chunk):
+        return None
+    records: Dict[str, Optional[str]] = {}
+    pos = 0
+    for rec_id, length in zip(chunk, lengths):
+        length = int(length)
+        if length < 0:
+            records[rec_id] = None
+        else:
+            records[rec_id] = data[pos:pos + length]
+            pos += length
+    # QM counts characters as it stores them; a record that crossed the
+    # wire with a different length shifts every record after it
+    return records if pos == len(data) else None
+
+
+def write_many(file_name: str, records: Iterable[Tuple[str, str]],
+               chunk_size: int = BATCH_SIZE, pool=None) -> int:
+    """Write (id, raw_record) pairs in chunks over one pooled session"""
+    records = list(records)
+    if not records:
+        return 0
+
+    pool = pool or get_pool()
+    written = 0
+    with pool.session() as s:
+        for chunk in _chunks(records, chunk_size):
+            if _batch_available:
+                ids = FM.join(rec_id for rec_id, _ in chunk)
+                lens = FM.join(str(len(raw)) for _, raw in chunk)
+                data = ''.join(raw for _, raw in chunk)
+                result = _batch_call(s, "WRITE", file_name, ids, lens, data, "")
+                if result is not None:
+                    errmsg = result[5]
+                    if not errmsg:
+                        for rec_id, _ in chunk:
+                            record_cache.invalidate(file_name, rec_id)
+                        written += len(chunk)
+                        continue
+                    if not errmsg.startswith(LENGTH_MISMATCH):
+                        raise RecordBatchError(errmsg)
+                    # Nothing was written; this chunk goes record by record
+                    print(f"[QM Records] {file_name}: {errmsg}, writing chunk per record")
+
+            for rec_id, raw in chunk:
+                s.write(file_name, rec_id, raw)
+                written += 1
+
+    return written
+
+
+def read_many(file_name: str, ids: Iterable[str], chunk_size: int = BATCH_SIZE,
+              pool=None) -> Dict[str, Optional[str]]:
+    """Read records in chunks; missing ids map to None"""
+    ids = list(ids)
+    result: Dict[str, Optional[str]] = {}
+    if not ids:
+        return result
+
+    # Serve what we can from the record cache, fetch the rest
+    cached = record_cache.is_cached(file_name)
+    if cached:
+        generation = record_cache.generation(file_name)
+        wanted = []
+        for rec_id in ids:
+            hit = record_cache.get(file_name, rec_id)
+            if is_missing(hit):
+                wanted.append(rec_id)
+            else:
+                result[rec_id] = hit
+        ids = wanted
+        if not ids:
+            return result
+
+    pool = pool or get_pool()
+    with pool.session() as s:
+        for chunk in _chunks(ids, chunk_size):
+            if _batch_available:
+                batch = _batch_call(s, "READ", file_name, FM.join(chunk), "", "", "")
+                if batch is not None:
+                    _, _, _, lens, data, errmsg = batch
+                    if errmsg:
+                        raise RecordBatchError(errmsg)
+                    records = _split_batch(chunk, lens, data)
+                    if records is not None:
+                        result.update(records)
+                        continue
+                    print(f"[QM Records] {file_name}: {LENGTH_MISMATCH.lower()} in batch read, "
+                          f"reading chunk per record")
+
+            for rec_id in chunk:
+                result[rec_id] = s.read(file_name, rec_id, cache=False)
+
+    if cached:
+        for rec_id in ids:
+            record_cache.put(file_name, rec_id, result.get(rec_id), generation)
+    return result
+
+
+# === Field-numbered record client ===
+
+class RecordClient:
+    """select/read/write over a pooled session with records as {field_no: value}"""
+
+    def __init__(self, account: str = None, pool=None, cache: Dict[str, float] = None):
+        self.pool = pool or (get_pool(account) if account else get_pool())
+        for file_name, ttl in (cache or {}).items():
+            record_cache.enable(file_name, ttl)
+
+    @staticmethod
+    def _to_dict(raw: Optional[str]) -> Optional[Dict[int, object]]:
+        if raw is None:
+            return None
+        return {i: value for i, value in enumerate(decode_record(raw), 1)}
+
+    def select(self, file_name: str, query: str = None) -> List[str]:
+        """Run a SELECT (default: the whole file) and return the ids"""
+        with self.pool.session() as s:
+            return s.select(query or f"SELECT {file_name}")
+
+    def read(self, file_name: str, record_id: str) -> Optional[Dict[int, object]]:
+        with self.pool.session() as s:
+            return self._to_dict(s.read(file_name, record_id))
+
+    def read_many(self, file_name: str, ids: Iterable[str]) -> Dict[str, Optional[Dict[int, object]]]:
+        return {rec_id: self._to_dict(raw)
+                for rec_id, raw in read_many(file_name, ids, pool=self.pool).items()}
+
+    def write(self, file_name: str, record_id: str, fields: Dict[int, object]):
+        with self.pool.session() as s:
+            s.write(file_name, record_id, encode_record(fields))
+
+    def disconnect(self):
+        """Sessions belong to the shared pool - nothing to close per client"""
@@ -4,20 +4,30 @@ Query Router - Routes queries to appropriate handlers
 Handles: Home Assistant, Database, LLM (Ollama/OpenAI/Claude)
 """
 
-import re
 import os
 import json
-from typing import Dict, Tuple
+import asyncio
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
 
 # Handler modules
-from home_assistant_handler import handle_home_assistant
-from database_handler import handle_database_query
-from llm_handler import handle_llm_query
+from home_assistant_handler import ahandle_home_assistant, handle_home_assistant
+from database_handler import ahandle_database_query, data_files, handle_database_query
+from llm_handler import ahandle_llm_query, astream_llm_query, handle_llm_query, stream_llm_query
+from ai_server_client import get_client as get_ai_server, request_sync
+from intent_classifier import IntentClassifier
+from response_cache import ResponseCache
+from conversation_context import summary_prompt
+from ollama_models import ModelResidency
 
 class QueryRouter:
-    def __init__(self, config_path=None):
-        """Initialize router with configuration"""
+    def __init__(self, config_path=None, speculative: bool = None):
+        """Initialize router with configuration
+        speculative: override config['speculative']['enabled'] (see aroute_query)"""
         self.config = self.load_config(config_path)
+        if speculative is not None:
+            self.config['speculative'] = dict(self.config['speculative'], enabled=speculative)
         
         # Intent patterns
         self.home_assistant_patterns = [
@@ -38,22 +48,64 @@ class QueryRouter:
             r'\b(how many|count|total)\b',
         ]
         
+        self.compile_intents()
+        
+        # Repeated questions are answered from memory (see response_cache)
+        cache_config = self.config['cache']
+        self.response_cache = None
+        if cache_config['enabled']:
+            self.response_cache = ResponseCache(cache_config['ttls'], cache_config['max_entries'])
+        
+        # Optional embedding router, consulted only when no regex is confident
+        self.semantic = None
+        if self.config['semantic']['enabled']:
+            self.semantic = self._load_semantic(self.config['semantic'])
+        
+        # Ollama models kept loaded between queries (see awarm_models)
+        self.models = None
+        if self.config['llm'].get('provider', 'ollama') == 'ollama':
+            self.models = ModelResidency.from_config(self.config['llm']['ollama'])
+    
+    def intent_tables(self) -> List[Tuple[str, float, List[str]]]:
+        """Intent pattern tables in priority order (first match wins)"""
+        builtin_patterns = [
+            r'\b(what|current|tell me)\s+(time|date)\b',
+            # Greetings only count in short utterances (under 20 characters)
+            r'^(?=[\s\S]{0,19}\Z)[\s\S]*\b(hello|hi|hey)\b',
+        ]
+        return [
+            ('builtin', 0.95, builtin_patterns),
+            ('home_assistant', 0.9, self.home_assistant_patterns),
+            ('database', 0.85, self.database_patterns),
+        ]
+    
+    def compile_intents(self):
+        """(Re)compile the pattern tables - call after editing them"""
+        self.intents = IntentClassifier(self.intent_tables(), default=('llm', 0.7))
+        self._prepared = OrderedDict()  # intents detected early (see prepare)
+        
     def load_config(self, config_path):
         """Load configuration from file or use defaults"""
         default_config = {
             'llm': {
                 'provider': 'ollama',  # ollama, openai, claude
+                # context_tokens: prompt budget for conversation history
                 'ollama': {
                     'url': 'http://10.1.10.20:11434',
-                    'model': 'llama3.2:latest'
+                    'model': 'llama3.2:latest',
+                    'classification_model': None,  # digests and short tasks; None = 'model'
+                    'keep_alive': '30m',           # how long Ollama keeps a model loaded
+                    'context_tokens': 1024
                 },
                 'openai': {
                     'api_key': os.getenv('OPENAI_API_KEY', ''),
-                    'model': 'gpt-4'
+                    'model': 'gpt-4',
+                    'context_tokens': 2048
                 },
                 'claude': {
                     'api_key': os.getenv('ANTHROPIC_API_KEY', ''),
-                    'model': 'claude-3-sonnet-20240229'
+                    'model': 'claude-3-sonnet-20240229',
+                    'context_tokens': 2048
                 }
             },
             'home_assistant': {
@@ -64,6 +116,28 @@ class QueryRouter:
             'database': {
                 'enabled': True,
                 'default_account': 'HAL'
+            },
+            'semantic': {
+                'enabled': False,
+                'model': 'sentence-transformers/all-MiniLM-L6-v2',
+                'examples': 'config/intent_examples.json',
+                'threshold': 0.5,         # minimum embedding score to override
+                'regex_confidence': 0.8   # regex results below this consult embeddings
+            },
+            'cache': {
+                'enabled': True,
+                'max_entries': 1000,
+                # seconds; 0 = never cached (time-sensitive or side effects)
+                'ttls': {'builtin': 0, 'home_assistant': 0, 'database': 60, 'llm': 3600}
+            },
+            'speculative': {
+                'enabled': False,
+                'below_confidence': 0.9,  # intents detected under this race their runners-up
+                'top_k': 2,               # handlers launched at once, best guess included
+                'min_score': 0.6,         # an answer must come from an intent scoring this much
+                'exclusive': ['home_assistant'],  # side effects - never launched on a guess
+                # milliseconds a handler may take before its answer is abandoned
+                'budgets_ms': {'builtin': 2000, 'home_assistant': 5000, 'database': 5000, 'llm': 30000}
             }
         }
         
@@ -75,32 +149,114 @@ class QueryRouter:
         
         return default_config
     
+    def _load_semantic(self, semantic_config):
+        """Build the embedding router; returns None if it cannot be loaded"""
+        # Imported here so routers without it never pay the torch import
+        try:
+            from semantic_router import SemanticRouter, SEMANTIC_AVAILABLE
+        except ImportError as e:
+            print(f"[Router] Semantic routing unavailable: {e}")
+            return None
+        if not SEMANTIC_AVAILABLE:
+            print("[Router] Semantic routing disabled: sentence-transformers not installed")
+            return None
+        
+        examples = semantic_config['examples']
+        if not os.path.isabs(examples):
+            examples = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), examples)
+        try:
+            router = SemanticRouter.from_file(examples, semantic_config['model'])
+            print(f"[Router] Semantic routing enabled ({semantic_config['model']})")
+            return router
+        except Exception as e:
+            print(f"[Router] Semantic routing failed to load: {e}")
+            return None
+    
     def detect_intent(self, query: str) -> Tuple[str, float]:
         """
         Detect query intent
         Returns: (intent_type, confidence)
         intent_type: 'home_assistant', 'database', 'llm', 'builtin'
+        
+        Built-in queries (time, date, hello) have the highest priority, then
+        Home Assistant, then database; anything else goes to the LLM.
+        Regex matches are the fast path. When they are not confident (i.e.
+        the LLM default) and semantic routing is enabled, the nearest
+        labelled examples decide if they score above the threshold.
         """
-        query_lower = query.lower()
+        intent, confidence = self.intents.best(query.lower())
         
-        # Check for built-in queries (time, date, hello) - HIGHEST PRIORITY
-        if re.search(r'\b(what|current|tell me)\s+(time|date)\b', query_lower):
-            return ('builtin', 0.95)
-        if re.search(r'\b(hello|hi|hey)\b', query_lower) and len(query_lower) < 20:
-            return ('builtin', 0.95)
+        semantic = self.config['semantic']
+        if self.semantic is not None and confidence < semantic['regex_confidence']:
+            semantic_intent, score = self.semantic.route(query)
+            print(f"[Router] Semantic: {semantic_intent} ({score:.2f}, {self.semantic.last_ms:.1f} ms)")
+            if score >= semantic['threshold']:
+                return (semantic_intent, round(score, 2))
         
-        # Check Home Assistant patterns
-        for pattern in self.home_assistant_patterns:
-            if re.search(pattern, query_lower):
-                return ('home_assistant', 0.9)
+        return (intent, confidence)
+    
+    def prepare(self, query: str) -> Tuple[str, float]:
+        """
+        Detect the intent of a likely query ahead of time (a stable partial
+        transcript) - the final query finds it in the memo if the words match
+        """
+        key = ' '.join(query.lower().split())
+        if key not in self._prepared:
+            self._prepared[key] = self.detect_intent(query)
+            while len(self._prepared) > 32:
+                self._prepared.popitem(last=False)
+        return self._prepared[key]
+    
+    def _detect_prepared(self, query: str) -> Tuple[str, float]:
+        """detect_intent, answered from prepare()'s memo when the query was seen early"""
+        prepared = self._prepared.pop(' '.join(query.lower().split()), None)
+        return prepared if prepared is not None else self.detect_intent(query)
+    
+    def classify_intents(self, query: str) -> List[Dict]:
+        """Every matching intent with its score, highest priority first"""
+        return self.intents.classify(query.lower())
+    
+    def _cached(self, query: str, intent: str, confidence: float, context: list = None):
+        """(cache key, cached response or None) - answers repeats from the response cache"""
+        if self.response_cache is None:
+            return None, None
+        files = data_files(query) if intent == 'database' else []
+        cache_key = self.response_cache.key(query, intent, files,
+                                            context if intent == 'llm' else None)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            print("[Router] Cache hit")
+            cached['intent'] = intent
+            cached['confidence'] = confidence
+        return cache_key, cached
+    
+    def _finish(self, response, intent: str, confidence: float, cache_key=None) -> Dict:
+        """Add metadata and remember the answer"""
+        if isinstance(response, dict):
+            response['intent'] = intent
+            response['confidence'] = confidence
+        else:
+            response = {
+                'text': str(response),
+                'intent': intent,
+                'confidence': confidence,
+                'status': 'success'
+            }
         
-        # Check Database patterns
-        for pattern in self.database_patterns:
-            if re.search(pattern, query_lower):
-                return ('database', 0.85)
+        if cache_key is not None:
+            self.response_cache.put(cache_key, response)
         
-        # Default to LLM for general queries
-        return ('llm', 0.7)
+        return response
+    
+    def _error_response(self, e: Exception) -> Dict:
+        print(f"[Router] Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return {
+            'text': f"I encountered an error processing your request: {e}",
+            'intent': 'error',
+            'status': 'error'
+        }
     
     def route_query(self, query: str, session_id: str = 'unknown', context: list = None) -> Dict:
         """
@@ -114,11 +270,13 @@ class QueryRouter:
             print(f"[Router] Intent: {intent} (confidence: {confidence})")
             print(f"[Router] Query: {query[:50]}...")
             
+            cache_key, cached = self._cached(query, intent, confidence, context)
+            if cached is not None:
+                return cached
+            
             # Route to handler
             if intent == 'builtin':
                 # Use AI.SERVER for built-in queries (time, date, hello)
-                import socket
-                import json
                 response = self._query_ai_server(query, session_id)
                 
             elif intent == 'home_assistant' and self.config['home_assistant']['enabled']:
@@ -144,61 +302,284 @@ class QueryRouter:
                     context
                 )
             
-            # Add metadata
-            if isinstance(response, dict):
-                response['intent'] = intent
-                response['confidence'] = confidence
-            else:
-                response = {
-                    'text': str(response),
-                    'intent': intent,
-                    'confidence': confidence,
-                    'status': 'success'
-                }
+            return self._finish(response, intent, confidence, cache_key)
             
-            return response
+        except Exception as e:
+            return self._error_response(e)
+    
+    async def aroute_query(self, query: str, session_id: str = 'unknown', context: list = None) -> Dict:
+        """
+        Async route_query for the gateways' event loops
+        Handlers use the pooled aiohttp sessions and the async AI.SERVER
+        client, so no thread is held while waiting. Cancelling the task
+        (user said "stop") cancels the upstream call; CancelledError is
+        not turned into an error response.
+        """
+        try:
+            intent, confidence = self._detect_prepared(query)
+            
+            print(f"[Router] Intent: {intent} (confidence: {confidence})")
+            print(f"[Router] Query: {query[:50]}...")
+            
+            candidates = self.speculative_candidates(query, intent, confidence)
+            if candidates:
+                return await self._aspeculate(query, session_id, context, candidates)
+            
+            cache_key, cached = self._cached(query, intent, confidence, context)
+            if cached is not None:
+                return cached
+            
+            response = await self._ahandle(intent, query, session_id, context)
+            return self._finish(response, intent, confidence, cache_key)
             
         except Exception as e:
-            print(f"[Router] Error: {e}")
-            import traceback
-            traceback.print_exc()
-            return {
-                'text': f"I encountered an error processing your request: {e}",
-                'intent': 'error',
+            return self._error_response(e)
+    
+    async def _ahandle(self, intent: str, query: str, session_id: str, context: list = None):
+        """Run one intent's async handler"""
+        if intent == 'builtin':
+            return await self._aquery_ai_server(query, session_id)
+            
+        elif intent == 'home_assistant' and self.config['home_assistant']['enabled']:
+            return await ahandle_home_assistant(
+                query,
+                self.config['home_assistant'],
+                session_id
+            )
+            
+        elif intent == 'database' and self.config['database']['enabled']:
+            return await ahandle_database_query(
+                query,
+                self.config['database'],
+                session_id,
+                context
+            )
+            
+        else:  # LLM
+            return await ahandle_llm_query(
+                query,
+                self.config['llm'],
+                session_id,
+                context
+            )
+    
+    def speculative_candidates(self, query: str, intent: str, confidence: float) -> List[Tuple[str, float]]:
+        """
+        Intents to race when the detected one is marginal, best guess first
+        Returns [] (no speculation) when disabled, when the guess is
+        confident, or when it is an exclusive (side-effecting) intent.
+        """
+        spec = self.config['speculative']
+        exclusive = set(spec['exclusive'])
+        if not spec['enabled'] or confidence >= spec['below_confidence'] or intent in exclusive:
+            return []
+        
+        scores = {}
+        for match in self.classify_intents(query):
+            scores.setdefault(match['intent'], match['score'])
+        default_intent, default_score = self.intents.default
+        scores.setdefault(default_intent, default_score)
+        if self.semantic is not None:
+            # Embedding scores only add intents they are sure about
+            for name, score in self.semantic.scores(query).items():
+                if score >= self.config['semantic']['threshold'] and score > scores.get(name, 0):
+                    scores[name] = round(score, 2)
+        
+        disabled = {name for name in ('home_assistant', 'database') if not self.config[name]['enabled']}
+        runners_up = sorted(
+            ((name, score) for name, score in scores.items()
+             if name != intent and name not in exclusive and name not in disabled),
+            key=lambda item: -item[1]
+        )
+        candidates = [(intent, confidence)] + runners_up
+        return candidates[:spec['top_k']] if len(candidates) > 1 else []
+    
+    async def _aspeculate(self, query: str, session_id: str, context: list,
+                          candidates: List[Tuple[str, float]]) -> Dict:
+        """
+        Run the candidate handlers concurrently; the first successful answer
+        from an intent scoring at least min_score wins and the rest are
+        cancelled. If none qualifies, the best guess's own answer is returned.
+        """
+        spec = self.config['speculative']
+        budgets = spec['budgets_ms']
+        start = time.perf_counter()
+        
+        async def run(intent: str, score: float):
+            try:
+                cache_key, cached = self._cached(query, intent, score, context)
+                if cached is not None:
+                    return intent, score, cached
+                budget = budgets.get(intent, max(budgets.values())) / 1000
+                response = await asyncio.wait_for(self._ahandle(intent, query, session_id, context), budget)
+                return intent, score, self._finish(response, intent, score, cache_key)
+            except asyncio.TimeoutError:
+                print(f"[Router] Speculative: {intent} over its latency budget")
+            except Exception as e:
+                print(f"[Router] Speculative: {intent} failed: {e}")
+            return intent, score, None
+        
+        names = [intent for intent, _ in candidates]
+        print(f"[Router] Speculative: racing {', '.join(names)}")
+        tasks = [asyncio.ensure_future(run(intent, score)) for intent, score in candidates]
+        fallback = None
+        try:
+            for finished in asyncio.as_completed(tasks):
+                intent, score, response = await finished
+                if response is None:
+                    continue
+                if response.get('status') == 'success' and response.get('score', score) >= spec['min_score']:
+                    elapsed = (time.perf_counter() - start) * 1000
+                    print(f"[Router] Speculative: {intent} won in {elapsed:.0f} ms")
+                    response['speculative'] = names
+                    return response
+                if intent == names[0]:
+                    fallback = response
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        
+        if fallback is None:
+            fallback = {
+                'text': "Sorry, I couldn't get an answer in time.",
+                'intent': names[0],
+                'confidence': candidates[0][1],
                 'status': 'error'
             }
+        fallback['speculative'] = names
+        return fallback
+    
+    def stream_query(self, query: str, session_id: str = 'unknown', context: list = None) -> Iterator[Dict]:
+        """
+        Route query, streaming LLM answers as they are generated
+        Yields: {'type': 'delta', 'text': ...} for each LLM token delta, then
+                {'type': 'done', 'response': <route_query-style response>}
+        Non-LLM intents (and cached LLM answers) yield 'done' only.
+        """
+        intent, confidence = self.detect_intent(query)
+        if intent != 'llm':
+            # Nothing to stream: answer the usual way
+            yield {'type': 'done', 'response': self.route_query(query, session_id, context)}
+            return
+        
+        cache_key, cached = self._cached(query, intent, confidence, context)
+        if cached is not None:
+            yield {'type': 'done', 'response': cached}
+            return
+        
+        print(f"[Router] Intent: {intent} (confidence: {confidence}), streaming")
+        print(f"[Router] Query: {query[:50]}...")
+        
+        llm_config = self.config['llm']
+        parts = []
+        try:
+            for delta in stream_llm_query(query, llm_config, context):
+                parts.append(delta)
+                yield {'type': 'delta', 'text': delta}
+            response = self._streamed(parts)
+        except Exception as e:
+            print(f"[Router] LLM stream error: {e}")
+            response = self._streamed(parts, error=True)
+            if response is None:
+                # Nothing said yet - fall back to a full request, which reports its own errors
+                response = handle_llm_query(query, llm_config, session_id, context)
+        
+        yield {'type': 'done', 'response': self._finish(response, intent, confidence, cache_key)}
+    
+    async def astream_query(self, query: str, session_id: str = 'unknown',
+                            context: list = None) -> AsyncIterator[Dict]:
+        """Async stream_query - same events; cancelling closes the LLM stream
+        Marginal intents raced speculatively answer in one 'done' event."""
+        intent, confidence = self._detect_prepared(query)
+        if intent != 'llm' or self.speculative_candidates(query, intent, confidence):
+            yield {'type': 'done', 'response': await self.aroute_query(query, session_id, context)}
+            return
+        
+        cache_key, cached = self._cached(query, intent, confidence, context)
+        if cached is not None:
+            yield {'type': 'done', 'response': cached}
+            return
+        
+        print(f"[Router] Intent: {intent} (confidence: {confidence}), streaming")
+        print(f"[Router] Query: {query[:50]}...")
+        
+        llm_config = self.config['llm']
+        parts = []
+        try:
+            async for delta in astream_llm_query(query, llm_config, context):
+                parts.append(delta)
+                yield {'type': 'delta', 'text': delta}
+            response = self._streamed(parts)
+        except Exception as e:
+            print(f"[Router] LLM stream error: {e}")
+            response = self._streamed(parts, error=True)
+            if response is None:
+                response = await ahandle_llm_query(query, llm_config, session_id, context)
+        
+        yield {'type': 'done', 'response': self._finish(response, intent, confidence, cache_key)}
+    
+    def _streamed(self, parts: List[str], error: bool = False):
+        """Response for a finished (or broken-off) LLM stream; None if nothing was said"""
+        llm_config = self.config['llm']
+        provider = llm_config.get('provider', 'ollama')
+        text = ''.join(parts).strip()
+        if error:
+            return {'text': text, 'provider': provider, 'status': 'error'} if text else None
+        return {
+            'text': text,
+            'model': llm_config.get(provider, {}).get('model'),
+            'provider': provider,
+            'status': 'success'
+        }
+    
+    async def asummarize(self, digest: str, transcript: str) -> str:
+        """Fold transcript into a conversation digest (ConversationContext's summarizer)"""
+        response = await ahandle_llm_query(summary_prompt(digest, transcript),
+                                           self.task_config('summary'), 'context-digest')
+        if response.get('status') != 'success':
+            raise RuntimeError(response.get('text'))
+        return response['text']
+    
+    def task_config(self, task: str) -> Dict:
+        """LLM config for a task - classification-sized work runs on the small Ollama model"""
+        llm_config = self.config['llm']
+        if self.models is None:
+            return llm_config
+        model = self.models.model_for(task)
+        return dict(llm_config, ollama=dict(llm_config['ollama'], model=model))
+    
+    async def awarm_models(self):
+        """Load the Ollama models and keep them resident (run as a task at gateway start)"""
+        if self.models is not None:
+            await self.models.start()
     
     def _query_ai_server(self, query: str, session_id: str) -> Dict:
         """Query AI.SERVER directly for built-in responses"""
-        import socket
-        import json
+        message = {'type': 'text_input', 'text': query, 'session_id': session_id}
         
         try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(5.0)
-            s.connect(('10.1.34.103', 8745))
-            
-            message = {'type': 'text_input', 'text': query, 'session_id': session_id}
-            s.sendall(json.dumps(message).encode() + b'\n')
-            
-            response_data = b""
-            while True:
-                chunk = s.recv(4096)
-                if not chunk:
-                    break
-                response_data += chunk
-                if b'}' in chunk:
-                    break
-            
-            s.close()
-            
-            if response_data:
-                result = json.loads(response_data.decode())
-                return {
-                    'text': result.get('text', 'No response'),
-                    'status': result.get('status', 'success'),
-                    'intent': 'builtin'
-                }
+            result = request_sync(message, timeout=5.0)
+            return {
+                'text': result.get('text', 'No response'),
+                'status': result.get('status', 'success'),
+                'intent': 'builtin'
+            }
+        except Exception as e:
+            print(f"[Router] AI.SERVER error: {e}")
+            return {'text': f'Error: {e}', 'status': 'error', 'intent': 'builtin'}
+    
+    async def _aquery_ai_server(self, query: str, session_id: str) -> Dict:
+        """Async _query_ai_server on the event loop's own AI.SERVER client"""
+        message = {'type': 'text_input', 'text': query, 'session_id': session_id}
+        
+        try:
+            result = await get_ai_server().request(message, timeout=5.0)
+            return {
+                'text': result.get('text', 'No response'),
+                'status': result.get('status', 'success'),
+                'intent': 'builtin'
+            }
         except Exception as e:
             print(f"[Router] AI.SERVER error: {e}")
             return {'text': f'Error: {e}', 'status': 'error', 'intent': 'builtin'}
@@ -217,3 +598,18 @@ def route_query(query: str, session_id: str = 'unknown', context: list = None, c
     """Convenience function to route a query"""
     router = get_router(config_path)
     return router.route_query(query, session_id, context)
+
+def stream_query(query: str, session_id: str = 'unknown', context: list = None, config_path=None) -> Iterator[Dict]:
+    """Convenience function to route a query with streamed LLM output"""
+    router = get_router(config_path)
+    return router.stream_query(query, session_id, context)
+
+async def aroute_query(query: str, session_id: str = 'unknown', context: list = None, config_path=None) -> Dict:
+    """Convenience function to route a query from async code"""
+    router = get_router(config_path)
+    return await router.aroute_query(query, session_id, context)
+
+def astream_query(query: str, session_id: str = 'unknown', context: list = None, config_path=None) -> AsyncIterator[Dict]:
+    """Convenience function to stream a routed query from async code"""
+    router = get_router(config_path)
+    return router.astream_query(query, session_id, context)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Response Cache - Memoized router answers for repeated spoken queries
+
+Sits in front of QueryRouter.route_query. Entries are keyed by
+    normalized query text + intent + data version (+ LLM context)
+where the data version is the qm_cache generation of every QM file the
+handler reads, so an answer is dropped as soon as this process writes one
+of those files. Writes made elsewhere are covered by the per-intent TTL.
+
+Intents with a TTL of 0 are never cached: builtins (time/date change by
+the second) and Home Assistant commands (they act, not answer).
+
+Usage:
+    from response_cache import ResponseCache
+
+    cache = ResponseCache(ttls={'database': 60, 'llm': 3600})
+    key = cache.key(query, 'database', files=['MEDICATION'])
+    response = cache.get(key)
+    if response is None:
+        response = handler(...)
+        cache.put(key, response)
+"""
+
+import copy
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from qm_cache import record_cache
+
+DEFAULT_TTLS = {
+    'builtin': 0,
+    'home_assistant': 0,
+    'database': 60,
+    'llm': 3600,
+}
+MAX_ENTRIES = 1000
+
+_PUNCTUATION = re.compile(r"[^\w\s']+")
+
+
+def normalize(text: str) -> str:
+    """'What medications am I taking?' -> 'what medications am i taking'"""
+    return ' '.join(_PUNCTUATION.sub(' ', text.lower()).split())
+
+
+class ResponseCache:
+    """LRU of router responses with per-intent TTLs"""
+
+    def __init__(self, ttls: Dict[str, float] = None, max_entries: int = MAX_ENTRIES):
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'bypassed': 0, 'evictions': 0})
+
+    def key(self, query: str, intent: str, files: Iterable[str] = (),
+            context: list = None) -> Optional[Tuple]:
+        """Cache key, or None when this intent is not cached"""
+        if not self.ttls.get(intent):
+            self.stats[intent]['bypassed'] += 1
+            return None
+        version = tuple((name, record_cache.generation(name)) for name in sorted(files))
+        context_digest = ''
+        if context:
+            # ConversationContext carries a digest of older turns beside the list
+            payload = [getattr(context, 'digest', ''), context]
+            context_digest = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str)
+                                          .encode('utf-8')).hexdigest()
+        return (normalize(query), intent, version, context_digest)
+
+    def get(self, key: Optional[Tuple]) -> Optional[Dict]:
+        """Cached response (a copy, marked 'cached') or None"""
+        if key is None:
+            return None
+        intent = key[1]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats[intent]['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats[intent]['hits'] += 1
+            response = entry[1]
+        response = copy.copy(response)
+        response['cached'] = True
+        return response
+
+    def put(self, key: Optional[Tuple], response: Dict):
+        """Store a successful response"""
+        if key is None or not isinstance(response, dict) or response.get('status') != 'success':
+            return
+        intent = key[1]
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttls[intent], copy.copy(response))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                (_, evicted_intent, _, _), _ = self._entries.popitem(last=False)
+                self.stats[evicted_intent]['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            intents = {name: dict(counts, ttl=self.ttls.get(name)) for name, counts in self.stats.items()}
+            hits = sum(c['hits'] for c in intents.values())
+            misses = sum(c['misses'] for c in intents.values())
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                'intents': intents
+            }
@@ -2,20 +2,17 @@
 """
 Run all schema setup programs in sequence
 """
-import sys
 import os
-sys.path.insert(0, r'c:\QMSYS\SYSCOM')
-import qmclient as qm
+from qm_pool import get_pool
 
 def check_and_create_voc(file_name):
     """Check if VOC entry exists and create if needed"""
     print(f"\nChecking {file_name} VOC entry...")
-    result = qm.Execute(f"LIST VOC {file_name}")
+    result = pool.execute(f"LIST VOC {file_name}")
     if "not found" in result[0].lower() or "no records" in result[0].lower():
         print(f"Creating VOC entry for {file_name}...")
         voc_rec = f"F\xfe{file_name}\xfe\xfeD\xfe"
-        fno = qm.Open("VOC")
-        qm.Write(fno, file_name, voc_rec)
+        pool.write("VOC", file_name, voc_rec)
         print("VOC entry created")
         return True
     else:
@@ -30,7 +27,7 @@ def compile_and_run(program_name):
     
     # Compile
     print(f"\nCompiling BP {program_name}...")
-    result = qm.Execute(f"BASIC BP {program_name}")
+    result = pool.execute(f"BASIC BP {program_name}")
     if result[1] != 0:
         print(f"Error compiling: {result[0]}")
         return False
@@ -38,7 +35,7 @@ def compile_and_run(program_name):
     
     # Catalog
     print(f"\nCataloging BP {program_name}...")
-    result = qm.Execute(f"CATALOG BP {program_name} LOCAL")
+    result = pool.execute(f"CATALOG BP {program_name} LOCAL")
     if result[1] != 0:
         print(f"Error cataloging: {result[0]}")
         return False
@@ -46,7 +43,7 @@ def compile_and_run(program_name):
     
     # Run
     print(f"\nRunning {program_name}...")
-    result = qm.Execute(f"RUN BP {program_name}")
+    result = pool.execute(f"RUN BP {program_name}")
     print(result[0])
     
     return True
@@ -56,7 +53,8 @@ print("="*60)
 print("HAL Schema Setup - Running All Setup Programs")
 print("="*60)
 print("\nConnecting to QM...")
-qm.Connect('localhost', 4243, 'lawr', 'apgar-66', 'HAL')
+pool = get_pool('HAL', user='lawr', password='apgar-66')
+pool.release(pool.acquire())  # opens a session now, so a failed login stops here
 print("Connected!")
 
 # Setup DOMAINS
@@ -81,23 +79,23 @@ print("FINAL VERIFICATION")
 print("="*60)
 
 print("\n--- DOMAINS ---")
-result = qm.Execute("COUNT DOMAINS")
+result = pool.execute("COUNT DOMAINS")
 print(result[0])
 
 print("\n--- FILES ---")
-result = qm.Execute("COUNT FILES")
+result = pool.execute("COUNT FILES")
 print(result[0])
 
 print("\n--- FIELDS ---")
-result = qm.Execute("COUNT FIELDS")
+result = pool.execute("COUNT FIELDS")
 print(result[0])
 
 print("\n--- DOM_FILE_FIELD ---")
-result = qm.Execute("COUNT DOM_FILE_FIELD")
+result = pool.execute("COUNT DOM_FILE_FIELD")
 print(result[0])
 
 # Disconnect
-qm.Disconnect()
+pool.close()
 
 print("\n" + "="*60)
 print("All schema setup programs completed successfully!")
@@ -2,25 +2,24 @@
 """
 Compile and run BUILD.ALL.SETUPS program
 """
-import sys
-sys.path.insert(0, r'c:\QMSYS\SYSCOM')
-import qmclient as qm
+from qm_pool import get_pool
 
 print("Connecting to QM...")
-qm.Connect('localhost', 4243, 'lawr', 'apgar-66', 'HAL')
+pool = get_pool('HAL', user='lawr', password='apgar-66')
+pool.release(pool.acquire())  # opens a session now, so a failed login stops here
 print("Connected!\n")
 
 print("Compiling BP BUILD.ALL.SETUPS...")
-result = qm.Execute("BASIC BP BUILD.ALL.SETUPS")
+result = pool.execute("BASIC BP BUILD.ALL.SETUPS")
 print(result[0])
 
 print("\nCataloging BP BUILD.ALL.SETUPS...")
-result = qm.Execute("CATALOG BP BUILD.ALL.SETUPS LOCAL")
+result = pool.execute("CATALOG BP BUILD.ALL.SETUPS LOCAL")
 print(result[0])
 
 print("\nRunning BUILD.ALL.SETUPS...\n")
-result = qm.Execute("RUN BP BUILD.ALL.SETUPS")
+result = pool.execute("RUN BP BUILD.ALL.SETUPS")
 print(result[0])
 
-qm.Disconnect()
+pool.close()
 print("\nDone!")
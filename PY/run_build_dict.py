@@ -2,29 +2,27 @@
 """
 Compile and run BUILD.DICT program
 """
-import sys
-sys.path.insert(0, r'c:\QMSYS\SYSCOM')
-import qmclient as qm
+from qm_pool import get_pool
 
-qm.Connect('localhost', 4243, 'lawr', 'apgar-66', 'HAL')
+pool = get_pool('HAL', user='lawr', password='apgar-66')
 
 print("Compiling BP BUILD.DICT...")
-result = qm.Execute("BASIC BP BUILD.DICT")
+result = pool.execute("BASIC BP BUILD.DICT")
 print(result[0])
 
 print("\nCataloging BP BUILD.DICT...")
-result = qm.Execute("CATALOG BP BUILD.DICT LOCAL")
+result = pool.execute("CATALOG BP BUILD.DICT LOCAL")
 print(result[0])
 
 print("\nRunning BUILD.DICT EMAIL...")
-result = qm.Execute("BUILD.DICT EMAIL")
+result = pool.execute("BUILD.DICT EMAIL")
 print(result[0])
 
 print("\n" + "="*60)
 print("Verifying EMAIL dictionary...")
 print("="*60)
-result = qm.Execute("LIST DICT EMAIL")
+result = pool.execute("LIST DICT EMAIL")
 print(result[0])
 
-qm.Disconnect()
+pool.close()
 print("\nDone!")
@@ -2,29 +2,27 @@
 """
 Compile and run SETUP.COMMON.FIELDS program
 """
-import sys
-sys.path.insert(0, r'c:\QMSYS\SYSCOM')
-import qmclient as qm
+from qm_pool import get_pool
 
-qm.Connect('localhost', 4243, 'lawr', 'apgar-66', 'HAL')
+pool = get_pool('HAL', user='lawr', password='apgar-66')
 
 print("Compiling BP SETUP.COMMON.FIELDS...")
-result = qm.Execute("BASIC BP SETUP.COMMON.FIELDS")
+result = pool.execute("BASIC BP SETUP.COMMON.FIELDS")
 print(result[0])
 
 print("\nCataloging BP SETUP.COMMON.FIELDS...")
-result = qm.Execute("CATALOG BP SETUP.COMMON.FIELDS LOCAL")
+result = pool.execute("CATALOG BP SETUP.COMMON.FIELDS LOCAL")
 print(result[0])
 
 print("\nRunning SETUP.COMMON.FIELDS...")
-result = qm.Execute("RUN BP SETUP.COMMON.FIELDS")
+result = pool.execute("RUN BP SETUP.COMMON.FIELDS")
 print(result[0])
 
 print("\n" + "="*60)
 print("Verifying FIELDS file...")
 print("="*60)
-result = qm.Execute("COUNT FIELDS")
+result = pool.execute("COUNT FIELDS")
 print(result[0])
 
-qm.Disconnect()
+pool.close()
 print("\nDone!")
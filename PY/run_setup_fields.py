@@ -2,50 +2,48 @@
 """
 Compile and run SETUP.FIELDS program
 """
-import sys
 import os
-sys.path.insert(0, r'c:\QMSYS\SYSCOM')
-import qmclient as qm
+from qm_pool import get_pool
 
 # Connect to QM
 print("Connecting to QM...")
-qm.Connect('localhost', 4243, 'lawr', 'apgar-66', 'HAL')
+pool = get_pool('HAL', user='lawr', password='apgar-66')
+pool.release(pool.acquire())  # opens a session now, so a failed login stops here
 print("Connected!")
 
 # Check if FIELDS VOC entry exists, if not create it
 print("\nChecking FIELDS VOC entry...")
-result = qm.Execute("LIST VOC FIELDS")
+result = pool.execute("LIST VOC FIELDS")
 if "not found" in result[0].lower() or "no records" in result[0].lower():
     print("Creating VOC entry for FIELDS...")
     voc_rec = "F\xfeFIELDS\xfe\xfeD\xfe"
-    fno = qm.Open("VOC")
-    qm.Write(fno, "FIELDS", voc_rec)
+    pool.write("VOC", "FIELDS", voc_rec)
     print("VOC entry created")
 else:
     print("VOC entry exists")
 
 # Compile SETUP.FIELDS
 print("\nCompiling BP SETUP.FIELDS...")
-result = qm.Execute("BASIC BP SETUP.FIELDS")
+result = pool.execute("BASIC BP SETUP.FIELDS")
 print(result)
 
 # Catalog it to local catalog
 print("\nCataloging BP SETUP.FIELDS...")
-result = qm.Execute("CATALOG BP SETUP.FIELDS LOCAL")
+result = pool.execute("CATALOG BP SETUP.FIELDS LOCAL")
 print(result)
 
 # Run it
 print("\nRunning SETUP.FIELDS...")
-result = qm.Execute("RUN BP SETUP.FIELDS")
+result = pool.execute("RUN BP SETUP.FIELDS")
 print(result)
 
 # Verify the data
 print("\n" + "="*50)
 print("Verifying FIELDS file...")
 print("="*50)
-result = qm.Execute("LIST FIELDS DISPLAY_DESC CONV LEN_JUST")
+result = pool.execute("LIST FIELDS DISPLAY_DESC CONV LEN_JUST")
 print(result[0])
 
 # Disconnect
-qm.Disconnect()
+pool.close()
 print("\nDone!")
@@ -2,38 +2,37 @@
 """
 Compile and run SETUP.FILES program
 """
-import sys
 import os
-sys.path.insert(0, r'c:\QMSYS\SYSCOM')
-import qmclient as qm
+from qm_pool import get_pool
 
 # Connect to QM
 print("Connecting to QM...")
-qm.Connect('localhost', 4243, 'lawr', 'apgar-66', 'HAL')
+pool = get_pool('HAL', user='lawr', password='apgar-66')
+pool.release(pool.acquire())  # opens a session now, so a failed login stops here
 print("Connected!")
 
 # Compile SETUP.FILES
 print("\nCompiling BP SETUP.FILES...")
-result = qm.Execute("BASIC BP SETUP.FILES")
+result = pool.execute("BASIC BP SETUP.FILES")
 print(result)
 
 # Catalog it to local catalog
 print("\nCataloging BP SETUP.FILES...")
-result = qm.Execute("CATALOG BP SETUP.FILES LOCAL")
+result = pool.execute("CATALOG BP SETUP.FILES LOCAL")
 print(result)
 
 # Run it
 print("\nRunning SETUP.FILES...")
-result = qm.Execute("RUN BP SETUP.FILES")
+result = pool.execute("RUN BP SETUP.FILES")
 print(result)
 
 # Verify the data
 print("\n" + "="*50)
 print("Verifying FILES file...")
 print("="*50)
-result = qm.Execute("LIST FILES FILE_ABB FILE_DESCRIPTION DOMAIN")
+result = pool.execute("LIST FILES FILE_ABB FILE_DESCRIPTION DOMAIN")
 print(result[0])
 
 # Disconnect
-qm.Disconnect()
+pool.close()
 print("\nDone!")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Semantic Router - Embedding nearest-neighbour intent lookup
+
+Second opinion for QueryRouter when no regex fires. Labelled example
+utterances (config/intent_examples.json) are embedded once with a small
+CPU sentence-embedding model; a query is embedded and compared against the
+whole example matrix with one matrix-vector product. Each intent scores
+the mean of its top-k cosine similarities.
+
+The example matrix is cached next to the examples file as .npz, keyed by
+model name and example text, so restarts do not re-embed.
+
+Usage:
+    from semantic_router import SemanticRouter, SEMANTIC_AVAILABLE
+
+    router = SemanticRouter.from_file('config/intent_examples.json')
+    intent, score = router.route("is the porch light still on")
+    router.route_many(["dim the bedroom", "what did I spend on gas"])
+
+    python PY/semantic_router.py "kill the lights in the den"
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_AVAILABLE = True
+except ImportError:
+    SEMANTIC_AVAILABLE = False
+
+DEFAULT_MODEL = os.getenv('SEMANTIC_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+DEFAULT_EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'config', 'intent_examples.json')
+TOP_K = 3
+QUERY_CACHE_SIZE = 2048
+
+
+class SemanticRouter:
+    """Labelled example embeddings + batched cosine lookup"""
+
+    def __init__(self, examples: Dict[str, List[str]], model_name: str = DEFAULT_MODEL,
+                 cache_path: str = None, top_k: int = TOP_K):
+        if not SEMANTIC_AVAILABLE:
+            raise RuntimeError("sentence-transformers not installed")
+
+        self.model_name = model_name
+        self.top_k = top_k
+        self.model = SentenceTransformer(model_name, device='cpu')
+
+        # Examples grouped by intent so per-intent scores are contiguous slices
+        self.intents = sorted(examples)
+        texts, counts = [], []
+        for intent in self.intents:
+            texts.extend(examples[intent])
+            counts.append(len(examples[intent]))
+        self.counts = np.array(counts)
+        self.starts = np.concatenate([[0], np.cumsum(self.counts)[:-1]])
+        self.matrix = self._example_matrix(texts, cache_path)
+
+        self._embed_one = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._embed_uncached)
+        self.last_ms = 0.0
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_EXAMPLES, model_name: str = DEFAULT_MODEL,
+                  **kwargs) -> 'SemanticRouter':
+        with open(path, 'r') as f:
+            examples = json.load(f)
+        cache_path = os.path.splitext(path)[0] + '.npz'
+        return cls(examples, model_name, cache_path=cache_path, **kwargs)
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
+        return self.model.encode(list(texts), batch_size=64, convert_to_numpy=True,
+                                 normalize_embeddings=True).astype(np.float32)
+
+    def _example_matrix(self, texts: List[str], cache_path: str = None) -> np.ndarray:
+        """Embed the examples, or load them when model and texts are unchanged"""
+        digest = hashlib.sha1(json.dumps([self.model_name, texts]).encode('utf-8')).hexdigest()
+        if cache_path and os.path.exists(cache_path):
+            cached = np.load(cache_path, allow_pickle=False)
+            if str(cached['digest']) == digest:
+                return cached['matrix']
+        start = time.time()
+        matrix = self._encode(texts)
+        print(f"[Semantic] Embedded {len(texts)} examples in {time.time() - start:.2f}s")
+        if cache_path:
+            with open(cache_path, 'wb') as f:
+                np.savez(f, digest=digest, matrix=matrix)
+        return matrix
+
+    def _embed_uncached(self, text: str) -> np.ndarray:
+        return self._encode([text])[0]
+
+    def _scores(self, similarities: np.ndarray) -> np.ndarray:
+        """Per-intent mean of the top-k similarities; rows = queries"""
+        scores = np.empty((similarities.shape[0], len(self.intents)), dtype=np.float32)
+        for i, (start, count) in enumerate(zip(self.starts, self.counts)):
+            block = similarities[:, start:start + count]
+            k = min(self.top_k, count)
+            scores[:, i] = np.sort(block, axis=1)[:, -k:].mean(axis=1)
+        return scores
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Score of every intent for one query"""
+        start = time.perf_counter()
+        row = self._scores((self.matrix @ self._embed_one(text.strip().lower()))[None, :])[0]
+        self.last_ms = (time.perf_counter() - start) * 1000
+        return {intent: float(score) for intent, score in zip(self.intents, row)}
+
+    def route(self, text: str) -> Tuple[str, float]:
+        """Best intent and its score"""
+        scores = self.scores(text)
+        intent = max(scores, key=scores.get)
+        return intent, scores[intent]
+
+    def route_many(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        """Route a batch with one encode call and one matrix product"""
+        if not texts:
+            return []
+        queries = self._encode([t.strip().lower() for t in texts])
+        scores = self._scores(queries @ self.matrix.T)
+        best = scores.argmax(axis=1)
+        return [(self.intents[b], float(scores[i, b])) for i, b in enumerate(best)]
+
+
+def main():
+    """Route the queries given on the command line"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    if not SEMANTIC_AVAILABLE:
+        print("sentence-transformers not installed")
+        sys.exit(1)
+
+    router = SemanticRouter.from_file()
+    for text in sys.argv[1:]:
+        router.route(text)                        # warm the query path
+        router._embed_one.cache_clear()
+        intent, score = router.route(text)
+        print(f"[Semantic] {intent:<15} {score:.3f}  {router.last_ms:.1f} ms  {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Speech Stream - Speak streamed LLM answers sentence by sentence
+
+QueryRouter.astream_query yields token deltas as the LLM produces them.
+The gateways forward every delta to the client as a 'partial' frame and
+cut the text into sentences; each sentence goes to TTS as soon as it is
+complete, so the first audio arrives after the first sentence instead of
+after the whole answer.
+
+Frames sent to the client, in order:
+    {'type': 'partial', 'text': delta}                       every delta
+    {'type': 'audio_chunk', 'seq': n, 'text': sentence,
+     'audio': b64, 'audio_format': 'wav'}                    every sentence
+then the gateway sends its usual 'response' frame with the full text
+('streamed': True, no audio when the chunks already carried it).
+
+Only clients that asked for them get these frames: a client sends
+{'type': 'hello', 'streaming': True} after 'connected'. Everyone else
+gets the whole answer, audio included, in the 'response' frame.
+
+The whole reply runs in one task per session; cancelling it (the user
+said "stop", see is_stop_command) stops the LLM stream and any pending
+TTS at once.
+
+Usage:
+    from speech_stream import SentenceSplitter, is_stop_command, speak_stream
+
+    events = router.astream_query(text, session_id, context)
+    response, chunks = await speak_stream(events, send, synthesize)
+"""
+
+import asyncio
+import re
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Sentence end: . ! ? (plus closing quotes/brackets) followed by whitespace, or a line break
+_BOUNDARY = re.compile(r'[.!?]+["\')\]]*\s+|\n+')
+_LAST_WORD = re.compile(r'(\S+)$')
+
+# "Dr. Smith" is not two sentences
+ABBREVIATIONS = {'mr', 'mrs', 'ms', 'dr', 'st', 'sr', 'jr', 'vs', 'etc', 'e.g', 'i.e', 'no', 'approx'}
+MIN_SENTENCE_CHARS = 12  # shorter fragments ("Sure.") are spoken with the next sentence
+
+# Utterances that cancel the answer in progress instead of being routed
+STOP_PHRASES = {'stop', 'stop it', 'stop that', 'cancel', 'cancel that', 'never mind',
+                'nevermind', 'be quiet', 'quiet', 'shut up', 'enough', 'that is enough',
+                "that's enough"}
+WAKE_NAMES = {'hal', 'hey', 'jarvis', 'ok', 'okay'}
+_NON_WORD = re.compile(r"[^\w\s']+")
+
+
+class SentenceSplitter:
+    """Accumulates text deltas and hands back complete sentences"""
+
+    def __init__(self, min_chars: int = MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self.buffer = ''
+
+    def feed(self, delta: str) -> List[str]:
+        """Add a delta; return the sentences it completed"""
+        self.buffer += delta
+        sentences = []
+        start = 0
+        for m in _BOUNDARY.finditer(self.buffer):
+            candidate = self.buffer[start:m.end()].strip()
+            word = _LAST_WORD.search(self.buffer[start:m.start()])
+            if word and word.group(1).lower().rstrip('.') in ABBREVIATIONS:
+                continue
+            if len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = m.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Whatever is left once the stream ends"""
+        rest = self.buffer.strip()
+        self.buffer = ''
+        return rest or None
+
+
+def is_stop_command(text: str) -> bool:
+    """'Stop.', 'HAL, cancel that' - the user wants the current answer abandoned"""
+    words = _NON_WORD.sub(' ', text.lower()).split()
+    while words and words[0] in WAKE_NAMES:
+        words = words[1:]
+    return ' '.join(words) in STOP_PHRASES
+
+
+async def speak_stream(events: AsyncIterator[Dict],
+                       send: Optional[Callable[[Dict], Awaitable]],
+                       synthesize: Callable[[str], Awaitable[Optional[str]]] = None) -> Tuple[Dict, int]:
+    """
+    Forward partial frames and per-sentence audio for an astream_query event stream
+    Returns: (final router response, number of audio chunks sent)
+    Without synthesize, sentences are sent as 'sentence' frames for client-side TTS.
+    Without send (the client did not ask for streaming) nothing is forwarded.
+    """
+    splitter = SentenceSplitter()
+    sentences: asyncio.Queue = asyncio.Queue()
+    seq = 0
+    audio_chunks = 0
+
+    async def speaker():
+        # One sentence at a time so chunks arrive in order and TTS is not flooded
+        nonlocal seq, audio_chunks
+        while True:
+            sentence = await sentences.get()
+            if sentence is None:
+                return
+            if synthesize is None:
+                await send({'type': 'sentence', 'seq': seq, 'text': sentence})
+                seq += 1
+                continue
+            audio_b64 = await synthesize(sentence)
+            if audio_b64:
+                await send({'type': 'audio_chunk', 'seq': seq, 'text': sentence,
+                            'audio': audio_b64, 'audio_format': 'wav'})
+                seq += 1
+                audio_chunks += 1
+
+    speaker_task = asyncio.ensure_future(speaker())
+    response = None
+    streamed = False
+    try:
+        async for event in events:
+            if event['type'] == 'delta':
+                streamed = True
+                if send is None:
+                    continue
+                await send({'type': 'partial', 'text': event['text']})
+                for sentence in splitter.feed(event['text']):
+                    sentences.put_nowait(sentence)
+            elif event['type'] == 'done':
+                response = event['response']
+        if streamed and send is not None:
+            rest = splitter.flush()
+            if rest:
+                sentences.put_nowait(rest)
+        sentences.put_nowait(None)
+        await speaker_task
+    finally:
+        if not speaker_task.done():
+            speaker_task.cancel()
+        if hasattr(events, 'aclose'):
+            await events.aclose()  # releases the LLM stream when cancelled mid-answer
+
+    if response is None:
+        response = {'text': '', 'status': 'error'}
+    response['streamed'] = streamed
+    return response, audio_chunks
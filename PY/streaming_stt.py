@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Streaming STT - Transcribe while the user is still speaking
+
+The gateways used to wait for end-of-speech, then send the whole
+utterance to Faster-Whisper, so the full transcription time was added to
+every reply. StreamingTranscriber follows the utterance as it grows:
+
+- every step_ms of new audio it transcribes the window since the last
+  committed point (overlapping the previous window) and reports the text
+  as a partial - one pass in flight at a time, so a slow server only
+  makes partials rarer
+- Whisper segments that come back identical from two consecutive passes
+  and end at least guard_ms before the window's end are committed: their
+  text is kept and later windows start after them
+- at end-of-speech, finish() transcribes only the tail after the last
+  committed segment (or reuses the last partial when it already covered
+  all but the endpointer's hangover)
+
+A partial is 'stable' when two passes in a row produced the same text;
+the gateways start intent detection on it (QueryRouter.prepare), so the
+final transcript usually finds its intent already computed.
+
+Segments need a server that honours response_format=verbose_json; a
+server that returns only text still gets partials, and the final pass
+then covers the whole utterance as before.
+
+Usage:
+    from streaming_stt import StreamingTranscriber, transcribe_pcm
+
+    stt = StreamingTranscriber(lambda pcm: transcribe_pcm(STT_URL, pcm), on_partial)
+    stt.update(endpointer.utterance)     # the utterance so far, after every frame
+    text = await stt.finish(event['audio'])
+"""
+
+import asyncio
+import io
+import time
+import wave
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+
+from http_transport import get_transport
+
+SAMPLE_RATE = 16000
+BYTES_PER_MS = SAMPLE_RATE * 2 // 1000
+
+STEP_MS = 700           # new audio needed before the next partial pass
+MIN_WINDOW_MS = 1000    # no partials for shorter windows (Whisper guesses on fragments)
+MAX_WINDOW_MS = 15000   # partial windows are capped to the newest audio
+GUARD_MS = 1000         # segments ending this close to the window's end are not committed
+REUSE_MS = 300          # final = last partial if it missed no more than this (the hangover)
+MIN_TAIL_MS = 200       # a shorter tail holds no words
+
+
+def pcm_to_wav(pcm: bytes) -> io.BytesIO:
+    """16 kHz mono PCM16 -> in-memory WAV"""
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm)
+    buf.seek(0)
+    return buf
+
+
+async def transcribe_pcm(url: str, pcm: bytes, model: str = 'whisper-1',
+                         timeout: float = 30) -> Dict:
+    """
+    OpenAI-compatible /v1/audio/transcriptions call on PCM16 audio
+    Returns: {'text', 'segments': [{'start', 'end', 'text'}, ...]} (segments may be empty)
+    """
+    form = aiohttp.FormData()
+    form.add_field('file', pcm_to_wav(pcm), filename='audio.wav', content_type='audio/wav')
+    form.add_field('model', model)
+    form.add_field('language', 'en')
+    form.add_field('response_format', 'verbose_json')
+    async with get_transport().apost(url, data=form, timeout=timeout) as response:
+        if response.status != 200:
+            raise RuntimeError(f"Whisper error: {response.status} - {await response.text()}")
+        result = await response.json(content_type=None)
+    segments = [{'start': float(s.get('start', 0)), 'end': float(s.get('end', 0)),
+                 'text': (s.get('text') or '').strip()}
+                for s in result.get('segments') or []]
+    return {'text': (result.get('text') or '').strip(), 'segments': segments}
+
+
+def _join(*parts: str) -> str:
+    return ' '.join(p for p in parts if p)
+
+
+class StreamingTranscriber:
+    """Partial transcripts of one growing utterance, then a short final pass"""
+
+    def __init__(self, transcribe: Callable[[bytes], Awaitable[Dict]],
+                 on_partial: Callable[[str, bool], Awaitable] = None,
+                 step_ms: int = STEP_MS, min_window_ms: int = MIN_WINDOW_MS,
+                 max_window_ms: int = MAX_WINDOW_MS, guard_ms: int = GUARD_MS):
+        self.transcribe = transcribe
+        self.on_partial = on_partial
+        self.step = step_ms * BYTES_PER_MS
+        self.min_window = min_window_ms * BYTES_PER_MS
+        self.max_window = max_window_ms * BYTES_PER_MS
+        self.guard_s = guard_ms / 1000
+        self.audio = b''
+        self.committed = 0            # bytes of audio whose text is final
+        self.committed_text = ''
+        self.partial = ''             # newest partial (committed + window text)
+        self.covered = 0              # audio end of the newest partial pass
+        self.capped = False           # newest partial saw only the last max_window of audio
+        self._requested = 0           # audio end of the pass in flight / last launched
+        self._last_segments: List[Dict] = []
+        self._committed_in_pass = 0
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'passes': 0, 'pass_ms': 0.0, 'committed_segments': 0,
+                      'final_tail_ms': 0, 'final_reused': False}
+
+    def update(self, audio):
+        """The utterance so far (bytes or a growing bytearray); may start a partial pass"""
+        self.audio = audio
+        if self._task is not None and not self._task.done():
+            return
+        end = len(audio) - len(audio) % 2
+        if end - self._requested < self.step or end - self.committed < self.min_window:
+            return
+        self._requested = end
+        self._task = asyncio.ensure_future(self._partial_pass(end))
+
+    async def _partial_pass(self, end: int):
+        start = max(self.committed, end - self.max_window)
+        start -= (start - self.committed) % 2
+        began = time.perf_counter()
+        try:
+            result = await self.transcribe(bytes(self.audio[start:end]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[STT] Partial pass failed: {e}")
+            return
+        self.stats['passes'] += 1
+        self.stats['pass_ms'] += (time.perf_counter() - began) * 1000
+
+        self.capped = start != self.committed
+        if not self.capped:
+            self._commit(result.get('segments') or [], (end - start) / (BYTES_PER_MS * 1000))
+            window_text = self._uncommitted_text(result)
+        else:
+            window_text = result.get('text', '')  # show only the newest audio
+        text = _join(self.committed_text, window_text)
+        stable = bool(text) and text == self.partial
+        self.partial = text
+        self.covered = end
+        if self.on_partial is not None and text:
+            try:
+                await self.on_partial(text, stable)
+            except Exception as e:
+                print(f"[STT] Partial handler failed: {e}")
+
+    def _commit(self, segments: List[Dict], window_s: float):
+        """Commit leading segments that two passes agree on and that end clear of the window edge"""
+        agreed = 0
+        for previous, current in zip(self._last_segments, segments):
+            if previous['text'] != current['text'] or current['end'] > window_s - self.guard_s:
+                break
+            agreed += 1
+        if agreed:
+            offset = int(segments[agreed - 1]['end'] * 1000) * BYTES_PER_MS
+            self.committed += offset
+            self.committed_text = _join(self.committed_text, *(s['text'] for s in segments[:agreed]))
+            self.stats['committed_segments'] += agreed
+        self._last_segments = segments[agreed:]
+        self._committed_in_pass = agreed
+
+    def _uncommitted_text(self, result: Dict) -> str:
+        segments = result.get('segments') or []
+        if not segments:
+            return result.get('text', '')
+        return _join(*(s['text'] for s in segments[self._committed_in_pass:]))
+
+    async def finish(self, audio: bytes) -> str:
+        """Final transcript of the whole utterance (only the untranscribed tail is sent)"""
+        self.audio = audio
+        if self._task is not None and not self._task.done():
+            if len(audio) - self._requested <= REUSE_MS * BYTES_PER_MS:
+                await self._task  # nearly done and covers almost everything
+            else:
+                self._task.cancel()
+        tail = len(audio) - self.committed
+        self.stats['final_tail_ms'] = tail // BYTES_PER_MS
+        if self.partial and not self.capped and len(audio) - self.covered <= REUSE_MS * BYTES_PER_MS:
+            self.stats['final_reused'] = True
+            return self.partial
+        if tail < MIN_TAIL_MS * BYTES_PER_MS:
+            return self.committed_text
+        result = await self.transcribe(bytes(audio[self.committed:]))
+        return _join(self.committed_text, result.get('text', ''))
+
+    def cancel(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats['avg_pass_ms'] = round(stats.pop('pass_ms') / stats['passes'], 1) if stats['passes'] else 0.0
+        return stats
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Transaction Anomalies - Sorted-array detectors over a TransactionFrame
+
+All detectors sort once and work on contiguous runs, so they scale as
+O(N log N) plus the number of candidate pairs inside the day window.
+
+    near_duplicates(frame, day_window=3, amount_tolerance=0.01)
+        -> list of row-index arrays, one per cluster of same-payee
+           transactions with close dates and amounts
+    payee_robust_stats(frame)
+        -> per-payee count / median / MAD in one groupby pass
+    robust_outliers(frame, stats)
+        -> rows whose modified z-score |0.6745 * (x - median) / MAD| is high
+    rolling_counts(frame, days)
+        -> per-row count and sum of same-payee transactions in the trailing window
+    frequency_bursts(frame, days)
+        -> rows where a payee's rolling count far exceeds its normal rate
+
+Usage:
+    from transaction_anomalies import near_duplicates, payee_robust_stats
+    clusters = near_duplicates(frame, day_window=3)
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Defaults for analyze-anomalies
+DAY_WINDOW = 3              # near-duplicates: max days apart
+AMOUNT_TOLERANCE = 0.01     # near-duplicates: max absolute amount difference
+RELATIVE_TOLERANCE = 0.0    # near-duplicates: max difference as a fraction of the amount
+OUTLIER_THRESHOLD = 3.5     # modified z-score (Iglewicz & Hoaglin)
+MIN_HISTORY = 5             # transactions a payee needs before outliers are judged
+BURST_WINDOW = 30           # days in the rolling frequency window
+BURST_FACTOR = 3.0          # rolling count vs the payee's normal rate
+
+
+def _payee_day_key(frame, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Integer key ordering rows by (payee, day) so day windows never cross payees"""
+    day = np.where(frame.day >= 0, frame.day, 0)
+    day = day - day.min()
+    # Leave a gap wider than the window between consecutive payees
+    stride = int(day.max()) + window + 1
+    key = frame.payee_code.astype(np.int64) * stride + day
+    return key, np.argsort(key, kind='stable')
+
+
+def _window_pairs(key_sorted: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """All (i, j), i < j, positions in a sorted key array with key[j] - key[i] <= window"""
+    ends = np.searchsorted(key_sorted, key_sorted + window, side='right')
+    counts = ends - np.arange(len(key_sorted)) - 1
+    total = int(counts.sum())
+    if not total:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty
+    first = np.repeat(np.arange(len(key_sorted)), counts)
+    # offset of each pair within its run: 1..counts[i]
+    run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+    second = first + 1 + (np.arange(total) - run_starts)
+    return first, second
+
+
+def _components(n: int, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Union-find over row pairs; returns a component label per row"""
+    parent = np.arange(n)
+
+    def find(x):
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    for a, b in zip(first.tolist(), second.tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    return np.array([find(i) for i in range(n)])
+
+
+def near_duplicates(frame, day_window: int = DAY_WINDOW,
+                    amount_tolerance: float = AMOUNT_TOLERANCE,
+                    relative_tolerance: float = RELATIVE_TOLERANCE) -> List[np.ndarray]:
+    """Clusters of same-payee rows within day_window days and the amount tolerance"""
+    if len(frame) < 2:
+        return []
+
+    key, order = _payee_day_key(frame, day_window)
+    first, second = _window_pairs(key[order], day_window)
+    if not len(first):
+        return []
+
+    a, b = order[first], order[second]
+    amount_a, amount_b = frame.amount[a], frame.amount[b]
+    allowed = np.maximum(amount_tolerance,
+                         relative_tolerance * np.maximum(np.abs(amount_a), np.abs(amount_b)))
+    close = (np.abs(amount_a - amount_b) <= allowed) & (frame.day[a] >= 0) & (frame.day[b] >= 0)
+    a, b = a[close], b[close]
+    if not len(a):
+        return []
+
+    # Only rows that have a partner take part in clustering
+    rows = np.unique(np.concatenate([a, b]))
+    labels = _components(len(rows), np.searchsorted(rows, a), np.searchsorted(rows, b))
+    grouping = np.argsort(labels, kind='stable')
+    bounds = np.flatnonzero(np.diff(labels[grouping])) + 1
+    return [np.sort(rows[group]) for group in np.split(grouping, bounds)]
+
+
+def _group_median(codes: np.ndarray, values: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-group median via one lexsort; returns (medians, counts)"""
+    order = np.lexsort((values, codes))
+    counts = np.bincount(codes, minlength=size)
+    starts = np.cumsum(counts) - counts
+    sorted_values = values[order]
+    lo = starts + (np.maximum(counts, 1) - 1) // 2
+    hi = starts + np.maximum(counts, 1) // 2
+    lo = np.minimum(lo, len(values) - 1)
+    hi = np.minimum(hi, len(values) - 1)
+    medians = np.where(counts > 0, (sorted_values[lo] + sorted_values[hi]) / 2, 0.0)
+    return medians, counts
+
+
+def payee_robust_stats(frame) -> Dict[str, np.ndarray]:
+    """Per-payee count, median and MAD (median absolute deviation), indexed by payee code"""
+    size = len(frame.payee_names)
+    if not len(frame):
+        zeros = np.zeros(size)
+        return {'count': zeros.astype(np.int64), 'median': zeros, 'mad': zeros}
+    medians, counts = _group_median(frame.payee_code, frame.amount, size)
+    deviations = np.abs(frame.amount - medians[frame.payee_code])
+    mads, _ = _group_median(frame.payee_code, deviations, size)
+    return {'count': counts, 'median': medians, 'mad': mads}
+
+
+def robust_outliers(frame, stats: Dict[str, np.ndarray],
+                    threshold: float = OUTLIER_THRESHOLD,
+                    min_history: int = MIN_HISTORY) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows with a modified z-score above threshold; returns (rows, scores)"""
+    code = frame.payee_code
+    mad = stats['mad'][code]
+    enough = (stats['count'][code] >= min_history) & (mad > 0)
+    scores = np.zeros(len(frame))
+    scores[enough] = 0.6745 * (frame.amount[enough] - stats['median'][code][enough]) / mad[enough]
+    rows = np.flatnonzero(np.abs(scores) > threshold)
+    return rows, scores[rows]
+
+
+def rolling_counts(frame, days: int = BURST_WINDOW) -> Tuple[np.ndarray, np.ndarray]:
+    """Per row: count and amount sum of same-payee transactions in (day - days, day]"""
+    n = len(frame)
+    if not n:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    key, order = _payee_day_key(frame, days)
+    key_sorted = key[order]
+    starts = np.searchsorted(key_sorted, key_sorted - days, side='right')
+    ends = np.searchsorted(key_sorted, key_sorted, side='right')
+    cumulative = np.concatenate([[0.0], np.cumsum(frame.amount[order])])
+
+    counts = np.empty(n, dtype=np.int64)
+    sums = np.empty(n)
+    counts[order] = ends - starts
+    sums[order] = cumulative[ends] - cumulative[starts]
+    return counts, sums
+
+
+def frequency_bursts(frame, days: int = BURST_WINDOW, factor: float = BURST_FACTOR,
+                     min_history: int = MIN_HISTORY) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Rows where a payee's trailing-window count is factor x its normal rate
+
+    Returns (rows, window_counts, expected_counts).
+    """
+    counts, _ = rolling_counts(frame, days)
+    size = len(frame.payee_names)
+    totals = np.bincount(frame.payee_code, minlength=size)
+
+    valid = frame.day >= 0
+    first_day = np.full(size, np.iinfo(np.int64).max)
+    last_day = np.full(size, np.iinfo(np.int64).min)
+    np.minimum.at(first_day, frame.payee_code[valid], frame.day[valid])
+    np.maximum.at(last_day, frame.payee_code[valid], frame.day[valid])
+    span = np.maximum(last_day - first_day + 1, days)
+    expected = totals * days / span
+
+    code = frame.payee_code
+    burst = (valid & (totals[code] >= min_history)
+             & (counts >= np.maximum(3, factor * expected[code])))
+    rows = np.flatnonzero(burst)
+    return rows, counts[rows], expected[code][rows]
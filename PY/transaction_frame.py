@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Transaction Frame - Columnar in-memory view of TRANSACTION records
+
+Loads a batch of transactions once (one batched read) into NumPy columns so
+analyzers run as vectorized passes instead of re-reading every record.
+
+Usage:
+    from transaction_frame import TransactionFrame, PayeeIndex
+
+    frame = TransactionFrame.load(ids, pool)          # from QM
+    frame = TransactionFrame.from_csv('trans_det.csv')  # from an export
+    payees = PayeeIndex.load(pool)
+
+    big = frame.amount >= 1000
+    counts, sums = frame.payee_totals()
+
+TRANSACTION fields: 1 date (internal), 2 original payee, 3 standardized
+payee, 4 amount, 5 category, 7 memo.
+PAYEE fields: 1 name, 3 default category.
+"""
+
+import csv
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from qm_pool import get_pool
+from qm_records import FM, QM_EPOCH, read_many
+
+# TRANSACTION field positions (1-based)
+DATE_FIELD = 1
+ORIGINAL_PAYEE_FIELD = 2
+STANDARDIZED_PAYEE_FIELD = 3
+AMOUNT_FIELD = 4
+CATEGORY_FIELD = 5
+MEMO_FIELD = 7
+
+# PAYEE field positions (1-based)
+PAYEE_NAME_FIELD = 1
+PAYEE_CATEGORY_FIELD = 3
+
+
+def _to_float(value: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _to_day(value: str) -> int:
+    """QM internal date string to an int day number (-1 if not a date)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+class TransactionFrame:
+    """Column arrays for a batch of transactions, one row per record"""
+
+    def __init__(self, ids: List[str], dates: List[str], original_payees: List[str],
+                 standardized_payees: List[str], amounts: List[float],
+                 categories: List[str], memos: List[str]):
+        n = len(ids)
+        self.ids = np.array(ids, dtype=object)
+        self.date = np.array(dates, dtype=object)
+        self.day = np.fromiter((_to_day(d) for d in dates), dtype=np.int64, count=n)
+        self.original_payee = np.array(original_payees, dtype=str)
+        self.standardized_payee = np.array(standardized_payees, dtype=str)
+        self.amount = np.array(amounts, dtype=np.float64)
+        self.category = np.array(categories, dtype=str)
+        self.memo = np.array(memos, dtype=object)
+
+        # Effective payee: standardized name when present, else the original
+        self.payee = np.where(self.standardized_payee != '', self.standardized_payee,
+                              self.original_payee)
+
+        # Integer payee codes for bincount/groupby passes
+        self.payee_names, self.payee_code = np.unique(self.payee, return_inverse=True)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_records(cls, records: Dict[str, Optional[str]]) -> 'TransactionFrame':
+        """Build from {id: raw record}; missing records are skipped"""
+        ids, dates, originals, standards, amounts, categories, memos = [], [], [], [], [], [], []
+        for trans_id, raw in records.items():
+            if raw is None:
+                continue
+            fields = raw.split(FM)
+            fields += [''] * (MEMO_FIELD - len(fields))
+            ids.append(trans_id)
+            dates.append(fields[DATE_FIELD - 1])
+            originals.append(fields[ORIGINAL_PAYEE_FIELD - 1])
+            standards.append(fields[STANDARDIZED_PAYEE_FIELD - 1])
+            amounts.append(_to_float(fields[AMOUNT_FIELD - 1]))
+            categories.append(fields[CATEGORY_FIELD - 1])
+            memos.append(fields[MEMO_FIELD - 1])
+        return cls(ids, dates, originals, standards, amounts, categories, memos)
+
+    @classmethod
+    def load(cls, ids: Iterable[str], pool=None) -> 'TransactionFrame':
+        """Read a list of TRANSACTION ids in batched round-trips"""
+        return cls.from_records(read_many("TRANSACTION", ids, pool=pool))
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'TransactionFrame':
+        """Build from a TRANSACTION export such as trans_det.csv
+
+        Columns: TRANSACTION, Account name, Transaction date (MM-DD-YYYY),
+        Original payee name, Transaction amount, Link to PAYEE record, memo.
+        """
+        ids, dates, originals, amounts, memos = [], [], [], [], []
+        with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if len(row) < 5:
+                    continue
+                try:
+                    day = (datetime.strptime(row[2], '%m-%d-%Y').date() - QM_EPOCH).days
+                except ValueError:
+                    day = ''
+                ids.append(row[0])
+                dates.append(str(day))
+                originals.append(row[3])
+                amounts.append(_to_float(row[4]))
+                memos.append(row[6] if len(row) > 6 else '')
+        blanks = [''] * len(ids)
+        return cls(ids, dates, originals, blanks, amounts, blanks, memos)
+
+    def payee_totals(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-payee (count, sum of amount), indexed by payee code"""
+        size = len(self.payee_names)
+        counts = np.bincount(self.payee_code, minlength=size)
+        sums = np.bincount(self.payee_code, weights=self.amount, minlength=size)
+        return counts, sums
+
+
+class PayeeIndex:
+    """PAYEE records loaded once and indexed by name"""
+
+    def __init__(self, records: Dict[str, Optional[str]]):
+        self.by_name: Dict[str, Dict] = {}
+        for payee_id, raw in records.items():
+            if raw is None:
+                continue
+            fields = raw.split(FM)
+            name = fields[PAYEE_NAME_FIELD - 1]
+            if name in self.by_name:
+                continue  # first record wins, as a SELECT scan would
+            self.by_name[name] = {
+                'id': payee_id,
+                'name': name,
+                'default_category': fields[PAYEE_CATEGORY_FIELD - 1] if len(fields) >= PAYEE_CATEGORY_FIELD else ''
+            }
+
+    @classmethod
+    def load(cls, pool=None) -> 'PayeeIndex':
+        """SELECT PAYEE once and read every record in batched round-trips"""
+        pool = pool or get_pool()
+        with pool.session() as s:
+            ids = s.select("SELECT PAYEE")
+        return cls(read_many("PAYEE", ids, pool=pool))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.by_name
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def default_category(self, name: str) -> str:
+        payee = self.by_name.get(name)
+        return payee['default_category'] if payee else ''
+
+    def known_mask(self, names: np.ndarray) -> np.ndarray:
+        """Boolean array: which of the given (unique) names are known payees"""
+        return np.fromiter((n in self.by_name for n in names), dtype=bool, count=len(names))
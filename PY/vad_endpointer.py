@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+VAD Endpointer - Streaming speech-start / speech-end detection
+
+webrtcvad only accepts 10, 20 or 30 ms frames, but the browsers send
+~100-256 ms buffers; passing those straight to is_speech() raised, and
+the error was swallowed, so end-of-speech never fired. The endpointer
+reframes whatever arrives into fixed VAD frames (carrying the remainder
+to the next call) and smooths the per-frame decisions:
+
+- speech starts when start_frames of the last start_window frames are
+  voiced; the pre-roll ring (pad_ms of audio before that) is kept so the
+  first syllable is not cut off
+- speech ends after end_ms of continuous non-speech (the hangover), or
+  when the utterance reaches max_utterance_ms
+- optionally, 'timeout' when no speech starts within no_speech_ms of
+  the last reset(); once speech has started it never fires (until the
+  next reset), even if the utterance has ended
+
+Events are returned from feed() as soon as the frame that decides them
+arrives, so end-of-utterance is known end_ms (300 ms) after the speaker
+stops instead of on a polling tick.
+
+    {'type': 'speech_start', 't_ms': 1230}
+    {'type': 'speech_end', 't_ms': 4410, 'audio': pcm16_bytes, 'speech_ms': 2860}
+    {'type': 'timeout', 't_ms': 5000}
+
+Usage:
+    from vad_endpointer import Endpointer
+
+    endpointer = Endpointer()
+    for event in endpointer.feed(int16_samples):
+        ...
+
+Notes:
+- Without webrtcvad, frames are classified by RMS energy (ENERGY_THRESHOLD).
+- t_ms is stream time (audio fed since the last reset), not wall time.
+"""
+
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import webrtcvad
+    WEBRTCVAD_AVAILABLE = True
+except ImportError:
+    WEBRTCVAD_AVAILABLE = False
+
+SAMPLE_RATE = 16000
+VAD_FRAME_MS = (10, 20, 30)  # the only frame lengths webrtcvad accepts
+ENERGY_THRESHOLD = 500       # RMS (int16) above which a frame counts as speech without webrtcvad
+
+
+class Endpointer:
+    """Reframes PCM16 audio into VAD frames and emits speech-start / speech-end events"""
+
+    def __init__(self, frame_ms: int = 30, aggressiveness: int = 2,
+                 start_ms: int = 90, start_window_ms: int = 150, end_ms: int = 300,
+                 pad_ms: int = 300, max_utterance_ms: int = 30000,
+                 no_speech_ms: Optional[int] = None):
+        if frame_ms not in VAD_FRAME_MS:
+            raise ValueError(f"frame_ms must be one of {VAD_FRAME_MS}")
+        self.frame_ms = frame_ms
+        self.frame_bytes = SAMPLE_RATE * frame_ms // 1000 * 2
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.end_frames = max(1, end_ms // frame_ms)
+        self.max_frames = max_utterance_ms // frame_ms
+        self.no_speech_frames = no_speech_ms // frame_ms if no_speech_ms else None
+        self.vad = webrtcvad.Vad(aggressiveness) if WEBRTCVAD_AVAILABLE else None
+        self._window = deque(maxlen=max(self.start_frames, start_window_ms // frame_ms))
+        self._preroll = deque(maxlen=max(1, pad_ms // frame_ms))
+        self.reset()
+
+    def reset(self):
+        """Start over (new utterance, stream position 0)"""
+        self._remainder = b''
+        self._window.clear()
+        self._preroll.clear()
+        self.utterance = bytearray()
+        self.triggered = False
+        self.frames = 0          # frames seen since reset
+        self.speech_frames = 0   # voiced frames in the current utterance
+        self._utterance_frames = 0
+        self._silent_run = 0
+        self._timed_out = False
+        self._spoke = False      # speech_start fired since reset - no timeout after that
+
+    def is_speech(self, frame: bytes) -> bool:
+        if self.vad is not None:
+            return self.vad.is_speech(frame, SAMPLE_RATE)
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples))) > ENERGY_THRESHOLD
+
+    def feed(self, samples) -> List[Dict]:
+        """Add int16 samples (array or PCM16 bytes); return the events they decided"""
+        data = self._remainder + (samples if isinstance(samples, (bytes, bytearray))
+                                  else np.asarray(samples, dtype=np.int16).tobytes())
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = data[usable:]
+
+        events = []
+        for offset in range(0, usable, self.frame_bytes):
+            event = self._frame(data[offset:offset + self.frame_bytes])
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _frame(self, frame: bytes) -> Optional[Dict]:
+        self.frames += 1
+        voiced = self.is_speech(frame)
+
+        if not self.triggered:
+            self._preroll.append(frame)
+            self._window.append(voiced)
+            if sum(self._window) >= self.start_frames:
+                self.triggered = True
+                self.utterance = bytearray(b''.join(self._preroll))
+                self._utterance_frames = len(self._preroll)
+                self.speech_frames = sum(self._window)
+                self._silent_run = 0
+                self._preroll.clear()
+                self._window.clear()
+                self._spoke = True
+                return {'type': 'speech_start', 't_ms': self._t_ms()}
+            if (self.no_speech_frames and not self._timed_out and not self._spoke
+                    and self.frames >= self.no_speech_frames):
+                self._timed_out = True
+                return {'type': 'timeout', 't_ms': self._t_ms()}
+            return None
+
+        self.utterance.extend(frame)
+        self._utterance_frames += 1
+        if voiced:
+            self.speech_frames += 1
+            self._silent_run = 0
+        else:
+            self._silent_run += 1
+        if self._silent_run >= self.end_frames or self._utterance_frames >= self.max_frames:
+            return self._end()
+        return None
+
+    def _end(self) -> Dict:
+        event = {'type': 'speech_end', 't_ms': self._t_ms(), 'audio': bytes(self.utterance),
+                 'speech_ms': self.speech_frames * self.frame_ms}
+        self.triggered = False
+        self.utterance = bytearray()
+        self._utterance_frames = 0
+        self.speech_frames = 0
+        self._silent_run = 0
+        return event
+
+    def flush(self) -> Optional[Dict]:
+        """End the utterance in progress now (the client stopped sending); None if not in speech"""
+        if not self.triggered:
+            return None
+        if self._remainder:
+            self.utterance.extend(self._remainder)
+            self._remainder = b''
+        return self._end()
+
+    def _t_ms(self) -> int:
+        return self.frames * self.frame_ms
@@ -9,7 +9,7 @@ import websockets
 import json
 import base64
 import uuid
-import requests
+import aiohttp
 import socket
 from datetime import datetime
 from typing import Dict, Set
@@ -17,6 +17,10 @@ from enum import Enum
 import sys
 sys.path.insert(0, '.')
 from qm_client_sync import query_qm
+from http_transport import get_transport
+from query_router import astream_query, get_router
+from conversation_context import ConversationContext
+from speech_stream import is_stop_command, speak_stream
 
 # Configuration
 WEBSOCKET_HOST = "0.0.0.0"
@@ -40,10 +44,12 @@ class VoiceSession:
         self.websocket = websocket
         self.state = ClientState.PASSIVE
         self.audio_buffer = []
-        self.context = []
+        self.context = ConversationContext()
         self.last_activity = datetime.now()
         self.last_response = None
         self.client_type = None
+        self.task = None  # request being answered - cancelled by the 'stop' command
+        self.streaming = False  # client reads partial / sentence frames (its 'hello')
         
     def update_activity(self):
         self.last_activity = datetime.now()
@@ -58,14 +64,8 @@ class VoiceSession:
         return audio
         
     def add_to_context(self, utterance: str, response: str):
-        self.context.append({
-            'utterance': utterance,
-            'response': response,
-            'timestamp': datetime.now().isoformat()
-        })
-        # Keep last 10 turns
-        if len(self.context) > 10:
-            self.context = self.context[-10:]
+        # Bounded by the context itself (older turns fold into its digest)
+        self.context.add(utterance, response)
 
 class VoiceGateway:
     def __init__(self):
@@ -77,6 +77,7 @@ class VoiceGateway:
             session_id = str(uuid.uuid4())
             
         session = VoiceSession(session_id, websocket)
+        session.context.summarize = get_router('config/router_config.json').asummarize
         self.sessions[session_id] = session
         self.active_connections.add(websocket)
         
@@ -92,6 +93,10 @@ class VoiceGateway:
                 break
                 
         if session_to_remove:
+            task = self.sessions[session_to_remove].task
+            if task is not None:
+                task.cancel()
+            self.sessions[session_to_remove].context.close()
             del self.sessions[session_to_remove]
             print(f"[{datetime.now()}] Client unregistered: {session_to_remove}")
             
@@ -115,13 +120,18 @@ class VoiceGateway:
             elif msg_type == 'wake_word_detected':
                 await self.handle_wake_word(session, data)
             elif msg_type == 'speech_ended':
-                await self.handle_speech_ended(session, data)
+                self.start_task(session, self.handle_speech_ended(session, data))
             elif msg_type == 'text_input':
-                await self.handle_text_input(session, data)
+                if is_stop_command(data.get('text', '')):
+                    await self.handle_command(session, {'command': 'stop'})
+                else:
+                    self.start_task(session, self.handle_text_input(session, data))
             elif msg_type == 'command':
                 await self.handle_command(session, data)
             elif msg_type == 'heartbeat':
                 session.update_activity()
+            elif msg_type == 'hello':
+                session.streaming = bool(data.get('streaming'))
             else:
                 await self.send_error(websocket, f"Unknown message type: {msg_type}")
                 
@@ -131,6 +141,12 @@ class VoiceGateway:
             print(f"[{datetime.now()}] Error handling message: {e}")
             await self.send_error(websocket, str(e))
             
+    def start_task(self, session: VoiceSession, coro):
+        """Answer in the background so the socket keeps reading; a new request supersedes the old"""
+        if session.task is not None and not session.task.done():
+            session.task.cancel()
+        session.task = asyncio.ensure_future(coro)
+        
     async def handle_audio_chunk(self, session: VoiceSession, data: dict):
         if session.state != ClientState.ACTIVE:
             return  # Ignore audio if not in active listening mode
@@ -257,6 +273,16 @@ class VoiceGateway:
             transcription = await self.transcribe_audio(audio)
             print(f"[{datetime.now()}] Transcription: {transcription}")
             
+            if is_stop_command(transcription):
+                # Spoken "stop" - the answer it interrupted was cancelled when this request started
+                session.state = ClientState.PASSIVE
+                await self.send_message(session.websocket, {
+                    'type': 'state_change',
+                    'new_state': 'passive_listening',
+                    'timestamp': datetime.now().isoformat()
+                })
+                return
+            
             # Send to QM listener
             response = await self.send_to_qm(session, transcription)
             
@@ -316,6 +342,9 @@ class VoiceGateway:
             
         elif command == 'stop':
             # Cancel current operation
+            if session.task is not None and not session.task.done():
+                session.task.cancel()
+                print(f"[{datetime.now()}] Request cancelled for session {session.session_id}")
             session.state = ClientState.PASSIVE
             await self.send_message(session.websocket, {
                 'type': 'state_change',
@@ -351,26 +380,22 @@ class VoiceGateway:
             whisper_endpoint = "http://10.1.10.20:8001/v1/audio/transcriptions"
             
             # Create form data
-            files = {
-                'file': ('audio.wav', audio, 'audio/wav')
-            }
-            data = {
-                'model': 'whisper-1',
-                'language': 'en'
-            }
+            form = aiohttp.FormData()
+            form.add_field('file', audio, filename='audio.wav', content_type='audio/wav')
+            form.add_field('model', 'whisper-1')
+            form.add_field('language', 'en')
             
-            response = requests.post(
+            # Pooled keep-alive session - no new TCP connection per utterance
+            async with get_transport().apost(
                 whisper_endpoint,
-                files=files,
-                data=data,
+                data=form,
                 timeout=10
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get('text', '').strip()
-            else:
-                raise Exception(f"Whisper server error: {response.status_code} - {response.text}")
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    return result.get('text', '').strip()
+                else:
+                    raise Exception(f"Whisper server error: {response.status} - {await response.text()}")
                 
         except Exception as e:
             print(f"[{datetime.now()}] Transcription error: {e}")
@@ -381,19 +406,21 @@ class VoiceGateway:
         try:
             print(f"[{datetime.now()}] Routing query: {transcription[:50]}")
             
-            # Use intelligent router instead of direct QM connection
-            from query_router import route_query
-            
-            # Use router in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                route_query,
+            # Use intelligent router instead of direct QM connection.
+            # LLM deltas are forwarded as 'partial' frames and completed
+            # sentences as 'sentence' frames so the client can start
+            # speaking before the answer is finished - only to clients
+            # that said they read them
+            events = astream_query(
                 transcription,
                 session.session_id,
                 session.context,
                 'config/router_config.json'
             )
+            send = None
+            if session.streaming:
+                send = lambda frame: self.send_message(session.websocket, frame)
+            response, _ = await speak_stream(events, send)
             
             intent = response.get('intent', 'unknown')
             text = response.get('text', '')[:50]
@@ -452,6 +479,8 @@ class VoiceGateway:
             
     async def start(self):
         print(f"[{datetime.now()}] Starting Voice Gateway on {WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
+        # Load the LLM models in the background so the first question finds them warm
+        self.warmup = asyncio.create_task(get_router('config/router_config.json').awarm_models())
         async with websockets.serve(self.handle_client, WEBSOCKET_HOST, WEBSOCKET_PORT):
             await asyncio.Future()  # Run forever
 
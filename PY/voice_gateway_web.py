@@ -6,9 +6,13 @@ WebSocket server for the browser client (hal.lcs.ai).
 Features:
 - Accepts WebSocket connections on port 8768
 - Wake word detection using openwakeword ("hey jarvis")
-- Streams audio chunks from the browser and detects end-of-speech via silence timeout
-- Transcribes audio via Faster-Whisper HTTP API (Ubuntu:8001)
+- Streams audio chunks from the browser (binary PCM16/Opus frames, or legacy
+  JSON audio_stream messages) and detects end-of-speech with a streaming VAD
+  endpointer (falls back to a silence timeout when the client stops sending)
+- Transcribes audio via Faster-Whisper HTTP API (Ubuntu:8001), streaming partial
+  transcripts while the user speaks (transcription_partial frames)
 - Routes queries through QueryRouter (LLM / HA / QM) and returns responses
+- Streams LLM answers as partial text frames with per-sentence TTS audio
 - Logs all conversations to QM CONVERSATION file
 - Supports direct text input messages
 """
@@ -25,7 +29,7 @@ import uuid
 import wave
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Optional
 
 import aiohttp
 import numpy as np
@@ -43,7 +47,13 @@ except ImportError:
 # Add PY directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from audio_frames import FrameDecoder, FrameError, capabilities, decode_json_audio
+from conversation_context import ConversationContext
+from http_transport import get_transport
 from query_router import QueryRouter
+from speech_stream import is_stop_command, speak_stream
+from streaming_stt import StreamingTranscriber, transcribe_pcm
+from vad_endpointer import Endpointer
 
 # Configuration
 WEBSOCKET_HOST = "0.0.0.0"
@@ -53,8 +63,10 @@ TTS_URL = "http://10.1.10.20:8002/v1/audio/speech"  # Text-to-speech HTTP endpoi
 TTS_MODEL = "tts-1"
 TTS_VOICE = "alloy"
 SAMPLE_RATE = 16000
-SILENCE_TIMEOUT = 1.5  # seconds of silence to treat as end-of-speech
+SILENCE_TIMEOUT = 1.5  # seconds without audio frames to treat as end-of-speech
 MIN_AUDIO_MS = 500     # require at least this much audio before transcribing
+MIN_SPEECH_MS = 200    # utterances with less voiced audio are noise, not speech
+STREAMING_STT = True   # transcribe while the user speaks; end-of-speech sends only the tail
 
 # Wake word settings
 WAKE_WORD_THRESHOLD = 0.5  # confidence threshold for wake word detection
@@ -69,45 +81,48 @@ QM_LOG_PORT = 8745  # AI.SERVER port
 class SessionState:
     websocket: WebSocketServerProtocol
     session_id: str
-    audio_buffer: bytearray = field(default_factory=bytearray)
+    endpointer: Endpointer = field(default_factory=Endpointer)  # speech start / end
     last_audio_ts: float = field(default_factory=lambda: time.time())
-    context: List[Dict] = field(default_factory=list)
-    active: bool = False  # set True after first audio chunk
-
-    def reset_audio(self) -> bytes:
-        audio = bytes(self.audio_buffer)
-        self.audio_buffer.clear()
-        return audio
+    context: ConversationContext = field(default_factory=ConversationContext)
+    active: bool = False  # True while the endpointer is inside an utterance
+    query_task: Optional[asyncio.Task] = None  # reply in progress - cancelled by "stop"
+    frames: FrameDecoder = field(default_factory=FrameDecoder)  # binary audio frames
+    stt: Optional[StreamingTranscriber] = None  # partial transcripts of the current utterance
+    streaming: bool = False  # client plays partial / audio_chunk frames (its "hello")
+
+    def flush_audio(self) -> bytes:
+        """Utterance in progress, ended now (the client stopped sending)"""
+        event = self.endpointer.flush()
+        return event["audio"] if event is not None else b""
 
     def add_context(self, user_text: str, response_text: str) -> None:
-        self.context.append(
-            {
-                "user": user_text,
-                "response": response_text,
-                "ts": time.time(),
-            }
-        )
-        # Keep recent history small
-        if len(self.context) > 10:
-            self.context = self.context[-10:]
+        # Bounded by the context itself (older turns fold into its digest)
+        self.context.add(user_text, response_text)
 
 
 class VoiceGatewayWeb:
     def __init__(self) -> None:
         self.sessions: Dict[str, SessionState] = {}
         self.router = QueryRouter()
-        self.loop = asyncio.get_event_loop()
 
     async def start(self) -> None:
         print(f"[VoiceGatewayWeb] Starting on ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
         monitor = asyncio.create_task(self._silence_monitor())
-        async with websockets.serve(self.handle_client, WEBSOCKET_HOST, WEBSOCKET_PORT):
-            await asyncio.Future()  # run forever
-        monitor.cancel()
+        warmup = asyncio.create_task(self.router.awarm_models())
+        try:
+            async with websockets.serve(self.handle_client, WEBSOCKET_HOST, WEBSOCKET_PORT):
+                await asyncio.Future()  # run forever
+        finally:
+            monitor.cancel()
+            warmup.cancel()
+            if self.router.models is not None:
+                self.router.models.stop()
+            await get_transport().aclose()
 
     async def handle_client(self, websocket: WebSocketServerProtocol) -> None:
         session_id = str(uuid.uuid4())
         session = SessionState(websocket=websocket, session_id=session_id)
+        session.context.summarize = self.router.asummarize
         self.sessions[session_id] = session
         print(f"[VoiceGatewayWeb] Client connected: {session_id}")
 
@@ -118,15 +133,24 @@ class VoiceGatewayWeb:
                 "type": "connected",
                 "session_id": session_id,
                 "message": "Connected to HAL web voice gateway",
+                "binary_audio": capabilities(),
             },
         )
 
         try:
             async for message in websocket:
-                await self._handle_message(session, message)
+                if isinstance(message, bytes):
+                    await self._handle_audio_frame(session, message)
+                else:
+                    await self._handle_message(session, message)
         except websockets.exceptions.ConnectionClosed:
             print(f"[VoiceGatewayWeb] Client disconnected: {session_id}")
         finally:
+            if session.query_task is not None:
+                session.query_task.cancel()
+            if session.stt is not None:
+                session.stt.cancel()
+            session.context.close()
             self.sessions.pop(session_id, None)
 
     async def _handle_message(self, session: SessionState, message: str) -> None:
@@ -146,25 +170,26 @@ class VoiceGatewayWeb:
             return
 
         if msg_type == "audio_stream":
+            # Legacy JSON audio (list of int16 values); new clients send binary frames
             audio_list = data.get("audio")
             if not isinstance(audio_list, list):
                 return
-            # Convert list of int16 values to bytes
-            audio_bytes = bytearray()
-            for sample in audio_list:
-                # clamp to int16
-                sample = max(-32768, min(32767, int(sample)))
-                audio_bytes += int(sample).to_bytes(2, byteorder="little", signed=True)
+            await self._add_audio(session, decode_json_audio(audio_list))
+            return
 
-            session.audio_buffer.extend(audio_bytes)
-            session.last_audio_ts = time.time()
+        if msg_type == "stop":
+            await self._cancel_query(session)
+            return
 
-            if not session.active:
-                session.active = True
-                await self._safe_send(
-                    session.websocket,
-                    {"type": "wake_word_detected", "message": "Listening..."},
-                )
+        if msg_type == "hello":
+            session.streaming = bool(data.get("streaming"))
+            return
+
+        if msg_type == "stats":
+            # Upstream connection pooling / keep-alive counters, Ollama model residency
+            models = self.router.models.get_stats() if self.router.models else None
+            await self._safe_send(session.websocket, {"type": "stats", "http": get_transport().get_stats(),
+                                                      "models": models, "audio": session.frames.get_stats()})
             return
 
         # Unknown message
@@ -172,15 +197,43 @@ class VoiceGatewayWeb:
 
     async def _handle_text(self, session: SessionState, text: str) -> None:
         await self._safe_send(session.websocket, {"type": "processing"})
-        response = await self.loop.run_in_executor(
-            None, self.router.route_query, text, session.session_id, session.context
-        )
+        await self._start_query(session, text)
 
-        reply_text = response.get("text", "I didn't understand that.")
+    async def _start_query(self, session: SessionState, text: str) -> None:
+        """Answer in a background task so "stop" (spoken or sent) can cancel it."""
+        if is_stop_command(text):
+            await self._cancel_query(session)
+            return
+        # A new question supersedes an answer still in progress
+        if session.query_task is not None and not session.query_task.done():
+            session.query_task.cancel()
+        session.query_task = asyncio.create_task(self._respond(session, text))
+
+    async def _cancel_query(self, session: SessionState) -> None:
+        task = session.query_task
+        cancelled = task is not None and not task.done()
+        if cancelled:
+            task.cancel()
+            print(f"[VoiceGatewayWeb] Query cancelled: {session.session_id}")
+        session.query_task = None
+        await self._safe_send(session.websocket, {"type": "cancelled", "cancelled": cancelled})
+
+    async def _respond(self, session: SessionState, text: str) -> None:
+        """Route a query; LLM answers stream as partial frames and per-sentence audio
+        to clients that asked for them (hello), everyone else gets it all in "response"."""
+        events = self.router.astream_query(text, session.session_id, session.context)
+        send = None
+        if session.streaming:
+            send = lambda frame: self._safe_send(session.websocket, frame)
+        response, audio_chunks = await speak_stream(events, send, self._synthesize_speech)
+
+        reply_text = response.get("text") or "I didn't understand that."
         session.add_context(text, reply_text)
 
-        # Optional TTS
-        audio_b64 = await self._synthesize_speech(reply_text)
+        # Optional TTS (already sent sentence by sentence if streamed)
+        audio_b64 = None
+        if not audio_chunks:
+            audio_b64 = await self._synthesize_speech(reply_text)
 
         await self._safe_send(
             session.websocket,
@@ -189,49 +242,106 @@ class VoiceGatewayWeb:
                 "text": reply_text,
                 "intent": response.get("intent"),
                 "confidence": response.get("confidence"),
+                "streamed": response.get("streamed", False),
+                "audio_chunks": audio_chunks,
                 "audio": audio_b64,
                 "audio_format": "wav" if audio_b64 else None,
             },
         )
 
+    async def _handle_audio_frame(self, session: SessionState, message: bytes) -> None:
+        try:
+            samples = session.frames.decode(message)
+        except FrameError as e:
+            await self._safe_send(session.websocket, {"type": "error", "message": f"Bad audio frame: {e}"})
+            return
+        await self._add_audio(session, samples)
+
+    async def _add_audio(self, session: SessionState, samples: np.ndarray) -> None:
+        session.last_audio_ts = time.time()
+
+        # Events are decided as the frames arrive - speech end is known 300 ms after it happens
+        for event in session.endpointer.feed(samples):
+            if event["type"] == "speech_start":
+                session.active = True
+                if STREAMING_STT:
+                    if session.stt is not None:
+                        session.stt.cancel()
+                    session.stt = self._new_transcriber(session)
+                await self._safe_send(
+                    session.websocket,
+                    {"type": "wake_word_detected", "message": "Listening..."},
+                )
+            elif event["type"] == "speech_end":
+                session.active = False
+                stt, session.stt = session.stt, None
+                if event["speech_ms"] >= MIN_SPEECH_MS:
+                    asyncio.create_task(self._process_audio_session(session, event["audio"], stt))
+                elif stt is not None:
+                    stt.cancel()
+
+        if session.stt is not None and session.endpointer.triggered:
+            session.stt.update(session.endpointer.utterance)
+
+    def _new_transcriber(self, session: SessionState) -> StreamingTranscriber:
+        async def on_partial(text: str, stable: bool) -> None:
+            await self._safe_send(
+                session.websocket,
+                {"type": "transcription_partial", "text": text, "stable": stable},
+            )
+            if stable:
+                # Intent detection ahead of the final transcript
+                await asyncio.to_thread(self.router.prepare, text)
+
+        return StreamingTranscriber(lambda pcm: transcribe_pcm(STT_URL, pcm), on_partial)
+
     async def _silence_monitor(self) -> None:
-        """Periodically check for end-of-speech and transcribe."""
+        """Periodically end utterances whose client stopped sending audio mid-speech."""
         while True:
             now = time.time()
             tasks = []
             for session in list(self.sessions.values()):
-                if not session.active:
+                if not session.active or now - session.last_audio_ts < SILENCE_TIMEOUT:
                     continue
 
-                audio_ms = (len(session.audio_buffer) / 2) / SAMPLE_RATE * 1000  # int16 => 2 bytes
-                if audio_ms < MIN_AUDIO_MS:
-                    continue
-
-                if now - session.last_audio_ts >= SILENCE_TIMEOUT:
-                    tasks.append(self._process_audio_session(session))
+                session.active = False
+                stt, session.stt = session.stt, None
+                audio_bytes = session.flush_audio()
+                audio_ms = (len(audio_bytes) / 2) / SAMPLE_RATE * 1000  # int16 => 2 bytes
+                if audio_ms >= MIN_AUDIO_MS:
+                    tasks.append(self._process_audio_session(session, audio_bytes, stt))
+                elif stt is not None:
+                    stt.cancel()
 
             if tasks:
                 await asyncio.gather(*tasks)
 
             await asyncio.sleep(0.25)
 
-    async def _process_audio_session(self, session: SessionState) -> None:
-        audio_bytes = session.reset_audio()
-        session.active = False
-
+    async def _process_audio_session(self, session: SessionState, audio_bytes: bytes,
+                                     stt: Optional[StreamingTranscriber] = None) -> None:
         if not audio_bytes:
             return
 
-        # Build WAV in memory
-        wav_buf = io.BytesIO()
-        with wave.open(wav_buf, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(SAMPLE_RATE)
-            wf.writeframes(audio_bytes)
-        wav_buf.seek(0)
-
-        transcription = await self._transcribe_audio(wav_buf)
+        if stt is not None:
+            # Partials already covered most of the utterance - only the tail is left
+            try:
+                transcription = await stt.finish(audio_bytes)
+            except Exception as e:
+                print(f"[VoiceGatewayWeb] Transcription exception: {e}")
+                transcription = None
+            print(f"[VoiceGatewayWeb] STT {stt.get_stats()}")
+        else:
+            # Build WAV in memory
+            wav_buf = io.BytesIO()
+            with wave.open(wav_buf, "wb") as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(SAMPLE_RATE)
+                wf.writeframes(audio_bytes)
+            wav_buf.seek(0)
+
+            transcription = await self._transcribe_audio(wav_buf)
         if not transcription:
             await self._safe_send(
                 session.websocket,
@@ -246,26 +356,7 @@ class VoiceGatewayWeb:
         )
 
         # Route query
-        response = await self.loop.run_in_executor(
-            None, self.router.route_query, transcription, session.session_id, session.context
-        )
-        reply_text = response.get("text", "I didn't understand that.")
-        session.add_context(transcription, reply_text)
-
-        # Optional TTS
-        audio_b64 = await self._synthesize_speech(reply_text)
-
-        await self._safe_send(
-            session.websocket,
-            {
-                "type": "response",
-                "text": reply_text,
-                "intent": response.get("intent"),
-                "confidence": response.get("confidence"),
-                "audio": audio_b64,
-                "audio_format": "wav" if audio_b64 else None,
-            },
-        )
+        await self._start_query(session, transcription)
 
     async def _transcribe_audio(self, wav_buffer: io.BytesIO) -> Optional[str]:
         """Send audio to Faster-Whisper HTTP API."""
@@ -275,14 +366,13 @@ class VoiceGatewayWeb:
             data.add_field("file", wav_buffer, filename="audio.wav", content_type="audio/wav")
             data.add_field("model", "whisper-1")
 
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
-                async with session.post(STT_URL, data=data) as resp:
-                    if resp.status != 200:
-                        text = await resp.text()
-                        print(f"[VoiceGatewayWeb] STT error {resp.status}: {text}")
-                        return None
-                    result = await resp.json()
-                    return result.get("text", "").strip()
+            async with get_transport().apost(STT_URL, data=data, timeout=30) as resp:
+                if resp.status != 200:
+                    text = await resp.text()
+                    print(f"[VoiceGatewayWeb] STT error {resp.status}: {text}")
+                    return None
+                result = await resp.json()
+                return result.get("text", "").strip()
         except Exception as e:
             print(f"[VoiceGatewayWeb] Transcription exception: {e}")
             return None
@@ -300,14 +390,13 @@ class VoiceGatewayWeb:
         }
 
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
-                async with session.post(TTS_URL, json=payload) as resp:
-                    if resp.status != 200:
-                        msg = await resp.text()
-                        print(f"[VoiceGatewayWeb] TTS error {resp.status}: {msg}")
-                        return None
-                    audio_bytes = await resp.read()
-                    return base64.b64encode(audio_bytes).decode("ascii")
+            async with get_transport().apost(TTS_URL, json=payload, timeout=30) as resp:
+                if resp.status != 200:
+                    msg = await resp.text()
+                    print(f"[VoiceGatewayWeb] TTS error {resp.status}: {msg}")
+                    return None
+                audio_bytes = await resp.read()
+                return base64.b64encode(audio_bytes).decode("ascii")
         except Exception as e:
             print(f"[VoiceGatewayWeb] TTS exception: {e}")
             return None
@@ -1,7 +1,8 @@
 """
 HAL Voice Gateway - Web Client Support
 WebSocket server with server-side wake word detection
-Handles audio streaming from web browsers
+Handles audio streaming from web browsers (binary PCM16/Opus frames, see
+audio_frames, or legacy JSON audio_stream messages)
 """
 
 import asyncio
@@ -9,8 +10,7 @@ import websockets
 import json
 import base64
 import uuid
-import requests
-import socket
+import aiohttp
 import numpy as np
 import io
 from datetime import datetime
@@ -27,8 +27,9 @@ sys.path.insert(0, os.path.dirname(PY_DIR))  # Add parent directory too
 # Try to import wake word detection (optional)
 WAKE_WORD_AVAILABLE = False
 try:
-    from openwakeword.model import Model as OWWModel
-    import webrtcvad
+    from wake_word_engine import OPENWAKEWORD_AVAILABLE, get_wake_word_engine
+    if not OPENWAKEWORD_AVAILABLE:
+        raise ImportError("No module named 'openwakeword'")
     WAKE_WORD_AVAILABLE = True
     print("[OK] Wake word detection available")
 except ImportError as e:
@@ -37,6 +38,13 @@ except ImportError as e:
 # Import query router
 try:
     from query_router import get_router
+    from ai_server_client import get_client as get_ai_server
+    from speech_stream import is_stop_command, speak_stream
+    from http_transport import get_transport
+    from conversation_context import ConversationContext
+    from audio_frames import FrameDecoder, FrameError, capabilities, decode_json_audio
+    from vad_endpointer import Endpointer
+    from streaming_stt import StreamingTranscriber, transcribe_pcm
     print("[OK] Query router imported successfully")
 except ImportError as e:
     print(f"[ERROR] Failed to import query_router: {e}")
@@ -52,6 +60,9 @@ TTS_URL = "http://10.1.10.20:8002/v1/audio/speech"  # TTS endpoint
 QM_LISTENER_HOST = "10.1.34.103"  # mv1 Windows server
 QM_LISTENER_PORT = 8745
 MAX_CONNECTIONS = 50
+MIN_SPEECH_MS = 200      # utterances with less voiced audio are noise, not a command
+NO_SPEECH_MS = 5000      # back to passive if nothing is said after the wake word
+STREAMING_STT = True     # transcribe while the user speaks; end-of-speech sends only the tail
 
 # Conversation logging
 ENABLE_CONVERSATION_LOG = True
@@ -69,18 +80,17 @@ class VoiceSession:
         self.state = ClientState.PASSIVE
         self.audio_buffer = []
         self.recording_buffer = []
-        self.context = []
+        self.context = ConversationContext()
         self.last_activity = datetime.now()
-        self.silence_chunks = 0
+        self.query_task = None  # reply in progress - cancelled by "stop"
+        self.frames = FrameDecoder()  # binary audio frames
+        self.streaming = False  # client plays partial / audio_chunk frames (its 'hello')
         
-        # Wake word detection
-        if WAKE_WORD_AVAILABLE:
-            self.oww_model = OWWModel()  # Loads all pre-trained models by default
-            self.wake_word_name = 'hey_jarvis'  # Use hey_jarvis model
-            self.vad = webrtcvad.Vad(2)
-        else:
-            self.oww_model = None
-            self.vad = None
+        # Wake word detection (stream in the shared engine, set on connect)
+        self.wake = None
+        # End of the command after the wake word (speech end + 300 ms hangover)
+        self.endpointer = Endpointer(no_speech_ms=NO_SPEECH_MS)
+        self.stt = None  # StreamingTranscriber for the command being spoken
         
     def update_activity(self):
         self.last_activity = datetime.now()
@@ -89,18 +99,16 @@ class VoiceGateway:
     def __init__(self):
         self.sessions: Dict[str, VoiceSession] = {}
         self.router = get_router()
+        # One wake-word model for all sessions (see wake_word_engine)
+        self.wake_words = get_wake_word_engine() if WAKE_WORD_AVAILABLE else None
     
-    def log_conversation(self, session_id: str, user_text: str, response_text: str, 
-                         intent: str = "", latency_ms: int = 0):
+    async def log_conversation(self, session_id: str, user_text: str, response_text: str, 
+                               intent: str = "", latency_ms: int = 0):
         """Log conversation to QM CONVERSATION file via AI.SERVER"""
         if not ENABLE_CONVERSATION_LOG:
             return
         
         try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(5.0)
-            s.connect((QM_LISTENER_HOST, QM_LISTENER_PORT))
-            
             log_msg = {
                 "type": "log_conversation",
                 "session_id": session_id,
@@ -110,8 +118,7 @@ class VoiceGateway:
                 "latency_ms": latency_ms,
                 "timestamp": datetime.now().isoformat()
             }
-            s.sendall(json.dumps(log_msg).encode() + b'\n')
-            s.close()
+            await get_ai_server(QM_LISTENER_HOST, QM_LISTENER_PORT).request(log_msg)
             print(f"[LOG] Conversation logged for session {session_id[:8]}")
         except Exception as e:
             print(f"[WARN] Failed to log conversation: {e}")
@@ -122,7 +129,7 @@ class VoiceGateway:
             return None
         
         try:
-            response = requests.post(
+            async with get_transport().apost(
                 TTS_URL,
                 json={
                     "model": "tts-1",
@@ -131,12 +138,12 @@ class VoiceGateway:
                     "response_format": "wav"
                 },
                 timeout=30
-            )
-            if response.status_code == 200:
-                return base64.b64encode(response.content).decode('ascii')
-            else:
-                print(f"[ERROR] TTS error: {response.status_code}")
-                return None
+            ) as response:
+                if response.status == 200:
+                    return base64.b64encode(await response.read()).decode('ascii')
+                else:
+                    print(f"[ERROR] TTS error: {response.status}")
+                    return None
         except Exception as e:
             print(f"[ERROR] TTS exception: {e}")
             return None
@@ -152,7 +159,11 @@ class VoiceGateway:
         """Handle WebSocket client connection"""
         session_id = str(uuid.uuid4())
         session = VoiceSession(session_id, websocket)
+        session.context.summarize = self.router.asummarize  # older turns fold into a digest
         self.sessions[session_id] = session
+        if self.wake_words is not None:
+            session.wake = self.wake_words.register(
+                session_id, lambda score: self.on_wake_word(session, score))
         
         print(f"[{datetime.now()}] New connection: {session_id}")
         
@@ -161,14 +172,20 @@ class VoiceGateway:
             'type': 'connected',
             'session_id': session_id,
             'state': session.state.value,
-            'wake_word_detection': WAKE_WORD_AVAILABLE
+            'wake_word_detection': WAKE_WORD_AVAILABLE,
+            'binary_audio': capabilities()
         })
         
         try:
             async for message in websocket:
                 try:
+                    if isinstance(message, bytes):
+                        await self.handle_audio(session, session.frames.decode(message))
+                        continue
                     data = json.loads(message)
                     await self.handle_message(session, data)
+                except FrameError as e:
+                    print(f"[ERROR] Bad audio frame from {session_id}: {e}")
                 except json.JSONDecodeError:
                     print(f"[ERROR] Invalid JSON from {session_id}")
                 except Exception as e:
@@ -179,6 +196,13 @@ class VoiceGateway:
         except websockets.exceptions.ConnectionClosed:
             print(f"[{datetime.now()}] Client disconnected: {session_id}")
         finally:
+            if session.query_task is not None:
+                session.query_task.cancel()
+            if session.stt is not None:
+                session.stt.cancel()
+            session.context.close()
+            if self.wake_words is not None:
+                self.wake_words.unregister(session_id)
             del self.sessions[session_id]
     
     async def handle_message(self, session: VoiceSession, data: dict):
@@ -191,67 +215,97 @@ class VoiceGateway:
             await self.handle_text_input(session, data)
         elif msg_type == 'stop_listening':
             await self.stop_recording(session)
+        elif msg_type == 'stop':
+            await self.cancel_query(session)
+        elif msg_type == 'hello':
+            session.streaming = bool(data.get('streaming'))
         else:
             print(f"[WARN] Unknown message type: {msg_type}")
     
     async def handle_audio_stream(self, session: VoiceSession, data: dict):
-        """Handle streaming audio from web client"""
+        """Handle legacy JSON audio (list of int16 values) from web client"""
+        audio_array = data.get('audio', [])
+        if audio_array:
+            await self.handle_audio(session, decode_json_audio(audio_array))
+    
+    async def handle_audio(self, session: VoiceSession, audio_int16: np.ndarray):
+        """Handle streaming audio (int16 samples) from web client"""
         if not WAKE_WORD_AVAILABLE:
             return
         
         try:
-            # Get audio data
-            audio_array = data.get('audio', [])
-            if not audio_array:
-                return
-            
-            # Convert to numpy array
-            audio_int16 = np.array(audio_array, dtype=np.int16)
-            audio_float = audio_int16.astype(np.float32) / 32768.0
-            
             if session.state == ClientState.PASSIVE:
-                # Check for wake word
-                predictions = session.oww_model.predict(audio_float)
-                score = predictions.get(session.wake_word_name, 0)
-                
-                if score > 0.5:  # Wake word detected!
-                    print(f"[{datetime.now()}] Wake word detected! Score: {score}")
-                    session.state = ClientState.ACTIVE
-                    session.recording_buffer = []
-                    session.silence_chunks = 0
-                    
-                    await self.send_message(session.websocket, {
-                        'type': 'wake_word_detected',
-                        'timestamp': datetime.now().isoformat()
-                    })
+                # Scored with the other passive sessions on the engine's next tick
+                session.wake.push(audio_int16)
             
             elif session.state == ClientState.ACTIVE:
                 # Record audio for command
                 session.recording_buffer.append(audio_int16.tobytes())
                 
-                # Check for silence (end of command)
-                audio_bytes = audio_int16.tobytes()
-                try:
-                    is_speech = session.vad.is_speech(audio_bytes, 16000)
-                    if not is_speech:
-                        session.silence_chunks += 1
-                    else:
-                        session.silence_chunks = 0
-                    
-                    # If 1.5 seconds of silence (15 chunks at ~100ms each)
-                    if session.silence_chunks >= 15 and len(session.recording_buffer) > 10:
-                        await self.process_recording(session)
-                except:
-                    # VAD might fail on short buffers
-                    pass
+                # End of command: VAD frames are cut from the stream, whatever the client's buffer size
+                for event in session.endpointer.feed(audio_int16):
+                    if event['type'] == 'speech_start' and STREAMING_STT:
+                        if session.stt is not None:
+                            session.stt.cancel()
+                        session.stt = self.new_transcriber(session)
+                    if event['type'] == 'speech_end':
+                        if event['speech_ms'] >= MIN_SPEECH_MS:
+                            await self.process_recording(session, event['audio'])
+                            break
+                        # Too short (a cough) - its partials must not reach the client
+                        if session.stt is not None:
+                            session.stt.cancel()
+                            session.stt = None
+                        # ...and it does not count as speech: restart the no-speech timeout
+                        if not session.endpointer.triggered:
+                            session.endpointer.reset()
+                    if event['type'] == 'timeout':
+                        session.state = ClientState.PASSIVE
+                        session.recording_buffer = []
+                        await self.send_message(session.websocket, {
+                            'type': 'error',
+                            'message': 'No speech detected'
+                        })
+                        break
+                
+                if session.stt is not None and session.endpointer.triggered:
+                    session.stt.update(session.endpointer.utterance)
         
         except Exception as e:
             print(f"[ERROR] Audio stream error: {e}")
             import traceback
             traceback.print_exc()
     
-    async def process_recording(self, session: VoiceSession):
-        """Process recorded audio and send to Whisper"""
+    async def on_wake_word(self, session: VoiceSession, score: float):
+        """Wake word engine detected the wake word in a session's audio"""
+        if session.state != ClientState.PASSIVE:
+            return
+        print(f"[{datetime.now()}] Wake word detected! Score: {score:.2f}")
+        session.state = ClientState.ACTIVE
+        session.recording_buffer = []
+        session.endpointer.reset()
+        
+        await self.send_message(session.websocket, {
+            'type': 'wake_word_detected',
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    def new_transcriber(self, session: VoiceSession):
+        """Streaming transcriber that reports partials and prepares the intent on stable ones"""
+        async def on_partial(text: str, stable: bool):
+            await self.send_message(session.websocket, {
+                'type': 'transcription_partial',
+                'text': text,
+                'stable': stable
+            })
+            if stable:
+                await asyncio.to_thread(self.router.prepare, text)
+        
+        return StreamingTranscriber(lambda pcm: transcribe_pcm(WHISPER_URL, pcm, model='base'), on_partial)
+    
+    async def process_recording(self, session: VoiceSession, utterance: bytes = None):
+        """Process recorded audio and send to Whisper
+        utterance: the endpointed speech - with a streaming transcriber only its tail is sent"""
         print(f"[{datetime.now()}] Processing recording for {session.session_id}")
         
         session.state = ClientState.PROCESSING
@@ -266,27 +320,39 @@ class VoiceGateway:
             audio_data = b''.join(session.recording_buffer)
             session.recording_buffer = []
             
-            # Convert to WAV format
-            import wave
-            wav_buffer = io.BytesIO()
-            with wave.open(wav_buffer, 'wb') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)  # 16-bit
-                wav_file.setframerate(16000)
-                wav_file.writeframes(audio_data)
-            
-            wav_buffer.seek(0)
+            stt, session.stt = session.stt, None
             
-            # Send to Whisper
-            response = requests.post(
-                WHISPER_URL,
-                files={'file': ('audio.wav', wav_buffer, 'audio/wav')},
-                data={'model': 'base'},
-                timeout=30
-            )
+            if stt is not None and utterance is not None:
+                # Partials already covered most of the command - only the tail is left
+                status, result = 200, {'text': await stt.finish(utterance)}
+                print(f"[{datetime.now()}] STT {stt.get_stats()}")
+            else:
+                if stt is not None:
+                    stt.cancel()
+                # Convert to WAV format
+                import wave
+                wav_buffer = io.BytesIO()
+                with wave.open(wav_buffer, 'wb') as wav_file:
+                    wav_file.setnchannels(1)
+                    wav_file.setsampwidth(2)  # 16-bit
+                    wav_file.setframerate(16000)
+                    wav_file.writeframes(audio_data)
+                
+                wav_buffer.seek(0)
+                
+                # Send to Whisper
+                form = aiohttp.FormData()
+                form.add_field('file', wav_buffer, filename='audio.wav', content_type='audio/wav')
+                form.add_field('model', 'base')
+                async with get_transport().apost(
+                    WHISPER_URL,
+                    data=form,
+                    timeout=30
+                ) as response:
+                    status = response.status
+                    result = await response.json() if status == 200 else None
             
-            if response.status_code == 200:
-                result = response.json()
+            if status == 200:
                 text = result.get('text', '').strip()
                 
                 print(f"[{datetime.now()}] Transcription: {text}")
@@ -298,7 +364,7 @@ class VoiceGateway:
                 
                 # Process the query
                 if text:
-                    await self.process_query(session, text)
+                    await self.start_query(session, text)
                 else:
                     session.state = ClientState.PASSIVE
                     await self.send_message(session.websocket, {
@@ -306,7 +372,7 @@ class VoiceGateway:
                         'message': 'No speech detected'
                     })
             else:
-                raise Exception(f"Whisper error: {response.status_code}")
+                raise Exception(f"Whisper error: {status}")
         
         except Exception as e:
             print(f"[ERROR] Recording processing error: {e}")
@@ -331,40 +397,74 @@ class VoiceGateway:
             'message': 'Processing...'
         })
         
-        await self.process_query(session, text)
+        await self.start_query(session, text)
+    
+    async def start_query(self, session: VoiceSession, text: str):
+        """Answer in a background task so the socket keeps reading ("stop" can cancel it)"""
+        if is_stop_command(text):
+            await self.cancel_query(session)
+            return
+        
+        # A new question supersedes an answer still in progress
+        if session.query_task is not None and not session.query_task.done():
+            session.query_task.cancel()
+        session.query_task = asyncio.ensure_future(self.process_query(session, text))
+    
+    async def cancel_query(self, session: VoiceSession):
+        """Abandon the answer in progress (LLM stream, TTS and all)"""
+        task = session.query_task
+        cancelled = task is not None and not task.done()
+        if cancelled:
+            task.cancel()
+            print(f"[{datetime.now()}] Query cancelled for {session.session_id}")
+        session.query_task = None
+        session.state = ClientState.PASSIVE
+        await self.send_message(session.websocket, {
+            'type': 'cancelled',
+            'cancelled': cancelled,
+            'state': session.state.value
+        })
     
     async def process_query(self, session: VoiceSession, text: str):
         """Process query through router"""
         start_time = datetime.now()
         
         try:
-            # Use query router
-            result = self.router.route_query(
-                query=text,
-                session_id=session.session_id,
-                context=session.context[-5:]  # Last 5 exchanges
+            # Use query router - LLM answers stream in as partial frames and
+            # per-sentence audio chunks while the rest is still being generated
+            # (for clients that said they can play them)
+            send = None
+            if session.streaming:
+                send = lambda frame: self.send_message(session.websocket, frame)
+            events = self.router.astream_query(
+                text,
+                session.session_id,
+                session.context  # fitted to the LLM's token budget by the handler
             )
+            result, audio_chunks = await speak_stream(events, send, self.synthesize_speech)
             
-            response_text = result.get('text', 'I didn\'t understand that.')
+            response_text = result.get('text') or 'I didn\'t understand that.'
             intent = result.get('intent', '')
             
             # Calculate latency
             latency_ms = int((datetime.now() - start_time).total_seconds() * 1000)
             
             # Add to context
-            session.context.append({'query': text, 'response': response_text})
+            session.context.add(text, response_text)
             
-            # Log conversation
-            self.log_conversation(
+            # Log conversation (in the background - the reply does not wait on it)
+            asyncio.ensure_future(self.log_conversation(
                 session_id=session.session_id,
                 user_text=text,
                 response_text=response_text,
                 intent=intent,
                 latency_ms=latency_ms
-            )
+            ))
             
-            # Generate TTS audio
-            audio_b64 = await self.synthesize_speech(response_text)
+            # Generate TTS audio (already sent sentence by sentence if streamed)
+            audio_b64 = None
+            if not audio_chunks:
+                audio_b64 = await self.synthesize_speech(response_text)
             
             # Send response
             session.state = ClientState.RESPONDING
@@ -372,6 +472,8 @@ class VoiceGateway:
                 'type': 'response',
                 'text': response_text,
                 'intent': intent,
+                'streamed': result.get('streamed', False),
+                'audio_chunks': audio_chunks,
                 'audio': audio_b64,
                 'audio_format': 'wav' if audio_b64 else None,
                 'timestamp': datetime.now().isoformat()
@@ -380,6 +482,9 @@ class VoiceGateway:
             # Return to passive listening
             session.state = ClientState.PASSIVE
         
+        except asyncio.CancelledError:
+            session.state = ClientState.PASSIVE
+            raise
         except Exception as e:
             print(f"[ERROR] Query processing error: {e}")
             import traceback
@@ -403,6 +508,13 @@ class VoiceGateway:
         print(f"[INFO] Whisper: {WHISPER_URL}")
         print(f"[INFO] Wake word detection: {'ENABLED' if WAKE_WORD_AVAILABLE else 'DISABLED'}")
         
+        # Load the LLM models in the background so the first question finds them warm
+        self.warmup = asyncio.create_task(self.router.awarm_models())
+        
+        # The wake-word model is loaded once, before any client connects
+        if self.wake_words is not None:
+            await self.wake_words.start()
+        
         async with websockets.serve(
             self.handle_client,
             WEBSOCKET_HOST,
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Wake Word Engine - One openWakeWord model shared by every passive session
+
+Each web session used to build its own openwakeword Model (all pretrained
+models, hundreds of MB, seconds to load) and run it on its own frames.
+The engine loads the model once per process and keeps only streaming
+state per session (WakeWordStream: audio not yet processed, the last 76
+spectrogram frames and the last 16 embeddings - about 20 KB).
+
+Every tick (80 ms, one openWakeWord step) the audio that all sessions
+pushed is processed together: one spectrogram call, one embedding call
+and one wake-word call for the whole batch, run off the event loop.
+Latency therefore depends on the tick, not on how many sessions listen.
+
+The pipeline is openWakeWord's own streaming one (1280-sample chunks with
+480 samples of context, 76-frame embedding windows every 8 frames, 16
+embeddings per prediction); scores start once a session has 16 real
+embeddings (~1.3 s of audio) instead of being seeded with noise.
+
+Usage:
+    from wake_word_engine import get_wake_word_engine
+
+    engine = get_wake_word_engine()
+    await engine.start()                                 # loads the model once
+    stream = engine.register(session_id, on_detect)      # async on_detect(score)
+    stream.push(int16_samples)                           # passive sessions only
+    engine.unregister(session_id)
+
+    python PY/wake_word_engine.py recording.wav [--sessions 20]
+
+Notes:
+- Settings come from WAKE_WORD_MODEL (name or .onnx path, default
+  hey_jarvis), WAKE_WORD_THRESHOLD (0.5) and WAKE_WORD_TICK_MS (80).
+- Needs openwakeword with onnxruntime (the ONNX models take batches).
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import wave
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from openwakeword.model import Model as OWWModel
+    OPENWAKEWORD_AVAILABLE = True
+except ImportError:
+    OPENWAKEWORD_AVAILABLE = False
+
+# Configuration
+WAKE_WORD_MODEL = os.getenv("WAKE_WORD_MODEL", "hey_jarvis")
+WAKE_WORD_THRESHOLD = float(os.getenv("WAKE_WORD_THRESHOLD", "0.5"))
+WAKE_WORD_TICK_MS = float(os.getenv("WAKE_WORD_TICK_MS", "80"))
+
+SAMPLE_RATE = 16000
+CHUNK = 1280             # 80 ms - one openWakeWord step (8 spectrogram frames)
+MEL_CONTEXT = 480        # 3 hops of earlier audio for each chunk's spectrogram
+MEL_WINDOW = 76          # spectrogram frames per embedding
+MEL_BINS = 32
+EMBEDDING_DIM = 96
+MAX_PENDING = SAMPLE_RATE * 2  # a session further behind than this drops old audio
+
+
+class WakeWordStream:
+    """One session's streaming feature state"""
+
+    def __init__(self, session_id: str, on_detect: Callable[[float], Awaitable],
+                 n_features: int = 16):
+        self.session_id = session_id
+        self.on_detect = on_detect
+        self.n_features = n_features
+        self.score = 0.0
+        self.reset()
+
+    def reset(self):
+        """Forget all audio (after a detection, so the same phrase does not fire twice)"""
+        self.pending = np.zeros(0, dtype=np.int16)
+        self.context = np.zeros(MEL_CONTEXT, dtype=np.int16)
+        self.mel = np.ones((MEL_WINDOW, MEL_BINS), dtype=np.float32)
+        self.features = np.zeros((self.n_features, EMBEDDING_DIM), dtype=np.float32)
+        self.filled = 0  # embeddings computed since reset
+
+    def push(self, samples: np.ndarray):
+        """Queue int16 audio for the next tick"""
+        self.pending = np.concatenate((self.pending, samples.astype(np.int16, copy=False)))
+        if len(self.pending) > MAX_PENDING:
+            self.pending = self.pending[-MAX_PENDING:]
+
+    def take_chunks(self) -> np.ndarray:
+        """Whole chunks queued so far, each with its spectrogram context: (k, MEL_CONTEXT + CHUNK)"""
+        k = len(self.pending) // CHUNK
+        audio = np.concatenate((self.context, self.pending[:k * CHUNK]))
+        rows = np.stack([audio[i * CHUNK:i * CHUNK + MEL_CONTEXT + CHUNK] for i in range(k)])
+        self.context = audio[-MEL_CONTEXT:].copy()
+        self.pending = self.pending[k * CHUNK:].copy()
+        return rows
+
+    def nbytes(self) -> int:
+        return (self.pending.nbytes + self.context.nbytes + self.mel.nbytes
+                + self.features.nbytes)
+
+
+class WakeWordEngine:
+    """Process-wide wake-word model with per-session streams and batched ticks"""
+
+    def __init__(self, model: str = WAKE_WORD_MODEL, threshold: float = WAKE_WORD_THRESHOLD,
+                 tick_ms: float = WAKE_WORD_TICK_MS):
+        self.model_name = model
+        self.threshold = threshold
+        self.tick = tick_ms / 1000
+        self.streams: Dict[str, WakeWordStream] = {}
+        self.n_features = 16
+        self.preprocessor = None
+        self.wake_model = None
+        self.batch_ok = True
+        self._task: Optional[asyncio.Task] = None
+        self._load_lock = threading.Lock()
+        self.stats = {'ticks': 0, 'chunks': 0, 'detections': 0, 'max_batch': 0,
+                      'last_tick_ms': 0.0, 'max_tick_ms': 0.0, 'total_tick_ms': 0.0}
+
+    def load(self):
+        """Load the model (once, blocking)"""
+        with self._load_lock:
+            if self.wake_model is not None:
+                return
+            if not OPENWAKEWORD_AVAILABLE:
+                raise RuntimeError("openwakeword not installed")
+            start = time.perf_counter()
+            model = OWWModel(wakeword_models=[self.model_name], inference_framework='onnx')
+            name = next(iter(model.models))
+            self.preprocessor = model.preprocessor
+            self.n_features = model.model_inputs[name]
+            self.wake_model = model.models[name]
+            print(f"[WakeWord] Loaded {name} in {(time.perf_counter() - start) * 1000:.0f} ms "
+                  f"(threshold {self.threshold}, tick {self.tick * 1000:.0f} ms)")
+
+    async def start(self):
+        """Load the model off the event loop and start the tick loop"""
+        if self._task is not None:
+            return
+        await asyncio.to_thread(self.load)
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def register(self, session_id: str, on_detect: Callable[[float], Awaitable]) -> WakeWordStream:
+        stream = WakeWordStream(session_id, on_detect, self.n_features)
+        self.streams[session_id] = stream
+        return stream
+
+    def unregister(self, session_id: str):
+        self.streams.pop(session_id, None)
+
+    # Inference -------------------------------------------------------------
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            jobs = [(stream, stream.take_chunks()) for stream in list(self.streams.values())
+                    if len(stream.pending) >= CHUNK]
+            if not jobs:
+                continue
+            start = time.perf_counter()
+            try:
+                scores = await asyncio.to_thread(self.infer, jobs)
+            except Exception as e:
+                print(f"[WakeWord] Inference failed: {e}")
+                continue
+            self._record(sum(len(rows) for _, rows in jobs), (time.perf_counter() - start) * 1000)
+
+            for stream, score in scores.items():
+                stream.score = score
+                if score < self.threshold or stream.session_id not in self.streams:
+                    continue
+                self.stats['detections'] += 1
+                stream.reset()
+                try:
+                    await stream.on_detect(score)
+                except Exception as e:
+                    print(f"[WakeWord] Detection handler failed for {stream.session_id}: {e}")
+
+    def infer(self, jobs: List[Tuple[WakeWordStream, np.ndarray]]) -> Dict[WakeWordStream, float]:
+        """One tick: spectrograms, embeddings and scores for every queued chunk at once.
+        Returns the best score per stream (streams still warming up are left out)."""
+        rows = np.concatenate([chunks for _, chunks in jobs])
+        spec = self.preprocessor._get_melspectrogram(rows)
+        spec = np.asarray(spec, dtype=np.float32).reshape(len(rows), -1, MEL_BINS)
+
+        # Embedding window after each chunk (chunks of one stream in order)
+        windows = []
+        i = 0
+        for stream, chunks in jobs:
+            for _ in range(len(chunks)):
+                stream.mel = np.vstack((stream.mel, spec[i]))[-MEL_WINDOW:]
+                windows.append(stream.mel)
+                i += 1
+        embeddings = self.preprocessor.embedding_model_predict(np.stack(windows)[..., None])
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(windows), EMBEDDING_DIM)
+
+        # Wake-word input after each chunk: the newest n_features embeddings
+        inputs = []
+        owners = []
+        i = 0
+        for stream, chunks in jobs:
+            k = len(chunks)
+            history = np.vstack((stream.features, embeddings[i:i + k]))
+            i += k
+            stream.features = history[-stream.n_features:]
+            stream.filled += k
+            for j in range(k):
+                if stream.filled - (k - 1 - j) >= stream.n_features:
+                    inputs.append(history[j + 1:j + 1 + stream.n_features])
+                    owners.append(stream)
+
+        best: Dict[WakeWordStream, float] = {}
+        if inputs:
+            for stream, score in zip(owners, self._predict(np.stack(inputs))):
+                best[stream] = max(best.get(stream, 0.0), float(score))
+        return best
+
+    def _predict(self, x: np.ndarray) -> np.ndarray:
+        """Wake-word scores for (n, n_features, 96) inputs - batched if the model allows"""
+        if self.batch_ok:
+            try:
+                return self._run_model(x)
+            except Exception as e:
+                # Some exported models have a fixed batch size of 1
+                print(f"[WakeWord] Model does not take batches ({e}) - scoring one at a time")
+                self.batch_ok = False
+        return np.concatenate([self._run_model(row[None]) for row in x])
+
+    def _run_model(self, x: np.ndarray) -> np.ndarray:
+        name = self.wake_model.get_inputs()[0].name
+        output = self.wake_model.run(None, {name: x.astype(np.float32)})[0]
+        return np.asarray(output).reshape(len(x), -1)[:, 0]
+
+    def _record(self, chunks: int, elapsed_ms: float):
+        stats = self.stats
+        stats['ticks'] += 1
+        stats['chunks'] += chunks
+        stats['max_batch'] = max(stats['max_batch'], chunks)
+        stats['last_tick_ms'] = round(elapsed_ms, 2)
+        stats['max_tick_ms'] = round(max(stats['max_tick_ms'], elapsed_ms), 2)
+        stats['total_tick_ms'] += elapsed_ms
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        ticks = stats.pop('total_tick_ms')
+        stats['avg_tick_ms'] = round(ticks / stats['ticks'], 2) if stats['ticks'] else 0.0
+        stats['sessions'] = len(self.streams)
+        stats['session_bytes'] = sum(s.nbytes() for s in self.streams.values())
+        stats['model'] = self.model_name
+        stats['batched'] = self.batch_ok
+        return stats
+
+
+# Singleton engine
+_engine = None
+
+
+def get_wake_word_engine() -> WakeWordEngine:
+    """Get or create the shared engine"""
+    global _engine
+    if _engine is None:
+        _engine = WakeWordEngine()
+    return _engine
+
+
+def main():
+    """Feed a 16 kHz mono WAV to N simulated sessions in real time and report tick cost"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    sessions = 1
+    if "--sessions" in sys.argv:
+        idx = sys.argv.index("--sessions")
+        if idx + 1 < len(sys.argv):
+            sessions = int(sys.argv[idx + 1])
+
+    with wave.open(sys.argv[1], 'rb') as wf:
+        if wf.getframerate() != SAMPLE_RATE or wf.getnchannels() != 1:
+            print("[WakeWord] Need 16 kHz mono audio")
+            sys.exit(1)
+        audio = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+    async def run():
+        engine = get_wake_word_engine()
+        await engine.start()
+        for n in range(sessions):
+            async def on_detect(score, n=n):
+                print(f"[WakeWord] session {n}: detected ({score:.2f})")
+            engine.register(str(n), on_detect)
+        frame = SAMPLE_RATE // 10  # browsers send ~100 ms frames
+        for offset in range(0, len(audio), frame):
+            for stream in engine.streams.values():
+                stream.push(audio[offset:offset + frame])
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(engine.tick * 2)
+        engine.stop()
+        print(f"[WakeWord] {engine.get_stats()}")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
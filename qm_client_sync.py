@@ -1,62 +1,25 @@
 #!/usr/bin/env python
 """Simple synchronous QM client for use in voice gateway"""
-import socket
-import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'PY'))
+from ai_server_client import AIServerError, request_sync
 
 def query_qm(transcription, session_id='unknown'):
     """Send query to QM listener and get response"""
+    # Build message (format for AI.SERVER)
+    message = {
+        'type': 'text_input',
+        'text': transcription,
+        'user_id': session_id,
+        'session_id': session_id
+    }
+    
     try:
-        # Create socket
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.settimeout(5.0)
-        
-        # Connect
-        s.connect(('localhost', 8745))  # AI.SERVER port
-        
-        # Build message (format for AI.SERVER)
-        message = {
-            'type': 'text_input',
-            'text': transcription,
-            'user_id': session_id,
-            'session_id': session_id
-        }
-        
-        # Send
-        msg_bytes = json.dumps(message).encode() + b'\n'
-        s.sendall(msg_bytes)
-        
-        # Receive - read until we get newline or connection closes
-        response_data = b""
-        while True:
-            chunk = s.recv(4096)
-            if not chunk:
-                break
-            response_data += chunk
-            if b'\n' in chunk:
-                break
-        
-        # Close
-        s.close()
-        
-        # Parse and return
-        if response_data:
-            response_text = response_data.decode()
-            return json.loads(response_text)
-        else:
-            raise Exception("No response from QM")
-            
-    except json.JSONDecodeError as e:
-        # Show actual problematic data
-        try:
-            bad_data = response_data.decode() if response_data else 'No data'
-        except:
-            bad_data = str(response_data)
-        return {
-            'text': f'JSON error: {e} | Data: {bad_data[:200]}',
-            'action_taken': 'ERROR',
-            'status': 'error'
-        }
-    except Exception as e:
+        # Shared persistent connection to AI.SERVER
+        return request_sync(message, timeout=5.0, host='localhost')
+    except AIServerError as e:
         return {
             'text': f'QM connection error: {e}',
             'action_taken': 'ERROR',
@@ -0,0 +1,114 @@
+"""
+Test audio_frames.FrameDecoder and the binary audio frame layout
+
+Frames are built both with encode_frame and byte by byte the way
+client.js pcmFrame() writes them. Covers PCM16 round trips, lost-frame
+counting across sequence wrap-around, every FrameError case and the
+legacy JSON audio path.
+
+Usage:
+    python tests/test_audio_frames.py
+"""
+import os
+import struct
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "PY"))
+from audio_frames import (
+    HEADER, OPUS_AVAILABLE, FrameDecoder, FrameError, capabilities,
+    decode_json_audio, encode_frame
+)
+
+
+def client_frame(samples, seq=0, codec=0, rate=16000, magic=b'HA', version=1):
+    """Header as client.js pcmFrame() writes it, field by field"""
+    header = magic + bytes([version, codec]) + struct.pack('<I', rate) + struct.pack('<I', seq)
+    return header + np.asarray(samples, dtype='<i2').tobytes()
+
+
+def expect_error(decoder, message, text):
+    try:
+        decoder.decode(message)
+    except FrameError as e:
+        assert text in str(e), f"{text!r} not in {e!r}"
+        return
+    raise AssertionError(f"no FrameError for {message[:16]!r}")
+
+
+def test_pcm16_round_trip():
+    rng = np.random.default_rng(1)
+    samples = rng.integers(-32768, 32768, 4096).astype(np.int16)
+    decoder = FrameDecoder()
+
+    decoded = decoder.decode(encode_frame(samples, seq=0))
+    assert decoded.dtype == np.int16 and np.array_equal(decoded, samples)
+
+    # client.js builds the same bytes
+    assert client_frame(samples, seq=1) == encode_frame(samples, seq=1)
+    assert np.array_equal(decoder.decode(client_frame(samples, seq=1)), samples)
+
+    # An empty payload is a valid (silent) frame
+    assert len(decoder.decode(encode_frame(np.array([], dtype=np.int16), seq=2))) == 0
+    assert decoder.get_stats() == {'frames': 3, 'lost': 0,
+                                   'bytes': 2 * (HEADER.size + 8192) + HEADER.size}
+    print(f"[OK] PCM16 round trip, stats {decoder.get_stats()}")
+
+
+def test_lost_frames():
+    samples = np.zeros(160, dtype=np.int16)
+    decoder = FrameDecoder()
+    for seq in (0, 1, 2, 5, 6, 9):
+        decoder.decode(encode_frame(samples, seq))
+    assert decoder.lost == 4, decoder.get_stats()
+
+    # The 32-bit sequence number wraps without counting a gap
+    decoder = FrameDecoder()
+    for seq in (0xFFFFFFFE, 0xFFFFFFFF, 0, 1):
+        decoder.decode(encode_frame(samples, seq))
+    assert decoder.lost == 0, decoder.get_stats()
+    decoder.decode(encode_frame(samples, 3))
+    assert decoder.lost == 1, decoder.get_stats()
+    print("[OK] lost frames counted, wrap-around is not a gap")
+
+
+def test_bad_frames():
+    decoder = FrameDecoder()
+    samples = np.zeros(16, dtype=np.int16)
+    expect_error(decoder, b'HA\x01', "too short")
+    expect_error(decoder, client_frame(samples, magic=b'XX'), "bad magic")
+    expect_error(decoder, client_frame(samples, version=2), "bad magic or version")
+    expect_error(decoder, client_frame(samples, rate=48000), "unsupported sample rate")
+    expect_error(decoder, client_frame(samples) + b'\x00', "odd PCM16")
+    expect_error(decoder, client_frame(samples, codec=7), "unknown codec")
+    if not OPUS_AVAILABLE:
+        expect_error(decoder, client_frame(samples, codec=1), "opuslib not installed")
+    # FrameError is a ValueError, so generic handlers still catch it
+    assert issubclass(FrameError, ValueError)
+    print("[OK] malformed frames raise FrameError")
+
+
+def test_json_audio():
+    decoded = decode_json_audio([0, 1, -1, 32767, -32768, 40000, -40000])
+    assert decoded.dtype == np.int16
+    assert decoded.tolist() == [0, 1, -1, 32767, -32768, 32767, -32768]
+    assert len(decode_json_audio([])) == 0
+    print("[OK] legacy JSON audio decoded and clamped")
+
+
+def test_capabilities():
+    caps = capabilities()
+    assert 'pcm16' in caps['codecs'] and caps['sample_rate'] == 16000
+    assert caps['header_bytes'] == HEADER.size == 12
+    assert ('opus' in caps['codecs']) == OPUS_AVAILABLE
+    print(f"[OK] capabilities {caps}")
+
+
+if __name__ == "__main__":
+    test_pcm16_round_trip()
+    test_lost_frames()
+    test_bad_frames()
+    test_json_audio()
+    test_capabilities()
+    print("[SUCCESS] FrameDecoder tests passed")
@@ -0,0 +1,92 @@
+"""
+Test QueryRouter.detect_intent (compiled IntentClassifier) against the
+original first-match loop over the same pattern tables
+
+Utterances are generated from the words the patterns look for, filler
+words and greetings (short and long, so the under-20-characters greeting
+rule is exercised on both sides); every one must get the same intent.
+
+Usage:
+    python tests/test_intent_classifier.py [--count 100000]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "PY"))
+from query_router import QueryRouter
+
+FILLER = ['the', 'a', 'please', 'my', 'in', 'on', 'from', 'is', 'are', 'was', 'what', 'who',
+          'kitchen', 'bedroom', 'now', 'can', 'you', 'me', 'about', 'weather', 'today', 'tell',
+          'time', 'date', 'current', 'hello', 'hi', 'hey', 'there', 'hal', 'x', 'records',
+          'lightsaber', 'sets', 'history', 'this']
+PUNCTUATION = ['', '', '?', '.', '!', ',']
+
+
+def legacy_detect_intent(router, query):
+    """detect_intent as it was before the classifier, line for line"""
+    query_lower = query.lower()
+
+    # Check for built-in queries (time, date, hello) - HIGHEST PRIORITY
+    if re.search(r'\b(what|current|tell me)\s+(time|date)\b', query_lower):
+        return ('builtin', 0.95)
+    if re.search(r'\b(hello|hi|hey)\b', query_lower) and len(query_lower) < 20:
+        return ('builtin', 0.95)
+
+    # Check Home Assistant patterns
+    for pattern in router.home_assistant_patterns:
+        if re.search(pattern, query_lower):
+            return ('home_assistant', 0.9)
+
+    # Check Database patterns
+    for pattern in router.database_patterns:
+        if re.search(pattern, query_lower):
+            return ('database', 0.85)
+
+    # Default to LLM for general queries
+    return ('llm', 0.7)
+
+
+def pattern_words(router):
+    """Literal words the pattern tables look for"""
+    words = set()
+    for pattern in router.home_assistant_patterns + router.database_patterns:
+        words.update(w for w in re.findall(r'[a-z]+', pattern.replace('\\b', ' ')) if len(w) > 1)
+    return sorted(words)
+
+
+def random_utterance(rng, vocabulary):
+    words = [rng.choice(vocabulary) if rng.random() < 0.5 else rng.choice(FILLER)
+             for _ in range(rng.randint(1, 8))]
+    text = ' '.join(words) + rng.choice(PUNCTUATION)
+    if rng.random() < 0.3:
+        text = text.capitalize() if rng.random() < 0.5 else text.upper()
+    return text
+
+
+def test_intent_classifier(count=100000, seed=1):
+    router = QueryRouter()
+    vocabulary = pattern_words(router)
+    rng = random.Random(seed)
+    seen = {}
+    mismatches = 0
+    start = time.time()
+    for _ in range(count):
+        query = random_utterance(rng, vocabulary)
+        got = router.detect_intent(query)
+        expected = legacy_detect_intent(router, query)
+        seen[expected[0]] = seen.get(expected[0], 0) + 1
+        if got != expected:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"[FAIL] {query!r}: classifier {got}, loop {expected}")
+    print(f"Checked {count} utterances in {time.time() - start:.1f}s - intents {seen}")
+    assert mismatches == 0, f"{mismatches} mismatches"
+    print("[SUCCESS] IntentClassifier makes the same decisions as the old detect_intent loop")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[sys.argv.index("--count") + 1]) if "--count" in sys.argv else 100000
+    test_intent_classifier(count)
@@ -0,0 +1,128 @@
+"""
+Test PayeeMatcher against a direct port of BP STANDARDIZE.PAYEES
+(LOAD_RULES exchange sort + APPLY_RULES INDEX / prefix / exact loop)
+
+Random rule sets (tied, non-numeric and empty priorities, inactive and
+non-STANDARDIZE rules) are matched against random payees; every payee
+must get the same rule from both.
+
+Not covered (the matcher deliberately differs): empty patterns, which BP
+lets match every payee, and numeric-looking payees, which QM's = compares
+as numbers.
+
+Usage:
+    python tests/test_payee_matcher.py [--rounds 200] [--payees 500]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "PY"))
+from payee_matcher import PayeeMatcher
+from qm_records import FM
+
+FRAGMENTS = ['AMAZON', 'AMAZON.COM', 'AMZN', 'MKTP', 'WALMART', 'WAL', 'MART', 'SHELL',
+             'SHELL OIL', 'STARBUCKS', 'STAR', 'UBER', 'UBER EATS', 'EATS', 'NETFLIX',
+             'SQ *', 'PAYPAL *', 'TST*', 'COSTCO', 'CO', 'TARGET', 'T', 'A', 'GAS', 'STORE']
+NOISE = ['', ' #1234', ' SEATTLE WA', '*2K4', ' 000123', ' - PURCHASE', ' INC', '.COM']
+TYPES = ['PAYEE.MATCH', 'EXACT.MATCH', 'STARTS.WITH', 'CATEGORY.MATCH']
+ACTIONS = ['STANDARDIZE', 'STANDARDIZE', 'STANDARDIZE', 'CATEGORIZE']
+PRIORITIES = ['1', '2', '2', '5', '10', '10', '2.5', '', 'A', 'HIGH', '010', '-1']
+
+_NUMERIC = re.compile(r'[+-]?(\d+\.?\d*|\.\d+)\Z')
+
+
+def qm_greater(a, b):
+    """QM BASIC a > b: numeric when both are numeric (NUM("") is true), else string"""
+    a_num = a == '' or _NUMERIC.match(a)
+    b_num = b == '' or _NUMERIC.match(b)
+    if a_num and b_num:
+        return float(a or 0) > float(b or 0)
+    return a > b
+
+
+def bp_load_rules(records):
+    """LOAD_RULES, line for line: active rules, exchange-sorted on field 5"""
+    rule_ids, rule_recs = [], []
+    for rule_id, raw in records.items():
+        rule_rec = raw.split(FM) + [''] * 6
+        if rule_rec[5] == 'Y':
+            rule_ids.append(rule_id)
+            rule_recs.append(rule_rec)
+
+    num_rules = len(rule_recs)
+    for i in range(num_rules - 1):
+        for j in range(i + 1, num_rules):
+            if qm_greater(rule_recs[i][4], rule_recs[j][4]):
+                rule_ids[i], rule_ids[j] = rule_ids[j], rule_ids[i]
+                rule_recs[i], rule_recs[j] = rule_recs[j], rule_recs[i]
+    return list(zip(rule_ids, rule_recs))
+
+
+def bp_apply_rules(rules, raw_payee):
+    """APPLY_RULES, line for line; returns the matching rule id or None"""
+    for rule_id, rule_rec in rules:
+        rule_type, pattern, action = rule_rec[0], rule_rec[1], rule_rec[2]
+        matched = False
+        if rule_type == 'PAYEE.MATCH':
+            matched = pattern.upper() in raw_payee.upper()
+        elif rule_type == 'EXACT.MATCH':
+            matched = raw_payee.upper() == pattern.upper()
+        elif rule_type == 'STARTS.WITH':
+            matched = raw_payee.upper()[:len(pattern)] == pattern.upper()
+        if matched and action == 'STANDARDIZE':
+            return rule_id
+    return None
+
+
+def random_case(rng, text):
+    return ''.join(ch.lower() if rng.random() < 0.3 else ch for ch in text)
+
+
+def random_rules(rng, count):
+    records = {}
+    for n in range(count):
+        rule_id = f"R{rng.randint(1, 10 ** 6):07d}"
+        pattern = random_case(rng, rng.choice(FRAGMENTS))
+        if rng.random() < 0.2:
+            pattern += ' ' + rng.choice(FRAGMENTS)
+        fields = [rng.choice(TYPES), pattern, rng.choice(ACTIONS), f"PAYEE {n}",
+                  rng.choice(PRIORITIES), 'Y' if rng.random() < 0.85 else 'N']
+        records[rule_id] = FM.join(fields)
+    return records
+
+
+def random_payee(rng):
+    words = [rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 3))]
+    return random_case(rng, rng.choice(['', ' ']).join(words) + rng.choice(NOISE))
+
+
+def test_payee_matcher(rounds=200, payees=500, seed=1):
+    rng = random.Random(seed)
+    checked = mismatches = 0
+    start = time.time()
+    for _ in range(rounds):
+        records = random_rules(rng, rng.randint(1, 60))
+        matcher = PayeeMatcher(records)
+        bp_rules = bp_load_rules(records)
+        for _ in range(payees):
+            payee = random_payee(rng)
+            rule = matcher.match(payee)
+            got = rule['id'] if rule else None
+            expected = bp_apply_rules(bp_rules, payee)
+            checked += 1
+            if got != expected:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"[FAIL] {payee!r}: matcher {got}, BP {expected}")
+    print(f"Checked {checked} payees over {rounds} rule sets in {time.time() - start:.1f}s")
+    assert mismatches == 0, f"{mismatches} mismatches"
+    print("[SUCCESS] PayeeMatcher picks the same rule as STANDARDIZE.PAYEES")
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[sys.argv.index("--rounds") + 1]) if "--rounds" in sys.argv else 200
+    payees = int(sys.argv[sys.argv.index("--payees") + 1]) if "--payees" in sys.argv else 500
+    test_payee_matcher(rounds, payees)
@@ -0,0 +1,132 @@
+"""
+Test ResponseCache: keys, TTLs, data-version invalidation and LRU eviction
+
+Usage:
+    python tests/test_response_cache.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "PY"))
+from conversation_context import ConversationContext
+from qm_cache import record_cache
+from response_cache import ResponseCache, normalize
+
+
+def answer(text):
+    return {'text': text, 'intent': 'database', 'status': 'success'}
+
+
+def test_normalize():
+    assert normalize("What medications am I taking?") == "what medications am i taking"
+    assert normalize("  what  MEDICATIONS, am I taking ") == "what medications am i taking"
+    assert normalize("What's the time?") == "what's the time"
+    print("[OK] queries normalised")
+
+
+def test_hit_and_copy():
+    cache = ResponseCache()
+    key = cache.key("What medications am I taking?", 'database', files=['MEDICATION'])
+    assert cache.get(key) is None
+    stored = answer("Aspirin")
+    cache.put(key, stored)
+
+    # Same question, different wording noise
+    hit = cache.get(cache.key("what medications am i taking", 'database', files=['MEDICATION']))
+    assert hit == dict(stored, cached=True), hit
+    hit['text'] = 'changed'
+    assert 'cached' not in stored and cache.get(key)['text'] == 'Aspirin'
+
+    stats = cache.get_stats()
+    assert stats['hits'] == 2 and stats['misses'] == 1 and stats['entries'] == 1, stats
+    print(f"[OK] hits return marked copies, stats {stats['hits']}/{stats['misses']}")
+
+
+def test_not_cached():
+    cache = ResponseCache()
+    # TTL 0: builtins and Home Assistant commands are never cached
+    assert cache.key("what time is it", 'builtin') is None
+    assert cache.key("turn on the lights", 'home_assistant') is None
+    assert cache.get(None) is None
+    cache.put(None, answer("x"))
+    assert cache.get_stats()['intents']['builtin']['bypassed'] == 1
+
+    # Only successful responses are stored
+    key = cache.key("list medications", 'database')
+    cache.put(key, {'text': 'QM error', 'status': 'error'})
+    cache.put(key, "not a dict")
+    assert cache.get(key) is None
+    print("[OK] uncached intents and failed responses are not stored")
+
+
+def test_ttl():
+    cache = ResponseCache(ttls={'llm': 0.05})
+    key = cache.key("tell me a joke", 'llm')
+    cache.put(key, answer("knock knock"))
+    assert cache.get(key) is not None
+    time.sleep(0.1)
+    assert cache.get(key) is None and cache.get_stats()['entries'] == 0
+    print("[OK] entries expire after the intent's TTL")
+
+
+def test_write_invalidates():
+    cache = ResponseCache()
+    key = cache.key("list medications", 'database', files=['MEDICATION', 'PERSON'])
+    cache.put(key, answer("Aspirin"))
+    assert cache.get(cache.key("list medications", 'database', files=['PERSON', 'MEDICATION']))
+
+    # A write to one of the files the answer was read from changes the key
+    record_cache.invalidate('MEDICATION', 'M1')
+    assert cache.get(cache.key("list medications", 'database', files=['MEDICATION', 'PERSON'])) is None
+    # ...a write to an unrelated file does not
+    key = cache.key("list medications", 'database', files=['MEDICATION'])
+    cache.put(key, answer("Aspirin"))
+    record_cache.invalidate('TRANSACTION', 'T1')
+    assert cache.get(cache.key("list medications", 'database', files=['MEDICATION'])) is not None
+    print("[OK] QM writes invalidate answers read from the written file")
+
+
+def test_context():
+    cache = ResponseCache()
+    context = ConversationContext()
+    context.add("who is my doctor", "Dr. Smith")
+    key = cache.key("what is his phone number", 'llm', context=context)
+    cache.put(key, answer("555-1234"))
+    assert cache.get(cache.key("what is his phone number", 'llm', context=context)) is not None
+    assert cache.get(cache.key("what is his phone number", 'llm')) is None
+
+    other = ConversationContext()
+    other.add("who is my dentist", "Dr. Jones")
+    assert cache.get(cache.key("what is his phone number", 'llm', context=other)) is None
+
+    # The digest of older turns is part of the key too
+    context.digest = "The user asked about their dentist earlier."
+    assert cache.get(cache.key("what is his phone number", 'llm', context=context)) is None
+    context.close()
+    other.close()
+    print("[OK] LLM answers are keyed on the conversation")
+
+
+def test_lru():
+    cache = ResponseCache(max_entries=2)
+    keys = [cache.key(f"question {n}", 'database') for n in range(3)]
+    cache.put(keys[0], answer("0"))
+    cache.put(keys[1], answer("1"))
+    assert cache.get(keys[0]) is not None   # 0 is now most recently used
+    cache.put(keys[2], answer("2"))         # evicts 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.get_stats()['intents']['database']['evictions'] == 1
+    print("[OK] least recently used entry evicted")
+
+
+if __name__ == "__main__":
+    test_normalize()
+    test_hit_and_copy()
+    test_not_cached()
+    test_ttl()
+    test_write_invalidates()
+    test_context()
+    test_lru()
+    print("[SUCCESS] ResponseCache tests passed")
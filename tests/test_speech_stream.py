@@ -0,0 +1,131 @@
+"""
+Test speech_stream: SentenceSplitter, is_stop_command and speak_stream
+
+The splitter must cut the same sentences whether the text arrives in one
+piece or as LLM-sized deltas; speak_stream must send frames only to
+clients that asked for them and report how many audio chunks it sent.
+
+Usage:
+    python tests/test_speech_stream.py [--rounds 200]
+"""
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "PY"))
+from speech_stream import SentenceSplitter, is_stop_command, speak_stream
+
+ANSWER = ("Sure. The appointment with Dr. Smith is on Tuesday at 3 pm! "
+          "Do you want a reminder? I can also add it to the calendar, e.g. the family one.\n"
+          "Short line\n\n"
+          "He said \"bring the insurance card.\" Anything else")
+
+
+def split_all(deltas):
+    splitter = SentenceSplitter()
+    sentences = []
+    for delta in deltas:
+        sentences.extend(splitter.feed(delta))
+    rest = splitter.flush()
+    return sentences + ([rest] if rest else [])
+
+
+def random_deltas(rng, text):
+    deltas, start = [], 0
+    while start < len(text):
+        end = start + rng.randint(1, 8)
+        deltas.append(text[start:end])
+        start = end
+    return deltas
+
+
+def test_sentences():
+    sentences = split_all([ANSWER])
+    assert sentences == [
+        "Sure. The appointment with Dr. Smith is on Tuesday at 3 pm!",  # "Sure." is too short alone
+        "Do you want a reminder?",
+        "I can also add it to the calendar, e.g. the family one.",
+        "Short line\n\nHe said \"bring the insurance card.\"",
+        "Anything else",
+    ], sentences
+    print(f"[OK] {len(sentences)} sentences, abbreviations and short fragments kept together")
+
+
+def test_delta_size_does_not_matter(rounds=200, seed=1):
+    rng = random.Random(seed)
+    expected = split_all([ANSWER])
+    for _ in range(rounds):
+        got = split_all(random_deltas(rng, ANSWER))
+        assert got == expected, f"{got} != {expected}"
+    print(f"[OK] same sentences for {rounds} random delta splits")
+
+
+def test_flush():
+    splitter = SentenceSplitter()
+    assert splitter.feed("No sentence end yet") == []
+    assert splitter.flush() == "No sentence end yet"
+    assert splitter.flush() is None
+    assert splitter.feed("   ") == [] and splitter.flush() is None
+    print("[OK] flush returns the unterminated rest once")
+
+
+def test_stop_commands():
+    for text in ("Stop.", "stop", "HAL, cancel that", "hey jarvis stop", "Never mind!", "That's enough"):
+        assert is_stop_command(text), text
+    for text in ("don't stop the music", "stop the timer in ten minutes", "cancel my appointment", ""):
+        assert not is_stop_command(text), text
+    print("[OK] stop commands recognised, ordinary requests are not")
+
+
+async def events(deltas, response):
+    for delta in deltas:
+        yield {'type': 'delta', 'text': delta}
+    yield {'type': 'done', 'response': response}
+
+
+async def synthesize(sentence):
+    return 'UklGRg==' if 'Short' not in sentence else None  # TTS can fail for a sentence
+
+
+def run_stream(send, synthesize=None, deltas=(ANSWER,)):
+    frames = []
+
+    async def collect(frame):
+        frames.append(frame)
+
+    async def main():
+        return await speak_stream(events(list(deltas), {'text': ANSWER, 'status': 'success'}),
+                                  collect if send else None, synthesize)
+
+    response, chunks = asyncio.run(main())
+    return response, chunks, frames
+
+
+def test_speak_stream():
+    # Streaming client with server TTS: partials, then audio chunks in seq order
+    response, chunks, frames = run_stream(send=True, synthesize=synthesize)
+    audio = [f for f in frames if f['type'] == 'audio_chunk']
+    assert response['streamed'] is True and chunks == len(audio) == 4, (chunks, frames)
+    assert [f['seq'] for f in audio] == list(range(4))
+    assert ''.join(f['text'] for f in frames if f['type'] == 'partial') == ANSWER
+
+    # Streaming client, no server TTS: sentence frames, no audio chunks counted
+    _, chunks, frames = run_stream(send=True)
+    sentences = [f for f in frames if f['type'] == 'sentence']
+    assert chunks == 0 and len(sentences) == 5 and [f['seq'] for f in sentences] == list(range(5))
+
+    # Client that did not ask for streaming: nothing sent, no TTS
+    response, chunks, frames = run_stream(send=False, synthesize=synthesize)
+    assert frames == [] and chunks == 0 and response['text'] == ANSWER
+    print("[OK] speak_stream frames and chunk counts")
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[sys.argv.index("--rounds") + 1]) if "--rounds" in sys.argv else 200
+    test_sentences()
+    test_delta_size_does_not_matter(rounds)
+    test_flush()
+    test_stop_commands()
+    test_speak_stream()
+    print("[SUCCESS] speech_stream tests passed")
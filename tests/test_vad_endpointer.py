@@ -0,0 +1,138 @@
+"""
+Test the streaming VAD Endpointer on synthetic audio
+
+Speech is a 300 Hz tone, silence is zeros, and frames are classified by
+RMS energy (the fallback used without webrtcvad) so the results do not
+depend on the VAD model. Covers speech start / end timing, reframing of
+arbitrary buffer sizes, the no-speech timeout (including the regression
+where it fired after the user had already spoken), max utterance length
+and flush().
+
+Usage:
+    python tests/test_vad_endpointer.py
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "PY"))
+from vad_endpointer import SAMPLE_RATE, Endpointer
+
+
+def tone(ms, amplitude=3000):
+    t = np.arange(SAMPLE_RATE * ms // 1000) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 300 * t)).astype(np.int16)
+
+
+def silence(ms):
+    return np.zeros(SAMPLE_RATE * ms // 1000, dtype=np.int16)
+
+
+def energy_endpointer(**kwargs):
+    endpointer = Endpointer(**kwargs)
+    endpointer.vad = None  # RMS energy decides, whether or not webrtcvad is installed
+    return endpointer
+
+
+def feed_chunked(endpointer, audio, chunk):
+    events = []
+    for start in range(0, len(audio), chunk):
+        events.extend(endpointer.feed(audio[start:start + chunk]))
+    return events
+
+
+def test_speech_start_and_end():
+    endpointer = energy_endpointer()
+    audio = np.concatenate([silence(600), tone(900), silence(600)])
+    events = feed_chunked(endpointer, audio, 4096)
+
+    assert [e['type'] for e in events] == ['speech_start', 'speech_end'], events
+    start, end = events
+    # Start is decided a few frames into the tone, end 300 ms (end_ms) after it stops
+    assert 600 < start['t_ms'] <= 600 + 150, start
+    assert 1500 + 300 <= end['t_ms'] <= 1500 + 300 + 30, end
+    assert 800 <= end['speech_ms'] <= 900, end
+    # The pre-roll keeps the audio from before the start decision
+    assert len(end['audio']) >= 900 * SAMPLE_RATE // 1000 * 2
+    print(f"[OK] speech_start at {start['t_ms']} ms, speech_end at {end['t_ms']} ms")
+
+
+def test_reframes_any_buffer_size():
+    audio = np.concatenate([silence(300), tone(500), silence(500), tone(400), silence(400)])
+    expected = None
+    for chunk in (len(audio), 4096, 1000, 479, 7):
+        events = feed_chunked(energy_endpointer(), audio, chunk)
+        summary = [(e['type'], e['t_ms'], len(e.get('audio', b''))) for e in events]
+        if expected is None:
+            expected = summary
+        assert summary == expected, f"chunk {chunk}: {summary} != {expected}"
+    assert [s[0] for s in expected] == ['speech_start', 'speech_end'] * 2, expected
+
+    # PCM16 bytes are accepted as well as int16 arrays
+    events = energy_endpointer().feed(audio.tobytes())
+    assert [(e['type'], e['t_ms']) for e in events] == [(s[0], s[1]) for s in expected]
+    print(f"[OK] same events for every buffer size: {expected}")
+
+
+def test_timeout_without_speech():
+    endpointer = energy_endpointer(no_speech_ms=1000)
+    events = feed_chunked(endpointer, silence(3000), 4096)
+    assert [e['type'] for e in events] == ['timeout'], events
+    assert 960 <= events[0]['t_ms'] <= 1020, events
+
+    # reset() re-arms it
+    endpointer.reset()
+    events = feed_chunked(endpointer, silence(1500), 4096)
+    assert [e['type'] for e in events] == ['timeout'], events
+    print(f"[OK] timeout at {events[0]['t_ms']} ms of silence, once per reset")
+
+
+def test_no_timeout_after_speech():
+    """Regression: the timeout fired in the silence after a finished utterance"""
+    endpointer = energy_endpointer(no_speech_ms=1000)
+    audio = np.concatenate([silence(200), tone(400), silence(3000)])
+    events = feed_chunked(endpointer, audio, 4096)
+    assert [e['type'] for e in events] == ['speech_start', 'speech_end'], events
+
+    # Speech that starts after the timeout has fired still gets through
+    endpointer.reset()
+    audio = np.concatenate([silence(1500), tone(500), silence(500)])
+    events = feed_chunked(endpointer, audio, 4096)
+    assert [e['type'] for e in events] == ['timeout', 'speech_start', 'speech_end'], events
+    print("[OK] no timeout once speech has started")
+
+
+def test_max_utterance():
+    endpointer = energy_endpointer(max_utterance_ms=1000)
+    events = feed_chunked(endpointer, tone(2500), 4096)
+    types = [e['type'] for e in events]
+    assert types[:2] == ['speech_start', 'speech_end'], types
+    first_end = events[1]
+    # 33 whole 30 ms frames: the longest utterance that fits in 1000 ms
+    assert len(first_end['audio']) == endpointer.max_frames * endpointer.frame_bytes, len(first_end['audio'])
+    print(f"[OK] utterance cut at max_utterance_ms: {types}")
+
+
+def test_flush():
+    endpointer = energy_endpointer()
+    assert endpointer.flush() is None
+
+    events = endpointer.feed(np.concatenate([silence(200), tone(500)]))
+    assert [e['type'] for e in events] == ['speech_start'], events
+    endpointer.feed(tone(10))  # less than a frame - left in the remainder
+    event = endpointer.flush()
+    assert event is not None and event['type'] == 'speech_end', event
+    assert not endpointer.triggered
+    assert endpointer.flush() is None
+    print(f"[OK] flush ends the utterance in progress ({event['speech_ms']} ms of speech)")
+
+
+if __name__ == "__main__":
+    test_speech_start_and_end()
+    test_reframes_any_buffer_size()
+    test_timeout_without_speech()
+    test_no_timeout_after_speech()
+    test_max_utterance()
+    test_flush()
+    print("[SUCCESS] Endpointer tests passed")
@@ -3,10 +3,10 @@ UBUAI Voice Server - FastAPI
 Handles audio transcription (Faster-Whisper GPU), QM routing, and TTS
 """
 import os
+import sys
 import json
 import asyncio
 import base64
-import socket
 import tempfile
 import wave
 from datetime import datetime
@@ -14,9 +14,13 @@ from typing import Optional
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.responses import Response, JSONResponse
-import requests
 from dotenv import load_dotenv
 
+# Shared HAL modules live in ../PY
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "PY"))
+from ai_server_client import AIServerTimeout, get_client as get_ai_server
+from http_transport import get_transport
+
 # Load environment variables
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 
@@ -104,7 +108,7 @@ def transcribe_audio(audio_bytes: bytes, sample_rate: int = 16000) -> str:
         print(f"❌ Transcription error: {e}")
         return ""
 
-def route_to_qm_tcp(session_id: str, text: str, timestamp: str = None) -> dict:
+async def route_to_qm_tcp(session_id: str, text: str, timestamp: str = None) -> dict:
     """
     Send text to OpenQM listener via TCP
     
@@ -126,40 +130,10 @@ def route_to_qm_tcp(session_id: str, text: str, timestamp: str = None) -> dict:
     }
     
     try:
-        # Connect to QM listener
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(10.0)
-        sock.connect((OPENQM_HOST, OPENQM_PORT))
-        
-        # Send JSON + newline
-        message = json.dumps(payload) + "\n"
-        sock.sendall(message.encode('utf-8'))
-        
-        # Receive response
-        response_data = b""
-        while True:
-            chunk = sock.recv(4096)
-            if not chunk:
-                break
-            response_data += chunk
-            # Check if we have complete JSON (ends with })
-            if response_data.strip().endswith(b'}'):
-                break
-        
-        sock.close()
-        
-        # Parse response
-        if response_data:
-            response = json.loads(response_data.decode('utf-8'))
-            return response
-        else:
-            return {
-                "response_text": "I didn't receive a response.",
-                "action_taken": "ERROR",
-                "intent": "unknown"
-            }
+        # Persistent connection shared by all sessions (see PY/ai_server_client.py)
+        return await get_ai_server(OPENQM_HOST, OPENQM_PORT).request(payload, timeout=10.0)
     
-    except socket.timeout:
+    except AIServerTimeout:
         print(f"❌ QM connection timeout")
         return {
             "response_text": "Sorry, I'm taking too long to think.",
@@ -176,7 +150,7 @@ def route_to_qm_tcp(session_id: str, text: str, timestamp: str = None) -> dict:
             "intent": "unknown"
         }
 
-def tts_elevenlabs(text: str, voice_id: str = None) -> Optional[bytes]:
+async def tts_elevenlabs(text: str, voice_id: str = None) -> Optional[bytes]:
     """
     Generate speech using ElevenLabs API
     
@@ -208,13 +182,12 @@ def tts_elevenlabs(text: str, voice_id: str = None) -> Optional[bytes]:
             }
         }
         
-        response = requests.post(url, headers=headers, json=data, timeout=30)
-        
-        if response.status_code == 200:
-            return response.content
-        else:
-            print(f"⚠ ElevenLabs error: {response.status_code}")
-            return None
+        async with get_transport().apost(url, headers=headers, json=data, timeout=30) as response:
+            if response.status == 200:
+                return await response.read()
+            else:
+                print(f"⚠ ElevenLabs error: {response.status}")
+                return None
     
     except Exception as e:
         print(f"⚠ ElevenLabs error: {e}")
@@ -337,13 +310,13 @@ async def transcribe_endpoint(websocket: WebSocket):
             return
         
         # Route to QM
-        qm_response = route_to_qm_tcp(session_id, text)
+        qm_response = await route_to_qm_tcp(session_id, text)
         response_text = qm_response.get("response_text", "I didn't understand that.")
         
         print(f"[{datetime.now()}] QM response: {response_text[:50]}...")
         
         # Generate TTS
-        audio_bytes = tts_elevenlabs(response_text)
+        audio_bytes = await tts_elevenlabs(response_text)
         
         if not audio_bytes:
             # Fallback to pyttsx3
@@ -400,7 +373,7 @@ async def speak_endpoint(request: Request):
         return JSONResponse({"error": "No text provided"}, status_code=400)
     
     # Generate audio
-    audio_bytes = tts_elevenlabs(text, voice)
+    audio_bytes = await tts_elevenlabs(text, voice)
     
     if not audio_bytes:
         # Fallback
@@ -2,16 +2,46 @@
 """
 Faster-Whisper STT Server
 Runs on port 9000, provides HTTP endpoint for speech-to-text
+
+Requests are not run one by one: a batching scheduler collects the
+/transcribe requests that arrive within WHISPER_MAX_WAIT_MS of each other
+(up to WHISPER_MAX_BATCH), applies the same VAD filter as a single
+request, pads each clip to Whisper's 30 s window and runs them through the
+model as one batch, so several rooms talking at once share a single
+encoder/decoder pass instead of queueing behind each other. A clip the
+batch pass is unsure of (low log-probability or repetitive output, where
+model.transcribe would retry at a higher temperature) is re-run on its
+own, so batching does not change transcripts. A request that arrives
+alone, asks for language "auto" or is longer than 30 s is transcribed on
+its own, exactly as before.
+
+Profiles (WHISPER_PROFILE):
+    gpu   large-v3, cuda, float16, batches of up to 8
+    cpu   small, cpu, int8, batches of up to 4 (fallback without CUDA)
+    auto  gpu, falling back to cpu if the model cannot be loaded on CUDA
+
+Environment overrides: WHISPER_MODEL, WHISPER_MAX_BATCH, WHISPER_MAX_WAIT_MS
+
+Every response carries queue_ms (time waiting for the model), inference_ms
+and batch_size; GET /stats summarises them.
 """
 
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from faster_whisper import WhisperModel
+from faster_whisper.tokenizer import Tokenizer
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+from collections import deque
+import asyncio
 import base64
+import ctranslate2
 import numpy as np
 import io
+import os
+import time
 import wave
+import zlib
 import uvicorn
 import logging
 
@@ -25,33 +55,287 @@ logger = logging.getLogger(__name__)
 # Initialize FastAPI
 app = FastAPI(title="Faster-Whisper STT Service")
 
-# Global model (loaded on startup)
+PROFILES = {
+    "gpu": {"model": "large-v3", "device": "cuda", "compute_type": "float16",
+            "max_batch": 8, "max_wait_ms": 30},
+    "cpu": {"model": "small", "device": "cpu", "compute_type": "int8",
+            "max_batch": 4, "max_wait_ms": 50},
+}
+PROFILE = os.environ.get("WHISPER_PROFILE", "auto")
+
+# Global model (loaded on startup, from the active profile)
 model = None
+scheduler = None
 MODEL_NAME = "large-v3"
-DEVICE = "cuda"  # or "cpu" if no GPU
-COMPUTE_TYPE = "float16"  # or "int8" for CPU
+DEVICE = "cuda"
+COMPUTE_TYPE = "float16"
+
+# Decoding settings shared by both paths (model.transcribe defaults)
+VAD_PARAMETERS = {
+    "threshold": 0.5,
+    "min_silence_duration_ms": 500
+}
+BEAM_SIZE = 5
+LOG_PROB_THRESHOLD = -1.0
+COMPRESSION_RATIO_THRESHOLD = 2.4
 
 class TranscriptionRequest(BaseModel):
     audio: str  # Base64 encoded audio
     language: str = "en"
     task: str = "transcribe"  # or "translate"
 
+class PendingRequest:
+    """One queued /transcribe call"""
+
+    def __init__(self, audio, language, task, future):
+        self.audio = audio
+        self.language = language
+        self.task = task
+        self.future = future
+        self.enqueued = time.monotonic()
+
+def transcribe_one(audio, language, task):
+    """Single request through model.transcribe (VAD filter, any length, language detection)"""
+    segments, info = model.transcribe(
+        audio,
+        language=language if language != "auto" else None,
+        task=task,
+        beam_size=BEAM_SIZE,
+        vad_filter=True,
+        vad_parameters=VAD_PARAMETERS
+    )
+
+    # Collect all text
+    text = " ".join([segment.text for segment in segments]).strip()
+
+    return {
+        "text": text,
+        "language": info.language,
+        "language_probability": info.language_probability
+    }
+
+def speech_only(audio):
+    """Drop non-speech with faster-whisper's VAD, as vad_filter=True does in model.transcribe"""
+    chunks = get_speech_timestamps(audio, VadOptions(**VAD_PARAMETERS))
+    if not chunks:
+        return audio[:0]
+    return np.concatenate([audio[chunk["start"]:chunk["end"]] for chunk in chunks])
+
+def compression_ratio(text):
+    text_bytes = text.encode("utf-8")
+    return len(text_bytes) / len(zlib.compress(text_bytes))
+
+def transcribe_batch(audios, language, task):
+    """
+    Clips of at most 30 s with the same language/task: VAD, pad and decode
+    as one batch with the prompt and thresholds model.transcribe uses. A clip
+    whose decode would make model.transcribe fall back to a higher
+    temperature (or is rejected as silence) is not guessed at - it is sent
+    through transcribe_one, so the batch never changes a transcript.
+    """
+    transcriptions = [None] * len(audios)
+    speech = [speech_only(audio) for audio in audios]
+    indices = [i for i, clip in enumerate(speech) if len(clip)]
+    for i, clip in enumerate(speech):
+        if not len(clip):
+            transcriptions[i] = {"text": "", "language": language, "language_probability": None}
+    if not indices:
+        return transcriptions
+
+    extractor = model.feature_extractor
+    padded = [np.pad(speech[i], (0, extractor.n_samples - len(speech[i]))) for i in indices]
+    features = np.stack([extractor(clip)[:, :extractor.nb_max_frames] for clip in padded]).astype(np.float32)
+
+    tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual,
+                          task=task, language=language)
+    prompt = model.get_prompt(tokenizer, [])
+
+    results = model.model.generate(
+        ctranslate2.StorageView.from_array(np.ascontiguousarray(features)),
+        [prompt] * len(indices),
+        beam_size=BEAM_SIZE,
+        return_scores=True,
+        suppress_blank=True
+    )
+
+    for i, result in zip(indices, results):
+        tokens = result.sequences_ids[0]
+        avg_logprob = result.scores[0] * len(tokens) / (len(tokens) + 1)
+        text = tokenizer.decode(tokens).strip()  # drops timestamp tokens
+        if (avg_logprob < LOG_PROB_THRESHOLD
+                or (text and compression_ratio(text) > COMPRESSION_RATIO_THRESHOLD)):
+            transcriptions[i] = transcribe_one(audios[i], language, task)
+            continue
+        transcriptions[i] = {
+            "text": text,
+            "language": language,
+            "language_probability": None
+        }
+    return transcriptions
+
+class BatchScheduler:
+    """Collects requests for up to max_wait_ms and runs them through the model together"""
+
+    def __init__(self, max_batch, max_wait_ms):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.queue_ms = deque(maxlen=1000)
+        self.stats = {
+            "requests": 0,
+            "batches": 0,
+            "batched_requests": 0,
+            "inference_ms": 0.0,
+            "batch_sizes": {}
+        }
+
+    async def submit(self, audio, language, task):
+        """Queue a request and wait for its transcription"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(PendingRequest(audio, language, task, future))
+        return await future
+
+    async def run(self):
+        """Worker loop - one batch on the model at a time"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            batch = [r for r in batch if not r.future.done()]  # client gave up
+            if not batch:
+                continue
+
+            started = time.monotonic()
+            queue_max = (started - min(r.enqueued for r in batch)) * 1000
+            outcomes = await loop.run_in_executor(None, self._infer, batch)
+            inference_ms = (time.monotonic() - started) * 1000
+
+            for request, outcome in zip(batch, outcomes):
+                queue_ms = (started - request.enqueued) * 1000
+                self.queue_ms.append(queue_ms)
+                if request.future.done():
+                    continue
+                if isinstance(outcome, Exception):
+                    request.future.set_exception(outcome)
+                    continue
+                outcome.update({
+                    "queue_ms": round(queue_ms, 1),
+                    "inference_ms": round(inference_ms, 1),
+                    "batch_size": len(batch)
+                })
+                request.future.set_result(outcome)
+
+            self._record(batch, inference_ms)
+            logger.info(f"Batch of {len(batch)} "
+                        f"(queue max {queue_max:.0f} ms, "
+                        f"inference {inference_ms:.0f} ms)")
+
+    async def _collect(self):
+        """First waiting request plus whatever arrives before its max_wait deadline"""
+        first = await self.queue.get()
+        batch = [first]
+        deadline = first.enqueued + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                else:
+                    batch.append(self.queue.get_nowait())  # already queued behind the last batch
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+        return batch
+
+    def _infer(self, batch):
+        """Runs in the executor; returns a result dict or an Exception per request"""
+        outcomes = [None] * len(batch)
+        groups = {}
+        for i, request in enumerate(batch):
+            if request.language == "auto" or len(request.audio) > model.feature_extractor.n_samples:
+                groups.setdefault(None, []).append(i)  # needs the full transcribe() path
+            else:
+                groups.setdefault((request.language, request.task), []).append(i)
+
+        for key, indices in groups.items():
+            if key is not None and len(indices) > 1:
+                try:
+                    results = transcribe_batch([batch[i].audio for i in indices], *key)
+                    for i, result in zip(indices, results):
+                        outcomes[i] = result
+                    self.stats["batched_requests"] += len(indices)
+                    continue
+                except Exception as e:
+                    logger.error(f"Batched transcription failed, running requests singly: {e}")
+            for i in indices:
+                request = batch[i]
+                try:
+                    outcomes[i] = transcribe_one(request.audio, request.language, request.task)
+                except Exception as e:
+                    outcomes[i] = e
+        return outcomes
+
+    def _record(self, batch, inference_ms):
+        self.stats["requests"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["inference_ms"] += inference_ms
+        sizes = self.stats["batch_sizes"]
+        sizes[len(batch)] = sizes.get(len(batch), 0) + 1
+
+    def get_stats(self):
+        waits = sorted(self.queue_ms)
+        batches = self.stats["batches"]
+        return {
+            "requests": self.stats["requests"],
+            "batches": batches,
+            "batched_requests": self.stats["batched_requests"],
+            "avg_batch_size": round(self.stats["requests"] / batches, 2) if batches else 0.0,
+            "batch_sizes": dict(sorted(self.stats["batch_sizes"].items())),
+            "avg_inference_ms": round(self.stats["inference_ms"] / batches, 1) if batches else 0.0,
+            "queue_ms": {
+                "avg": round(sum(waits) / len(waits), 1) if waits else 0.0,
+                "p50": round(waits[len(waits) // 2], 1) if waits else 0.0,
+                "p95": round(waits[int(len(waits) * 0.95)], 1) if waits else 0.0,
+                "max": round(waits[-1], 1) if waits else 0.0
+            },
+            "pending": self.queue.qsize()
+        }
+
+def resolve_profile(name):
+    """Profile settings with environment overrides applied"""
+    profile = dict(PROFILES[name])
+    profile["model"] = os.environ.get("WHISPER_MODEL", profile["model"])
+    profile["max_batch"] = int(os.environ.get("WHISPER_MAX_BATCH", profile["max_batch"]))
+    profile["max_wait_ms"] = float(os.environ.get("WHISPER_MAX_WAIT_MS", profile["max_wait_ms"]))
+    return profile
+
 @app.on_event("startup")
 async def load_model():
-    """Load Whisper model on startup"""
-    global model
-    logger.info(f"Loading Whisper model: {MODEL_NAME} on {DEVICE}")
-    try:
-        model = WhisperModel(
-            MODEL_NAME,
-            device=DEVICE,
-            compute_type=COMPUTE_TYPE,
-            download_root="/opt/faster-whisper/models"
-        )
-        logger.info("Model loaded successfully")
-    except Exception as e:
-        logger.error(f"Failed to load model: {e}")
-        raise
+    """Load Whisper model on startup (gpu profile, falling back to cpu int8)"""
+    global model, scheduler, PROFILE, MODEL_NAME, DEVICE, COMPUTE_TYPE
+    candidates = ["gpu", "cpu"] if PROFILE == "auto" else [PROFILE]
+    for name in candidates:
+        profile = resolve_profile(name)
+        logger.info(f"Loading Whisper model: {profile['model']} on {profile['device']} "
+                    f"({profile['compute_type']}, profile {name})")
+        try:
+            model = WhisperModel(
+                profile["model"],
+                device=profile["device"],
+                compute_type=profile["compute_type"],
+                download_root="/opt/faster-whisper/models"
+            )
+        except Exception as e:
+            logger.error(f"Failed to load model with profile {name}: {e}")
+            continue
+        PROFILE = name
+        MODEL_NAME = profile["model"]
+        DEVICE = profile["device"]
+        COMPUTE_TYPE = profile["compute_type"]
+        scheduler = BatchScheduler(profile["max_batch"], profile["max_wait_ms"])
+        asyncio.create_task(scheduler.run())
+        logger.info(f"Model loaded successfully (batches of up to {profile['max_batch']}, "
+                    f"max wait {profile['max_wait_ms']:.0f} ms)")
+        return
+    raise RuntimeError(f"Could not load Whisper model with profiles: {', '.join(candidates)}")
 
 @app.get("/")
 async def health_check():
@@ -60,6 +344,10 @@ async def health_check():
         "status": "running",
         "model": MODEL_NAME,
         "device": DEVICE,
+        "compute_type": COMPUTE_TYPE,
+        "profile": PROFILE,
+        "max_batch": scheduler.max_batch if scheduler else None,
+        "max_wait_ms": scheduler.max_wait * 1000 if scheduler else None,
         "service": "Faster-Whisper STT"
     }
 
@@ -68,11 +356,18 @@ async def health():
     """Health check alias"""
     return await health_check()
 
+@app.get("/stats")
+async def stats():
+    """Batching and queue-time metrics"""
+    if scheduler is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return scheduler.get_stats()
+
 @app.post("/transcribe")
 async def transcribe(request: TranscriptionRequest):
     """Transcribe audio to text"""
     
-    if model is None:
+    if model is None or scheduler is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
     try:
@@ -84,29 +379,14 @@ async def transcribe(request: TranscriptionRequest):
         
         logger.info(f"Transcribing audio ({len(audio_array)} samples)")
         
-        # Transcribe
-        segments, info = model.transcribe(
-            audio_array,
-            language=request.language if request.language != "auto" else None,
-            task=request.task,
-            vad_filter=True,
-            vad_parameters={
-                "threshold": 0.5,
-                "min_silence_duration_ms": 500
-            }
-        )
-        
-        # Collect all text
-        text = " ".join([segment.text for segment in segments]).strip()
+        # Transcribe (batched with concurrent requests)
+        result = await scheduler.submit(audio_array, request.language, request.task)
         
-        logger.info(f"Transcription: {text[:100]}...")
+        logger.info(f"Transcription: {result['text'][:100]}... "
+                    f"(queue {result['queue_ms']:.0f} ms, batch of {result['batch_size']})")
         
-        return {
-            "text": text,
-            "language": info.language,
-            "language_probability": info.language_probability,
-            "status": "success"
-        }
+        result["status"] = "success"
+        return result
         
     except Exception as e:
         logger.error(f"Transcription error: {e}")
@@ -8,6 +8,14 @@ class HALClient {
         this.audioChunks = [];
         this.isRecording = false;
         this.isListening = false;
+        this.binaryAudio = false;  // server accepts binary PCM16 frames (see 'connected')
+        this.audioSeq = 0;
+        
+        // Streamed answers: text so far, and per-sentence audio played in seq order
+        this.streamDiv = null;
+        this.chunkQueue = {};
+        this.nextChunk = 0;
+        this.chunkAudio = null;
         
         // Server URL - using HAProxy reverse proxy with wildcard cert
         this.serverUrl = 'wss://hal.lcs.ai';
@@ -85,17 +93,59 @@ class HALClient {
         switch (data.type) {
             case 'connected':
                 this.sessionId = data.session_id;
+                this.binaryAudio = !!(data.binary_audio && data.binary_audio.codecs.includes('pcm16'));
+                this.audioSeq = 0;
                 this.updateStatus(`Connected! Session: ${this.sessionId.substring(0, 8)}...`);
+                // Ask for LLM answers as they are generated (partial / audio_chunk frames)
+                this.ws.send(JSON.stringify({
+                    type: 'hello',
+                    streaming: true,
+                    session_id: this.sessionId
+                }));
+                break;
+                
+            case 'partial':
+                if (!this.streamDiv) {
+                    this.startAnswer();
+                }
+                this.streamDiv.textContent += data.text;
+                this.chat.scrollTop = this.chat.scrollHeight;
+                break;
+                
+            case 'audio_chunk':
+                if (!this.streamDiv) {
+                    this.startAnswer();
+                }
+                this.chunkQueue[data.seq] = data.audio;
+                this.playNextChunk();
+                break;
+                
+            case 'sentence':
+                // Gateway without server TTS - speak it in the browser
+                if ('speechSynthesis' in window) {
+                    window.speechSynthesis.speak(new SpeechSynthesisUtterance(data.text));
+                }
                 break;
                 
             case 'response':
-                this.addMessage('hal', data.text);
-                // Play TTS audio if available
+                if (this.streamDiv) {
+                    this.streamDiv.textContent = data.text;
+                    this.streamDiv = null;
+                } else {
+                    this.addMessage('hal', data.text);
+                }
+                // Play TTS audio if available (not sent when audio_chunks carried it)
                 if (data.audio) {
                     this.playAudio(data.audio);
                 }
                 break;
                 
+            case 'cancelled':
+                this.stopSpeaking();
+                this.streamDiv = null;
+                this.updateStatus('Ready');
+                break;
+                
             case 'processing':
                 this.updateStatus('HAL is thinking...');
                 break;
@@ -173,11 +223,15 @@ class HALClient {
                 
                 // Send audio chunks to server for wake word detection
                 if (this.ws && this.ws.readyState === WebSocket.OPEN) {
-                    this.ws.send(JSON.stringify({
-                        type: 'audio_stream',
-                        audio: Array.from(int16Array),
-                        session_id: this.sessionId
-                    }));
+                    if (this.binaryAudio) {
+                        this.ws.send(this.pcmFrame(int16Array));
+                    } else {
+                        this.ws.send(JSON.stringify({
+                            type: 'audio_stream',
+                            audio: Array.from(int16Array),
+                            session_id: this.sessionId
+                        }));
+                    }
                 }
             };
             
@@ -223,11 +277,64 @@ class HALClient {
         return int16Array;
     }
     
+    // Binary audio frame: 12-byte header ('HA', version 1, codec 0 = PCM16,
+    // sample rate, sequence number - little-endian) followed by the samples
+    pcmFrame(int16Array) {
+        const frame = new ArrayBuffer(12 + int16Array.length * 2);
+        const header = new DataView(frame);
+        header.setUint8(0, 0x48);  // 'H'
+        header.setUint8(1, 0x41);  // 'A'
+        header.setUint8(2, 1);
+        header.setUint8(3, 0);
+        header.setUint32(4, 16000, true);
+        header.setUint32(8, this.audioSeq++ >>> 0, true);
+        new Int16Array(frame, 12).set(int16Array);  // browsers are little-endian
+        return frame;
+    }
+    
     playAudio(base64Audio) {
         const audio = new Audio('data:audio/wav;base64,' + base64Audio);
         audio.play();
     }
     
+    // A new streamed answer: drop whatever is left of the previous one
+    startAnswer() {
+        this.stopSpeaking();
+        this.streamDiv = this.addMessage('hal', '');
+    }
+    
+    // Chunks can only start once the one before them has finished
+    playNextChunk() {
+        if (this.chunkAudio) return;
+        const base64Audio = this.chunkQueue[this.nextChunk];
+        if (base64Audio === undefined) return;
+        delete this.chunkQueue[this.nextChunk];
+        this.nextChunk++;
+        
+        const audio = new Audio('data:audio/wav;base64,' + base64Audio);
+        const next = () => {
+            if (this.chunkAudio !== audio) return;
+            this.chunkAudio = null;
+            this.playNextChunk();
+        };
+        audio.onended = next;
+        audio.onerror = next;
+        this.chunkAudio = audio;
+        audio.play().catch(next);
+    }
+    
+    stopSpeaking() {
+        if (this.chunkAudio) {
+            this.chunkAudio.pause();
+            this.chunkAudio = null;
+        }
+        this.chunkQueue = {};
+        this.nextChunk = 0;
+        if ('speechSynthesis' in window) {
+            window.speechSynthesis.cancel();
+        }
+    }
+    
     addMessage(type, text) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${type}`;
@@ -241,6 +348,7 @@ class HALClient {
         
         // Scroll to bottom
         this.chat.scrollTop = this.chat.scrollHeight;
+        return contentDiv;
     }
     
     updateStatus(text) {